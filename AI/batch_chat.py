@@ -0,0 +1,179 @@
+"""
+Batch answering for bulk question evaluation.
+
+Input is JSONL with one {"company": ..., "prompt": ...} object per line (an
+optional "id" is echoed back). Questions are grouped by company so each
+index and each company's customs are loaded once; a group's questions are
+encoded in one batch and searched with a single FAISS query matrix. Answers
+are then generated concurrently, spread across every running model by the
+usual least-loaded selection, and results stream out as JSONL in completion
+order with per-item timings.
+
+    python batch_chat.py --input questions.jsonl --output answers.jsonl
+    curl --data-binary @questions.jsonl http://localhost:8001/chat/batch
+
+Output lines carry "line" (1-based input line), company, prompt, response,
+model, sources and timings, or "error" when the item failed. /chat/batch
+rejects requests with more than BATCH_MAX_ITEMS questions.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import traceback
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import numpy as np
+import chatbot
+from metrics import span
+
+# Concurrent generations; defaults to one per running model
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "0"))
+# Most questions one /chat/batch request may carry (413 above); the CLI has no cap
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "1000"))
+
+
+def parse_jsonl(lines):
+    """
+    [(line_no, item or None, error or None)] for non-blank lines. Lines may be
+    str or UTF-8 bytes; bytes that aren't valid UTF-8 are an invalid line.
+    """
+    parsed = []
+    for line_no, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            if isinstance(line, bytes):
+                # UnicodeDecodeError is a ValueError: reported like malformed JSON
+                line = line.decode("utf-8", errors="strict")
+            item = json.loads(line)
+            if not isinstance(item, dict) or not item.get("company") or not item.get("prompt"):
+                raise ValueError("expected an object with 'company' and 'prompt'")
+            parsed.append((line_no, item, None))
+        except ValueError as e:
+            parsed.append((line_no, None, f"Invalid input line: {e}"))
+    return parsed
+
+
+def _result(line_no, item, **fields):
+    result = {"line": line_no}
+    if item:
+        if "id" in item:
+            result["id"] = item["id"]
+        result["company"] = item["company"]
+        result["prompt"] = item["prompt"]
+    result.update(fields)
+    return result
+
+
+def prepare_group(company, entries, embed_model):
+    """
+    Loads the company once and encodes/searches all of its questions in one go.
+    Returns a list of (line_no, item, ask_bot kwargs).
+    """
+    timings = {}
+    index, texts, urls, bm25 = chatbot.load_company_data(company)
+    with span("identity", timings):
+        identity_data = chatbot.fetch_identity(company)
+
+    questions = [item["prompt"] for _, item in entries]
+    with span("batch_encode", timings):
+        embeddings = np.array(embed_model.encode(questions), dtype=np.float32).reshape(len(questions), -1)
+        embeddings /= np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+    with span("batch_search", timings):
+        _, I = index.search(embeddings, chatbot.dense_candidates(5, bm25))
+    timings["batch_size"] = len(questions)
+
+    prepared = []
+    for row, (line_no, item) in enumerate(entries):
+        prepared.append((line_no, item, {
+            "index": index, "texts": texts, "urls": urls, "bm25": bm25,
+            "identity_data": identity_data,
+            "query_embedding": embeddings[row:row + 1],
+            "dense_ids": I[row].tolist(),
+            "group_timings": timings,
+        }))
+    return prepared
+
+
+def answer(line_no, item, prepared, embed_model, use_faq, submitted_at):
+    group_timings = prepared.pop("group_timings")
+    trace = {"timings": {"queue_ms": (time.perf_counter() - submitted_at) * 1000}}
+    try:
+        with span("total", trace["timings"]):
+            response = chatbot.ask_bot(
+                item["prompt"], embed_model, company_key=item["company"], trace=trace, use_faq=use_faq, **prepared
+            )
+    except Exception as e:
+        return _result(line_no, item, error=str(e), timings=trace["timings"])
+
+    timings = {**trace["timings"], **{f"group_{k}": v for k, v in group_timings.items()}}
+    return _result(
+        line_no, item,
+        response=response,
+        model=trace.get("model"),
+        sources=trace.get("sources", []),
+        faq=bool(trace.get("faq")),
+        timings=timings,
+    )
+
+
+def run_batch(parsed, concurrency=BATCH_CONCURRENCY, use_faq=True):
+    """Yields one result dict per parsed input line, as each completes."""
+    groups = OrderedDict()
+    for line_no, item, error in parsed:
+        if error:
+            yield _result(line_no, None, error=error)
+        else:
+            groups.setdefault(item["company"], []).append((line_no, item))
+    if not groups:
+        return
+
+    embed_model = chatbot.get_model()
+    if concurrency <= 0:
+        concurrency = max(1, len(chatbot.get_running_models()))
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="batch-chat") as pool:
+        futures = []
+        for company, entries in groups.items():
+            try:
+                prepared = prepare_group(company, entries, embed_model)
+            except Exception as e:
+                for line_no, item in entries:
+                    yield _result(line_no, item, error=str(e))
+                continue
+            for line_no, item, kwargs in prepared:
+                futures.append(pool.submit(answer, line_no, item, kwargs, embed_model, use_faq, time.perf_counter()))
+
+        for future in as_completed(futures):
+            yield future.result()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--input", default="-", help="JSONL of {company, prompt} (default stdin)")
+    parser.add_argument("--output", default="-", help="JSONL results (default stdout)")
+    parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY, help="Concurrent generations (0 = one per model)")
+    parser.add_argument("--no-faq", action="store_true", help="Always generate; ignore pre-computed FAQ answers")
+    args = parser.parse_args()
+
+    source = sys.stdin if args.input == "-" else open(args.input, "r", encoding="utf-8")
+    sink = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        started = time.perf_counter()
+        count = errors = 0
+        for result in run_batch(parse_jsonl(source), args.concurrency, use_faq=not args.no_faq):
+            sink.write(json.dumps(result, ensure_ascii=False) + "\n")
+            sink.flush()
+            count += 1
+            errors += "error" in result
+        print(f"{count} answers ({errors} errors) in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+    except Exception:
+        traceback.print_exc()
+        raise SystemExit(1)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if sink is not sys.stdout:
+            sink.close()
@@ -0,0 +1,110 @@
+"""
+Recall and size impact of compressed embedding storage.
+
+For each company corpus, every index type from embed_index.py is built and
+searched with every chunk as a query. recall@k is the overlap with exact
+float32 search; bytes/vector is the serialized index size per vector.
+float16 embeddings.npy is measured the same way (exact search over the
+float16-rounded vectors).
+
+The bundled corpora have ~100 chunks, below the 256 points PQ needs to
+train; pass --synthetic N to also measure a corpus of N chunks made by
+jittering the real embeddings.
+
+Usage:
+    python benchmarks/bench_compression.py --data-dir shared_data --synthetic 20000 --out results.json
+"""
+import os
+import sys
+import json
+import argparse
+import numpy as np
+import faiss
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from embed_index import load_chunks, build_index, index_factory_string
+from knowledge import knowledge_path
+from encoders import load_encoder
+
+INDEX_TYPES = ["flat", "pq", "opq", "pca", "pca-pq"]
+
+
+def recall_at_k(exact_ids, approx_ids, k):
+    hits = sum(len(set(e[:k]) & set(a[:k])) for e, a in zip(exact_ids, approx_ids))
+    return hits / (len(exact_ids) * k)
+
+
+def measure(name, embeddings, k, max_queries):
+    queries = embeddings[:max_queries]
+    exact = faiss.IndexFlatL2(embeddings.shape[1])
+    exact.add(embeddings)
+    _, exact_ids = exact.search(queries, k)
+
+    rows = []
+    half = embeddings.astype(np.float16).astype(np.float32)
+    fp16 = faiss.IndexFlatL2(embeddings.shape[1])
+    fp16.add(half)
+    _, ids = fp16.search(queries, k)
+    rows.append({
+        "corpus": name,
+        "storage": "embeddings.npy float16",
+        "vectors": len(embeddings),
+        f"recall@{k}": recall_at_k(exact_ids, ids, k),
+        "bytes_per_vector": embeddings.shape[1] * 2,
+    })
+
+    for index_type in INDEX_TYPES:
+        index = build_index(embeddings, index_type)
+        _, ids = index.search(queries, k)
+        size = faiss.serialize_index(index).nbytes
+        rows.append({
+            "corpus": name,
+            "storage": f"{index_type} ({index_factory_string(index_type, *embeddings.shape)})",
+            "vectors": len(embeddings),
+            f"recall@{k}": recall_at_k(exact_ids, ids, k),
+            "bytes_per_vector": size / len(embeddings),
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data-dir", default=os.getenv("SHARED_DATA_DIR", "/app/shared_data"))
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--max-queries", type=int, default=1000)
+    parser.add_argument("--synthetic", type=int, default=0, help="Also test a jittered corpus of this many vectors")
+    parser.add_argument("--out", help="Write results as JSON")
+    args = parser.parse_args()
+
+    model = load_encoder()
+    report, pooled = [], []
+    for company in sorted(os.listdir(args.data_dir)):
+        data_path = knowledge_path(os.path.join(args.data_dir, company))
+        if not os.path.isfile(data_path):
+            continue
+        texts, _ = load_chunks(data_path)
+        if not texts:
+            continue
+        embeddings = np.ascontiguousarray(model.encode(texts), dtype=np.float32)
+        pooled.append(embeddings)
+        report += measure(company, embeddings, args.k, args.max_queries)
+
+    if args.synthetic and pooled:
+        rng = np.random.default_rng(0)
+        base = np.vstack(pooled)
+        picks = base[rng.integers(0, len(base), args.synthetic)]
+        noise = rng.normal(scale=0.02, size=picks.shape).astype(np.float32)
+        report += measure(f"synthetic-{args.synthetic}", np.ascontiguousarray(picks + noise), args.k, args.max_queries)
+
+    for row in report:
+        print(
+            f"{row['corpus']:>18} {row['storage']:<32} n={row['vectors']:<6} "
+            f"recall@{args.k}={row[f'recall@{args.k}']:.3f} bytes/vec={row['bytes_per_vector']:.0f}"
+        )
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+Per-company vs shared index layout at increasing tenant counts.
+
+For each tenant count a synthetic corpus is generated (clustered random
+vectors, --chunks per tenant) and written both ways into a scratch
+directory:
+  per-company  one IndexFlatIP faiss.index per company (INDEX_LAYOUT default)
+  shared       one shared_index.py index, filtered per tenant
+
+Reported per layout: build time, time to load every tenant, index files and
+bytes on disk, filtered query latency p50/p95, recall@k against exact
+per-tenant search, and the time to rebuild a single tenant (add_company
+updates the shared index in place).
+
+Usage:
+    python benchmarks/bench_layouts.py --tenants 10 100 1000 --out results.json
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import numpy as np
+
+SCRATCH = tempfile.mkdtemp(prefix="bench_layouts_")
+# shared_index reads its location at import time
+os.environ["SHARED_DATA_DIR"] = SCRATCH
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import faiss
+import shared_index
+from embed_index import build_index
+
+
+def make_corpus(n_tenants, chunks, dim, rng):
+    corpus = {}
+    for t in range(n_tenants):
+        centers = rng.normal(size=(8, dim))
+        picks = centers[rng.integers(0, 8, chunks)] + rng.normal(scale=0.5, size=(chunks, dim))
+        vectors = picks.astype(np.float32)
+        faiss.normalize_L2(vectors)
+        corpus[f"tenant{t:04d}"] = vectors
+    return corpus
+
+
+def percentile_ms(samples, q):
+    return float(np.percentile(samples, q) * 1000)
+
+
+def dir_stats(paths):
+    return len(paths), sum(os.path.getsize(p) for p in paths)
+
+
+def write_per_company(root, corpus):
+    start = time.perf_counter()
+    paths = []
+    for company, vectors in corpus.items():
+        os.makedirs(os.path.join(root, company), exist_ok=True)
+        path = os.path.join(root, company, "faiss.index")
+        faiss.write_index(build_index(vectors, "flat"), path)
+        paths.append(path)
+    return time.perf_counter() - start, paths
+
+
+def write_shared(corpus):
+    # One add_company per tenant, as embed_index.py builds them
+    start = time.perf_counter()
+    for company, company_vectors in corpus.items():
+        os.makedirs(os.path.join(SCRATCH, company), exist_ok=True)
+        shared_index.add_company(company, company_vectors)
+    paths = [shared_index.SHARED_INDEX_PATH, shared_index.TENANTS_PATH]
+    if os.path.isfile(shared_index.TRAINING_PATH):
+        paths.append(shared_index.TRAINING_PATH)
+    return time.perf_counter() - start, paths
+
+
+def query(indexes, queries, k, exact):
+    latencies, hits = [], 0
+    for (company, q), expected in zip(queries, exact):
+        start = time.perf_counter()
+        _, ids = indexes[company].search(q, k)
+        latencies.append(time.perf_counter() - start)
+        hits += len(set(ids[0]) & expected)
+    return latencies, hits / (len(queries) * k)
+
+
+def measure(n_tenants, args, rng):
+    corpus = make_corpus(n_tenants, args.chunks, args.dim, rng)
+    companies = list(corpus)
+    queries = []
+    for _ in range(args.queries):
+        company = companies[rng.integers(0, n_tenants)]
+        q = corpus[company][rng.integers(0, args.chunks)] + rng.normal(scale=0.1, size=args.dim)
+        q = q.astype(np.float32).reshape(1, -1)
+        faiss.normalize_L2(q)
+        queries.append((company, q))
+
+    exact = [set(np.argsort(-(corpus[company] @ q[0]))[:args.k]) for company, q in queries]
+
+    rows = []
+    per_company_root = os.path.join(SCRATCH, "_per_company")
+    build_s, paths = write_per_company(per_company_root, corpus)
+    start = time.perf_counter()
+    indexes = {c: faiss.read_index(os.path.join(per_company_root, c, "faiss.index")) for c in companies}
+    load_s = time.perf_counter() - start
+    latencies, recall = query(indexes, queries, args.k, exact)
+    start = time.perf_counter()
+    faiss.write_index(build_index(corpus[companies[0]], "flat"), os.path.join(per_company_root, companies[0], "faiss.index"))
+    update_s = time.perf_counter() - start
+    rows.append(("per-company", build_s, load_s, paths, latencies, recall, update_s))
+
+    build_s, paths = write_shared(corpus)
+    shared_index._shared_cache.clear()
+    start = time.perf_counter()
+    indexes = {c: shared_index.load_tenant_view(os.path.join(SCRATCH, c)) for c in companies}
+    load_s = time.perf_counter() - start
+    latencies, recall = query(indexes, queries, args.k, exact)
+    start = time.perf_counter()
+    shared_index.add_company(companies[0], corpus[companies[0]])
+    update_s = time.perf_counter() - start
+    rows.append(("shared", build_s, load_s, paths, latencies, recall, update_s))
+
+    report = []
+    for layout, build_s, load_s, paths, latencies, recall, update_s in rows:
+        files, size = dir_stats(paths)
+        report.append({
+            "tenants": n_tenants,
+            "layout": layout,
+            "vectors": n_tenants * args.chunks,
+            "build_s": build_s,
+            "load_all_s": load_s,
+            "files": files,
+            "bytes": size,
+            "query_p50_ms": percentile_ms(latencies, 50),
+            "query_p95_ms": percentile_ms(latencies, 95),
+            f"recall@{args.k}": recall,
+            "update_one_tenant_s": update_s,
+        })
+
+    for name in os.listdir(SCRATCH):
+        shutil.rmtree(os.path.join(SCRATCH, name))
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tenants", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--chunks", type=int, default=100, help="Chunks per tenant")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--out", help="Write results as JSON")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    report = []
+    try:
+        for n_tenants in args.tenants:
+            report += measure(n_tenants, args, rng)
+    finally:
+        shutil.rmtree(SCRATCH, ignore_errors=True)
+
+    for row in report:
+        print(
+            f"{row['tenants']:>5} tenants {row['layout']:<12} build={row['build_s']:.2f}s "
+            f"load={row['load_all_s']:.3f}s files={row['files']:<5} bytes={row['bytes']:<10} "
+            f"p50={row['query_p50_ms']:.3f}ms p95={row['query_p95_ms']:.3f}ms "
+            f"recall@{args.k}={row[f'recall@{args.k}']:.3f} update={row['update_one_tenant_s']:.2f}s"
+        )
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Time to first token for ask_bot with sequential vs concurrent pre-generation.
+
+The customs fetch and model listing are replaced by sleeps of
+--identity-ms and --models-ms (typical backend and LM Studio round trips),
+and the completion call returns as soon as it is reached, so the measured
+time is everything ask_bot does before generation starts. Query encoding
+uses the real encoder (EMBED_BACKEND) against a synthetic FAISS index of
+--chunks passages. The prefill and decode that follow are the same in both
+modes, so the difference carries over to time to first token unchanged.
+
+Usage:
+    python benchmarks/bench_prefetch.py --identity-ms 40 --models-ms 15 --queries 50 --out results.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import faiss
+import chatbot
+
+QUERIES = [
+    "What is the application deadline?",
+    "How much is tuition for out-of-state students?",
+    "Is on-campus housing guaranteed for freshmen?",
+    "What scholarships are available for transfer students?",
+    "Do you offer a nursing program?",
+]
+
+IDENTITY = {
+    "full_name": "Benchmark University",
+    "short_name": "BU",
+    "type": "university",
+    "forbidden_terms": [],
+    # Keep every passage so each query reaches generation
+    "relevanceThreshold": -1,
+}
+
+
+class GenerationReached(Exception):
+    pass
+
+
+def patch_io(identity_ms, models_ms):
+    def fetch_identity(company_key):
+        time.sleep(identity_ms / 1000)
+        return dict(IDENTITY)
+
+    def get_running_models():
+        time.sleep(models_ms / 1000)
+        return ["phi-3.1-mini-bench"]
+
+    def complete(*args, **kwargs):
+        raise GenerationReached()
+
+    chatbot.fetch_identity = fetch_identity
+    chatbot.get_running_models = get_running_models
+    chatbot.complete = complete
+
+
+def synthetic_index(dim, chunks, rng):
+    vectors = rng.normal(size=(chunks, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    index = faiss.IndexFlatIP(dim)
+    index.add(vectors)
+    texts = [f"Passage {i} about admissions, tuition and campus life." for i in range(chunks)]
+    urls = [f"https://bench.example.edu/page/{i // 10}" for i in range(chunks)]
+    return index, texts, urls
+
+
+def measure(embed_model, index, texts, urls, queries):
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        try:
+            chatbot.ask_bot(query, embed_model, index, texts, urls, "bench", use_faq=False)
+        except GenerationReached:
+            latencies.append((time.perf_counter() - start) * 1000)
+        else:
+            raise RuntimeError(f"'{query}' was answered without reaching generation")
+    latencies = np.array(latencies)
+    return {
+        "queries": len(latencies),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 2),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 2),
+        "mean_ms": round(float(latencies.mean()), 2),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--identity-ms", type=float, default=40, help="Simulated /customs round trip")
+    parser.add_argument("--models-ms", type=float, default=15, help="Simulated model listing round trip")
+    parser.add_argument("--chunks", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--out", help="Write results as JSON")
+    args = parser.parse_args()
+
+    patch_io(args.identity_ms, args.models_ms)
+    embed_model = chatbot.get_model()
+    dim = chatbot.encode_query(embed_model, "warm up").shape[1]
+    index, texts, urls = synthetic_index(dim, args.chunks, np.random.default_rng(0))
+    queries = [QUERIES[i % len(QUERIES)] for i in range(args.queries)]
+
+    results = {"identity_ms": args.identity_ms, "models_ms": args.models_ms, "chunks": args.chunks}
+    for name, parallel in (("sequential", False), ("concurrent", True)):
+        chatbot.PARALLEL_PREFETCH = parallel
+        # One untimed pass so thread start-up and encoder warm-up don't count
+        measure(embed_model, index, texts, urls, queries[:2])
+        results[name] = measure(embed_model, index, texts, urls, queries)
+        print(f"{name:>10}: p50 {results[name]['p50_ms']:.1f} ms, p95 {results[name]['p95_ms']:.1f} ms")
+
+    saved = results["sequential"]["p50_ms"] - results["concurrent"]["p50_ms"]
+    results["p50_saved_ms"] = round(saved, 2)
+    print(f"Pre-generation p50 reduced by {saved:.1f} ms")
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
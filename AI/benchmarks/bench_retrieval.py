@@ -0,0 +1,143 @@
+"""
+Retrieval quality and latency benchmark: dense vs BM25 vs hybrid (RRF).
+
+Queries are generated from the corpora themselves so no labels are needed:
+  - page queries: words from the URL slug (e.g. "financial aid"); relevant =
+    any chunk from that URL
+  - exact-term queries: a rare number/code token plus a neighbouring word;
+    relevant = chunks containing that token
+
+Usage:
+    python benchmarks/bench_retrieval.py --data-dir shared_data --k 5 --out results.json
+"""
+import os
+import re
+import sys
+import json
+import time
+import random
+import argparse
+import numpy as np
+import faiss
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from embed_index import load_chunks
+from knowledge import knowledge_path
+from bm25 import BM25Index, build_bm25, tokenize, reciprocal_rank_fusion
+from encoders import load_encoder
+
+
+def page_queries(texts, urls):
+    queries = []
+    for url in sorted(set(urls)):
+        slug = url.rstrip("/").rsplit("/", 1)[-1]
+        words = [w for w in re.split(r"[-_./]+", slug.lower()) if w.isalpha() and len(w) > 2]
+        if not words:
+            continue
+        relevant = {i for i, u in enumerate(urls) if u == url}
+        queries.append(("page", " ".join(words), relevant))
+    return queries
+
+
+def exact_term_queries(texts, rng, limit=30):
+    doc_tokens = [tokenize(t) for t in texts]
+    df = {}
+    for tokens in doc_tokens:
+        for token in set(tokens):
+            df[token] = df.get(token, 0) + 1
+
+    candidates = []
+    for doc_id, tokens in enumerate(doc_tokens):
+        for pos, token in enumerate(tokens):
+            if any(c.isdigit() for c in token) and df[token] <= 2 and pos > 0:
+                candidates.append((token, tokens[pos - 1]))
+    rng.shuffle(candidates)
+
+    queries, seen = [], set()
+    for token, neighbour in candidates:
+        if token in seen:
+            continue
+        seen.add(token)
+        relevant = {i for i, tokens in enumerate(doc_tokens) if token in tokens}
+        queries.append(("exact", f"{neighbour} {token}", relevant))
+        if len(queries) >= limit:
+            break
+    return queries
+
+
+def evaluate(name, retrieve, queries, k):
+    hits, rr, latencies = 0, 0.0, []
+    for _, query, relevant in queries:
+        start = time.perf_counter()
+        ids = retrieve(query)
+        latencies.append((time.perf_counter() - start) * 1000)
+        ranks = [rank for rank, doc_id in enumerate(ids[:k]) if doc_id in relevant]
+        if ranks:
+            hits += 1
+            rr += 1.0 / (ranks[0] + 1)
+    n = max(len(queries), 1)
+    return {
+        "retriever": name,
+        "queries": len(queries),
+        f"recall@{k}": hits / n,
+        f"mrr@{k}": rr / n,
+        "p50_ms": float(np.percentile(latencies, 50)) if latencies else 0.0,
+        "p95_ms": float(np.percentile(latencies, 95)) if latencies else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data-dir", default=os.getenv("SHARED_DATA_DIR", "/app/shared_data"))
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--candidates", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="Write results as JSON")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    model = load_encoder()
+    report = []
+
+    for company in sorted(os.listdir(args.data_dir)):
+        data_path = knowledge_path(os.path.join(args.data_dir, company))
+        if not os.path.isfile(data_path):
+            continue
+        texts, urls = load_chunks(data_path)
+        if not texts:
+            continue
+
+        embeddings = model.encode(texts)
+        index = faiss.IndexFlatL2(embeddings.shape[1])
+        index.add(np.array(embeddings))
+        bm25 = BM25Index(build_bm25(texts))
+
+        def dense(query, n=args.k):
+            _, I = index.search(np.array(model.encode([query])), n)
+            return [i for i in I[0].tolist() if i >= 0]
+
+        def lexical(query):
+            return bm25.search(query, args.k)[0]
+
+        def hybrid(query):
+            candidates = max(args.k, args.candidates)
+            return reciprocal_rank_fusion([dense(query, candidates), bm25.search(query, candidates)[0]], args.k)
+
+        for query_set in ("page", "exact"):
+            queries = page_queries(texts, urls) if query_set == "page" else exact_term_queries(texts, rng)
+            for name, retrieve in (("dense", dense), ("bm25", lexical), ("hybrid", hybrid)):
+                row = {"company": company, "query_set": query_set, **evaluate(name, retrieve, queries, args.k)}
+                report.append(row)
+                print(
+                    f"{company:>16} {query_set:>6} {name:>7} "
+                    f"recall@{args.k}={row[f'recall@{args.k}']:.2f} mrr={row[f'mrr@{args.k}']:.2f} "
+                    f"p50={row['p50_ms']:.1f}ms p95={row['p95_ms']:.1f}ms (n={row['queries']})"
+                )
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
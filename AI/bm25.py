@@ -0,0 +1,129 @@
+import os
+import re
+import json
+import math
+from collections import Counter, defaultdict
+import numpy as np
+
+# Keep tokens like "cs101", "$12,500", "3.5" and "2025-26" intact: exact matches
+# on codes, amounts and dates are what dense embeddings miss.
+TOKEN_RE = re.compile(r"\$?\d[\d,.\-/]*\d|\$?\d|[a-z0-9]+")
+
+# Includes the fragments contractions split into ("what's" -> "what", "s";
+# "don't" -> "don", "t") and the filler words of a chat question
+STOPWORDS = {
+    "a", "an", "the", "and", "or", "of", "to", "in", "on", "for", "is", "are",
+    "was", "be", "by", "with", "at", "as", "it", "this", "that", "from", "i",
+    "you", "we", "my", "your", "do", "does", "what", "how", "when", "where",
+    "s", "t", "d", "ll", "m", "re", "ve", "don", "can", "could", "would", "will",
+    "should", "did", "were", "been", "has", "have", "had", "me", "us", "our",
+    "they", "them", "their", "there", "who", "which", "why", "about", "like",
+    "if", "so", "not", "no", "any", "some", "all", "much", "many", "tell",
+    "please", "get", "know", "want", "need", "its", "am", "these", "those",
+}
+
+# get_context lets a BM25 hit skip the cosine floor only if it contains a
+# query term with a digit in it (a course code, amount or year) that is at
+# least this rare in the corpus; common words match nearly any question
+BM25_EXEMPT_MIN_IDF = float(os.getenv("BM25_EXEMPT_MIN_IDF", "1.5"))
+
+
+def tokenize(text):
+    tokens = []
+    for token in TOKEN_RE.findall(text.lower()):
+        token = token.replace(",", "")
+        if token and token not in STOPWORDS:
+            tokens.append(token)
+    return tokens
+
+
+def build_bm25(texts, k1=1.5, b=0.75):
+    """
+    Builds an inverted index over the chunk texts.
+    Returned dict is JSON-serializable and saved next to faiss.index.
+    """
+    postings = defaultdict(list)
+    doc_lens = []
+    for doc_id, text in enumerate(texts):
+        counts = Counter(tokenize(text))
+        doc_lens.append(sum(counts.values()))
+        for term, tf in counts.items():
+            postings[term].append([doc_id, tf])
+
+    return {
+        "k1": k1,
+        "b": b,
+        "doc_lens": doc_lens,
+        "postings": postings,
+    }
+
+
+def save_bm25(data, path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+
+
+class BM25Index:
+    def __init__(self, data):
+        self.k1 = data["k1"]
+        self.b = data["b"]
+        self.doc_lens = np.array(data["doc_lens"], dtype=np.float32)
+        self.n_docs = len(self.doc_lens)
+        avgdl = float(self.doc_lens.mean()) if self.n_docs else 0.0
+        # Per-document length normalisation is query-independent, so precompute it
+        self.norm = self.k1 * (1 - self.b + self.b * self.doc_lens / (avgdl or 1.0))
+
+        self.postings = {}
+        self.idf = {}
+        for term, plist in data["postings"].items():
+            arr = np.array(plist, dtype=np.int64)
+            self.postings[term] = (arr[:, 0], arr[:, 1].astype(np.float32))
+            df = len(plist)
+            self.idf[term] = math.log(1 + (self.n_docs - df + 0.5) / (df + 0.5))
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def search(self, query, k):
+        """Returns (doc_ids, scores) of the top-k documents, best first."""
+        scores = np.zeros(self.n_docs, dtype=np.float32)
+        for term in set(tokenize(query)):
+            if term not in self.postings:
+                continue
+            doc_ids, tfs = self.postings[term]
+            scores[doc_ids] += self.idf[term] * tfs * (self.k1 + 1) / (tfs + self.norm[doc_ids])
+
+        matched = np.flatnonzero(scores)
+        if matched.size == 0:
+            return [], []
+        k = min(k, matched.size)
+        top = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+        top = top[np.argsort(-scores[top])]
+        return top.tolist(), scores[top].tolist()
+
+    def code_matches(self, query, doc_ids, min_idf=BM25_EXEMPT_MIN_IDF):
+        """
+        The doc_ids, in order, that contain a query term with a digit in it
+        (cs101, $12500, 2025-26) whose idf is at least min_idf.
+        """
+        matched = set()
+        for term in set(tokenize(query)):
+            if any(c.isdigit() for c in term) and self.idf.get(term, 0.0) >= min_idf:
+                matched.update(self.postings[term][0].tolist())
+        return [doc_id for doc_id in doc_ids if doc_id in matched]
+
+
+def reciprocal_rank_fusion(rankings, k, rrf_k=60):
+    """
+    Fuses several best-first lists of doc IDs. Each list contributes
+    1 / (rrf_k + rank), so no score calibration between retrievers is needed.
+    """
+    fused = defaultdict(float)
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            if doc_id < 0:
+                continue
+            fused[doc_id] += 1.0 / (rrf_k + rank + 1)
+    return [doc_id for doc_id, _ in sorted(fused.items(), key=lambda x: -x[1])[:k]]
@@ -0,0 +1,67 @@
+"""
+Publishing a company's index build as one unit.
+
+embed_index.py swaps embeddings.npy, docs.bin, bm25.json and the index in
+one file at a time. A reader that lands between two swaps would pair a new
+docs.bin with an old faiss.index, and chunk IDs would point at the wrong
+passages. So the build ends by writing build.json, which records the size
+and mtime of every file it published.
+
+A reader loads the files and then checks them against the manifest. A
+mismatch means a build is mid-publish: keep serving the previous copy, or
+wait for the manifest to catch up. Builds from before the manifest have no
+build.json and are loaded file by file as before.
+"""
+import os
+import json
+import time
+
+MANIFEST_NAME = "build.json"
+# Everything a build writes into the company directory that queries read
+BUILD_FILES = ("embeddings.npy", "docs.bin", "bm25.json", "faiss.index", "shared_index.json")
+# How long a reader with nothing cached waits for a build to finish publishing
+MANIFEST_WAIT = float(os.getenv("MANIFEST_WAIT", "30"))
+MANIFEST_POLL_INTERVAL = 0.25
+
+
+def _stat(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def manifest_path(base_path):
+    return os.path.join(base_path, MANIFEST_NAME)
+
+
+def write_manifest(base_path):
+    """Records the build files now in base_path. Call once every file is in place."""
+    files = {}
+    for name in BUILD_FILES:
+        stat = _stat(os.path.join(base_path, name))
+        if stat is not None:
+            files[name] = stat
+    tmp_path = os.path.join(base_path, f".{MANIFEST_NAME}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"built_at": time.time(), "files": files}, f)
+    os.replace(tmp_path, manifest_path(base_path))
+
+
+def read_manifest(base_path):
+    """The published manifest, or None for a build that predates manifests."""
+    try:
+        with open(manifest_path(base_path), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def matches(base_path, manifest):
+    """True if the build files on disk are exactly the ones the manifest published."""
+    files = manifest.get("files", {})
+    return all(
+        _stat(os.path.join(base_path, name)) == files.get(name)
+        for name in BUILD_FILES
+    )
@@ -1,95 +1,316 @@
 import json
 import numpy as np
-import faiss
 import os
 import traceback
-from collections import defaultdict
-from sentence_transformers import SentenceTransformer
-import openai
-from fastapi import FastAPI, HTTPException, Query
+from collections import defaultdict, Counter
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import FastAPI, HTTPException, Query, Request, Response, BackgroundTasks
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import List
-from threading import Lock
+from typing import List, Optional
+from threading import Lock, Thread
 import requests
+import time
+from bm25 import BM25Index, reciprocal_rank_fusion
+from context_packer import pack_context, answer_token_limit, trim_context, estimate_tokens, CONTEXT_MIN_SIMILARITY, MIN_ANSWER_TOKENS
+from encoders import load_encoder, EMBED_BACKEND
+from docstore import DocStore
+import build_manifest
+from metrics import span, record_cache, trace_id_from, latest, CHAT_REQUESTS, PROMPT_TOKENS, COMPLETION_TOKENS, CONTEXT_PASSAGES
+from reranker import reranker, RERANK_CANDIDATES
+from sessions import sessions, SESSION_RECENT_TURNS, SUMMARY_MAX_TOKENS
+from knowledge import knowledge_path, iter_records
+import faq
+
+PROCESS_START = time.perf_counter()
 
 app = FastAPI()
 
-openai.api_key = "lm-studio"
-openai.api_base = "http://host.docker.internal:8888/v1"
+# Heavy dependencies (torch/onnxruntime, faiss, openai) are imported on first
+# use so the API port opens immediately; warm_up() loads them in the background.
+_openai = None
+model = None
+model_lock = Lock()
+
+# Per-phase startup timings (ms since process start / phase duration), see /readyz
+startup_phases = {}
+ready = False
+
+# Companies warmed at startup: WARM_COMPANIES, else the WARM_TOP_N most requested
+WARM_COMPANIES = [c for c in os.getenv("WARM_COMPANIES", "").split(",") if c]
+WARM_TOP_N = int(os.getenv("WARM_TOP_N", "5"))
+company_hits = Counter()
+
+def get_openai():
+    global _openai
+    if _openai is None:
+        import openai
+        openai.api_key = "lm-studio"
+        openai.api_base = LLM_API_BASE
+        _openai = openai
+    return _openai
 
-# Load SentenceTransformer
-try:
-    model = SentenceTransformer("all-MiniLM-L6-v2")
-except Exception as e:
-    print("Error loading SentenceTransformer model:")
-    traceback.print_exc()
-    raise RuntimeError("Failed to load embedding model")
+# Load embedding model (backend chosen by EMBED_BACKEND)
+def get_model():
+    global model
+    if model is None:
+        with model_lock:
+            if model is None:
+                try:
+                    model = load_encoder()
+                except Exception:
+                    print(f"Error loading embedding model ({EMBED_BACKEND} backend):")
+                    traceback.print_exc()
+                    raise RuntimeError("Failed to load embedding model")
+    return model
+
+DATA_ROOT = os.getenv("SHARED_DATA_DIR", "/app/shared_data")
+# LM Studio (OpenAI-compatible) and the backend serving /customs
+LLM_API_BASE = os.getenv("LLM_API_BASE", "http://host.docker.internal:8888/v1")
+BACKEND_URL = os.getenv("BACKEND_URL", "http://host.docker.internal:8000")
+# "hybrid" fuses BM25 and dense results; "dense" is FAISS only
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid")
+# Candidates pulled from each retriever before fusion
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "20"))
+# ask_bot fetches customs and lists models on this pool while it rewrites,
+# encodes and searches; PARALLEL_PREFETCH=0 runs them one after another
+PARALLEL_PREFETCH = os.getenv("PARALLEL_PREFETCH", "1") == "1"
+PREFETCH_WORKERS = int(os.getenv("PREFETCH_WORKERS", "32"))
+prefetch_pool = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix="prefetch")
+
+ACTIVITY_PATH = os.path.join(DATA_ROOT, ".company_activity.json")
 
 company_cache = {}
 queue_counts = defaultdict(int)
 queue_lock = Lock()
 
+# Returned without calling the LLM when no passage clears the relevance threshold
+NO_INFO_ANSWER = "I’m sorry, I don’t have that information."
+
+# How follow-ups in a session become retrieval queries:
+#   llm     ask the model for a standalone question (only for likely follow-ups)
+#   concat  prefix the previous question
+#   off     retrieve on the question as asked
+QUERY_REWRITE_MODE = os.getenv("QUERY_REWRITE_MODE", "llm")
+REWRITE_MAX_TOKENS = 64
+# Words that usually point back at an earlier turn
+FOLLOW_UP_WORDS = {
+    "it", "its", "that", "this", "those", "these", "they", "them", "their", "there",
+    "he", "she", "one", "ones", "also", "else", "more", "same", "other", "another",
+}
+
 # Input format
 class QueryModel(BaseModel):
     prompt: str
     company: str
+    # Omit to start a conversation; the response carries the ID to send next time
+    session_id: Optional[str] = None
 
-# Load cached company data
-def load_company_data(company):
-    if company in company_cache:
-        return company_cache[company]
+class StoredVectorsIndex:
+    """
+    A per-company FAISS index whose reconstruct() reads embeddings.npy.
+
+    pq, opq and pca indexes only keep compressed codes, so their reconstruct()
+    is an approximation, and cosine scores computed from it drift below the
+    relevance threshold. embeddings.npy holds the vectors as encoded (float16
+    by default) and is memory-mapped rather than read into RAM. Everything
+    else goes to the wrapped index.
+    """
+
+    def __init__(self, index, embeddings):
+        self.index = index
+        self.embeddings = embeddings
 
-    base_path = f"/app/shared_data/{company}"
+    def __getattr__(self, name):
+        return getattr(self.index, name)
+
+    def reconstruct(self, chunk_id):
+        return np.asarray(self.embeddings[chunk_id], dtype=np.float32)
+
+def _read_company_files(company, base_path, shared):
+    import faiss
     index_path = os.path.join(base_path, "faiss.index")
-    docs_path = os.path.join(base_path, "docs.json")
+    embeddings_path = os.path.join(base_path, "embeddings.npy")
+    docs_path = os.path.join(base_path, "docs.bin")
+    legacy_docs_path = os.path.join(base_path, "docs.json")
+    bm25_path = os.path.join(base_path, "bm25.json")
 
-    if not os.path.isfile(index_path):
-        raise FileNotFoundError(f"Missing FAISS index for company '{company}' at {index_path}")
-    if not os.path.isfile(docs_path):
-        raise FileNotFoundError(f"Missing docs.json for company '{company}' at {docs_path}")
+    if not os.path.isfile(docs_path) and not os.path.isfile(legacy_docs_path):
+        raise FileNotFoundError(f"Missing docs.bin for company '{company}' at {docs_path}")
 
     try:
-        index = faiss.read_index(index_path)
+        if shared:
+            import shared_index
+            index = shared_index.load_tenant_view(base_path)
+        else:
+            index = faiss.read_index(index_path)
     except Exception:
         traceback.print_exc()
         raise ValueError(f"Failed to load FAISS index for '{company}'")
 
+    # Built with EMBEDDINGS_DTYPE=none: similarities fall back to the index's own reconstruction
+    if not shared and os.path.isfile(embeddings_path):
+        try:
+            embeddings = np.load(embeddings_path, mmap_mode="r")
+            if embeddings.shape == (index.ntotal, index.d):
+                index = StoredVectorsIndex(index, embeddings)
+            else:
+                print(f"Ignoring {embeddings_path}: shape {embeddings.shape} doesn't match the index")
+        except Exception:
+            traceback.print_exc()
+
     try:
-        with open(docs_path, "r", encoding="utf-8") as f:
-            docs = json.load(f)
-        texts = docs["texts"]
-        urls = docs["urls"]
+        if os.path.isfile(docs_path):
+            store = DocStore(docs_path)
+            texts, urls = store.texts, store.urls
+        else:
+            # Built before docs.bin existed and not migrated yet
+            with open(legacy_docs_path, "r", encoding="utf-8") as f:
+                docs = json.load(f)
+            texts = docs["texts"]
+            urls = docs["urls"]
     except Exception:
         traceback.print_exc()
-        raise ValueError(f"Invalid or malformed docs.json for '{company}'")
+        raise ValueError(f"Invalid or malformed passage store for '{company}'")
+
+    # Indexes built before hybrid retrieval have no bm25.json; fall back to dense only
+    bm25 = None
+    if os.path.isfile(bm25_path):
+        try:
+            bm25 = BM25Index.load(bm25_path)
+        except Exception:
+            traceback.print_exc()
+
+    return index, texts, urls, bm25
+
+# Load cached company data
+def load_company_data(company):
+    base_path = os.path.join(DATA_ROOT, company)
+    index_path = os.path.join(base_path, "faiss.index")
+    marker_path = os.path.join(base_path, "shared_index.json")
+    deadline = time.monotonic() + build_manifest.MANIFEST_WAIT
+
+    while True:
+        # Built with INDEX_LAYOUT=shared: the vectors live in the shared index
+        shared = not os.path.isfile(index_path) and os.path.isfile(marker_path)
+        if not shared and not os.path.isfile(index_path):
+            raise FileNotFoundError(f"Missing FAISS index for company '{company}' at {index_path}")
+
+        # Indexes are rebuilt in the background after startup; reload when a new
+        # build is published. Any company's build rewrites the shared index, so
+        # its mtime counts too.
+        if shared:
+            import shared_index
+            index_mtime = (os.path.getmtime(marker_path), os.path.getmtime(shared_index.SHARED_INDEX_PATH))
+        else:
+            index_mtime = os.path.getmtime(index_path)
+        manifest_file = build_manifest.manifest_path(base_path)
+        build_key = (os.path.getmtime(manifest_file) if os.path.isfile(manifest_file) else None, index_mtime)
+        cached = company_cache.get(company)
+        record_cache("company_index", bool(cached and cached[0] == build_key))
+        if cached and cached[0] == build_key:
+            return cached[1]
+
+        # The files must all come from the build the manifest published; checked
+        # before loading and again after, in case a rebuild swapped one meanwhile
+        manifest = build_manifest.read_manifest(base_path)
+        if manifest is None or build_manifest.matches(base_path, manifest):
+            data = _read_company_files(company, base_path, shared)
+            if manifest is None or build_manifest.matches(base_path, manifest):
+                company_cache[company] = (build_key, data)
+                return data
 
-    company_cache[company] = (index, texts, urls)
-    return index, texts, urls
+        # A build is mid-publish: the previous one is still consistent
+        if cached:
+            return cached[1]
+        if time.monotonic() > deadline:
+            raise ValueError(f"Index build for '{company}' is incomplete; rebuild it with embed_index.py")
+        time.sleep(build_manifest.MANIFEST_POLL_INTERVAL)
 
-# Get top-k FAISS matches
-def get_context(query, k, model, index, texts, urls):
+# Candidates fused from the retrievers: enough for deduplication and the
+# similarity floor to still leave k passages, or for the reranker to pick from
+def fused_candidates(k):
+    return max(k * 2, RERANK_CANDIDATES) if reranker is not None else k * 2
+
+# FAISS results get_context needs for k passages
+def dense_candidates(k, bm25=None):
+    hybrid = bm25 is not None and RETRIEVAL_MODE == "hybrid"
+    return max(fused_candidates(k), HYBRID_CANDIDATES) if hybrid else fused_candidates(k)
+
+def encode_query(model, query):
+    # Cosine retrieval on inner-product indexes; L2 indexes built earlier
+    # rank unit vectors identically
+    query_embedding = np.array(model.encode([query]), dtype=np.float32)
+    return query_embedding / np.maximum(np.linalg.norm(query_embedding, axis=1, keepdims=True), 1e-12)
+
+# Get top-k FAISS matches, packed into the context token budget
+# timings, if given, receives encode/search/bm25/pack stage durations (ms)
+# query_embedding, if given, is encode_query(model, query) computed by the caller;
+# dense_ids, if given, are its FAISS results (at least dense_candidates(k, bm25) of them)
+def get_context(query, k, model, index, texts, urls, sources=None, bm25=None, min_similarity=CONTEXT_MIN_SIMILARITY, timings=None, query_embedding=None, dense_ids=None):
+    hybrid = bm25 is not None and RETRIEVAL_MODE == "hybrid"
+    n_candidates = fused_candidates(k)
     try:
-        query_embedding = model.encode([query])
-        D, I = index.search(np.array(query_embedding), k)
+        if query_embedding is None:
+            with span("encode", timings):
+                query_embedding = encode_query(model, query)
+        if dense_ids is None:
+            with span("search", timings):
+                D, I = index.search(query_embedding, dense_candidates(k, bm25))
+            dense_ids = I[0].tolist()
     except Exception:
         traceback.print_exc()
         raise RuntimeError("Failed to retrieve context from FAISS")
 
-    results = []
-    for i in I[0]:
-        try:
-            source = urls[i]
-            passage = texts[i]
-            results.append(f"[{source}]\n{passage}")
-        except IndexError:
+    # BM25 hits sharing a rare code, amount or year with the question match it
+    # exactly even when their embeddings aren't close, so the floor skips them.
+    # Other lexical hits (on "about", "like", ...) must clear it like any passage.
+    exempt = set()
+    if hybrid:
+        with span("bm25", timings):
+            lexical_ids, _ = bm25.search(query, HYBRID_CANDIDATES)
+            ids = reciprocal_rank_fusion([dense_ids, lexical_ids], n_candidates)
+        exempt.update(bm25.code_matches(query, lexical_ids[:k]))
+    else:
+        ids = dense_ids[:n_candidates]
+
+    valid_ids = []
+    for i in ids:
+        if 0 <= i < len(texts) and i < len(urls):
+            valid_ids.append(i)
+        else:
             print(f"Index {i} out of range")
-            continue
-    return "\n\n".join(results)
+
+    # Optional cross-encoder pass: reorders candidates and picks how many to ship
+    max_passages = k
+    if reranker is not None:
+        with span("rerank", timings):
+            reranked, _ = reranker.rerank(query, valid_ids, texts, k)
+        if reranked:
+            valid_ids, max_passages = reranked, len(reranked)
+            # Each cleared RERANK_MIN_SCORE, the stronger relevance signal;
+            # a bi-encoder cosine floor would only second-guess it
+            exempt.update(reranked)
+        else:
+            # Skipped, failed, or nothing cleared RERANK_MIN_SCORE: fused order,
+            # and only the similarity floor decides what is relevant
+            valid_ids = valid_ids[:k * 2]
+
+    with span("pack", timings):
+        vectors = np.array([index.reconstruct(int(i)) for i in valid_ids]).reshape(len(valid_ids), -1)
+        context, packed_sources = pack_context(
+            valid_ids, query_embedding[0], vectors, texts, urls, max_passages=max_passages,
+            min_similarity=min_similarity, exempt=exempt
+        )
+    CONTEXT_PASSAGES.observe(len(packed_sources))
+    if sources is not None:
+        sources.extend(packed_sources)
+    return context
 
 # Get all running chatbot models
 def get_running_models():
     try:
-        models = openai.Model.list()
+        models = get_openai().Model.list()
         return [m["id"] for m in models["data"] if m["id"].startswith("phi-3.1-mini")]
     except Exception:
         traceback.print_exc()
@@ -108,20 +329,174 @@ def release_model(model_id):
     with queue_lock:
         queue_counts[model_id] = max(0, queue_counts[model_id] - 1)
 
-# Generate response using chatbot model
-def ask_bot(question, embed_model, index, texts, urls, company_key):
-    # Fetch identity data from backend
+# One completion on the least-loaded model; returns (text, model, usage)
+# The call is timed as `stage`; timings, if given, also receives model_list (ms)
+# models, if given, is a get_running_models() result the caller already has
+def complete(prompt, max_tokens, company_key, temperature=0.2, timings=None, stage="generation", models=None):
+    if models is None:
+        with span("model_list", timings):
+            models = get_running_models()
+    if not models:
+        raise RuntimeError("No chatbot models are running")
+
+    chosen_model = get_least_loaded_model(models)
+    try:
+        with span(stage, timings):
+            response = get_openai().ChatCompletion.create(
+                model=chosen_model,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=temperature,
+                max_tokens=max_tokens
+            )
+        text = response["choices"][0]["message"]["content"].strip()
+    finally:
+        release_model(chosen_model)
+
+    # LM Studio reports usage; estimate if a server doesn't
+    usage = response.get("usage") or {}
+    prompt_tokens = usage.get("prompt_tokens") or estimate_tokens(prompt)
+    completion_tokens = usage.get("completion_tokens") or estimate_tokens(text)
+    PROMPT_TOKENS.labels(company=company_key, model=chosen_model).inc(prompt_tokens)
+    COMPLETION_TOKENS.labels(company=company_key, model=chosen_model).inc(completion_tokens)
+    return text, chosen_model, {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens}
+
+def is_follow_up(question):
+    words = [w.strip(".,!?;:'\"").lower() for w in question.split()]
+    # Keyed on pronouns and pointing words only: "What majors do you offer?"
+    # is short but standalone, and rewriting it would cost an LLM call
+    return any(w in FOLLOW_UP_WORDS for w in words)
+
+# Follow-ups like "how much does it cost?" retrieve nothing useful on their own
+def rewrite_query(question, session, company_key):
+    if session is None or not session.turns or QUERY_REWRITE_MODE == "off" or not is_follow_up(question):
+        return question
+
+    last_question = session.turns[-1][0]
+    if QUERY_REWRITE_MODE == "llm":
+        prompt = (
+            f"{session.history_block()}\n\n"
+            f"Rewrite the student's next message as one standalone question that can be understood "
+            f"without the conversation above. Replace pronouns with what they refer to. "
+            f"Reply with the question only.\n\n"
+            f"Next message: {question}\n"
+            f"Standalone question:"
+        )
+        try:
+            rewritten, _, _ = complete(prompt, REWRITE_MAX_TOKENS, company_key, temperature=0, stage="rewrite_generation")
+            rewritten = rewritten.strip().strip('"').splitlines()[0] if rewritten.strip() else ""
+            if rewritten:
+                return rewritten
+        except Exception as e:
+            print(f"Query rewrite failed, falling back to concatenation: {e}")
+    return f"{last_question} {question}"
+
+# Folds turns older than SESSION_RECENT_TURNS into the session's rolling summary.
+# Runs after the response is sent.
+def summarize_session(session, company_key):
+    # Snapshot under the lock and call the model without it, so the student's
+    # next turn isn't held up behind the summary
+    with session.lock:
+        if session.summarizing or not session.needs_summary():
+            return
+        session.summarizing = True
+        folded = len(session.turns) - SESSION_RECENT_TURNS
+        old_turns = session.turns[:folded]
+        previous_summary = session.summary
+
+    summary = previous_summary
+    try:
+        transcript = "\n".join(f"Student: {q}\nAssistant: {a}" for q, a in old_turns)
+        prompt = (
+            f"Summarize this admissions chat so far in a few sentences. Keep the facts the assistant "
+            f"gave and what the student wants to know; drop greetings and filler.\n\n"
+            f"Earlier summary: {previous_summary or '(none)'}\n\n"
+            f"New exchanges:\n{transcript}\n\n"
+            f"Summary:"
+        )
+        try:
+            summary, _, _ = complete(prompt, SUMMARY_MAX_TOKENS, company_key, temperature=0, stage="summary_generation")
+        except Exception as e:
+            # Keep the history bounded even without the model: the most recent text wins
+            print(f"Summarizing session {session.id} failed, truncating instead: {e}")
+            summary = f"{previous_summary} {transcript}"[-SUMMARY_MAX_TOKENS * 4:]
+    finally:
+        with session.lock:
+            session.summary = summary.strip()
+            # Only the snapshotted turns were summarized; any added meanwhile stay verbatim
+            del session.turns[:folded]
+            session.summarizing = False
+
+# Runs independent zero-argument calls and returns their results in order: the
+# first on this thread, the rest on prefetch_pool. If any raises, calls that
+# haven't started are cancelled and the first error (in call order) propagates.
+def run_concurrently(*calls):
+    if not PARALLEL_PREFETCH:
+        return [call() for call in calls]
+    futures = [prefetch_pool.submit(call) for call in calls[1:]]
+    try:
+        return [calls[0]()] + [future.result() for future in futures]
+    finally:
+        for future in futures:
+            future.cancel()
+
+# Fetch identity data (customs) from backend
+def fetch_identity(company_key):
     try:
         response = requests.get(
-            "http://host.docker.internal:8000/customs",
+            f"{BACKEND_URL}/customs",
             params={"company": company_key}
         )
         response.raise_for_status()
-        identity_data = response.json()["data"]
+        return response.json()["data"]
     except Exception as e:
         print(f"Failed to retrieve identity data for {company_key}: {e}")
         raise RuntimeError(f"Could not fetch school identity from backend for {company_key}")
 
+# Generate response using chatbot model
+# trace, if given, is filled with the model, sources and per-stage timings (ms)
+# session, if given, supplies conversation history and records this exchange
+# use_faq=False skips the pre-computed answers (used when generating them)
+# identity_data, query_embedding and dense_ids let batch callers (batch_chat.py)
+# fetch customs once per company and encode/search many questions at a time
+def ask_bot(question, embed_model, index, texts, urls, company_key, trace=None, bm25=None, session=None, use_faq=True,
+            identity_data=None, query_embedding=None, dense_ids=None):
+    if trace is None:
+        trace = {}
+    timings = trace.setdefault("timings", {})
+
+    # Rewrite/encode/search, the customs fetch and model discovery don't depend
+    # on each other; overlapped, they cost the slowest of the three
+    def retrieve():
+        with span("rewrite", timings):
+            retrieval_query = rewrite_query(question, session, company_key)
+        embedding, ids = query_embedding, dense_ids
+        if embedding is None or retrieval_query != question:
+            try:
+                with span("encode", timings):
+                    embedding = encode_query(embed_model, retrieval_query)
+                with span("search", timings):
+                    _, I = index.search(embedding, dense_candidates(5, bm25))
+            except Exception:
+                traceback.print_exc()
+                raise RuntimeError("Failed to retrieve context from FAISS")
+            ids = I[0].tolist()
+        return retrieval_query, embedding, ids
+
+    def identity():
+        if identity_data is not None:
+            return identity_data
+        with span("identity", timings):
+            return fetch_identity(company_key)
+
+    def list_models():
+        with span("model_list", timings):
+            return get_running_models()
+
+    with span("prefetch", timings):
+        (retrieval_query, query_embedding, dense_ids), identity_data, models = run_concurrently(
+            retrieve, identity, list_models
+        )
+
     # Extract data fields
     name = identity_data.get("full_name", "this institution")
     short_name = identity_data.get("short_name", "the institution")
@@ -132,6 +507,11 @@ def ask_bot(question, embed_model, index, texts, urls, company_key):
     humor = identity_data.get("humor")
     formality = identity_data.get("formality")
     technical_level = identity_data.get("technicalLevel")
+    verbosity = identity_data.get("verbosity")
+    try:
+        relevance_threshold = float(identity_data.get("relevanceThreshold", CONTEXT_MIN_SIMILARITY))
+    except (TypeError, ValueError):
+        relevance_threshold = CONTEXT_MIN_SIMILARITY
     preferred_greeting = identity_data.get("preferredGreeting")
     signature_closing = identity_data.get("signatureClosing")
 
@@ -144,72 +524,266 @@ def ask_bot(question, embed_model, index, texts, urls, company_key):
         extra_style += f"End with: {signature_closing}. "
 
     # Get context
-    context = get_context(question, k=5, model=embed_model, index=index, texts=texts, urls=urls)
+    if retrieval_query != question:
+        trace["retrieval_query"] = retrieval_query
+    sources = trace.setdefault("sources", [])
 
-    # Build prompt
-    prompt = (
-        f"You are a professional and helpful admissions assistant operating in a text-based chat. "
-        f"You represent the admissions office for {name}. "
-        f"Always refer to this institution as “{short_name}” or “the {school_type}.” "
-        f"Never use the following terms: {forbidden_terms}. "
-        f"You must only use the information that is explicitly provided to you in the dataset below. "
-        f"Do not use any other knowledge you might have or pull information from outside sources. "
-        f"When you present information to the user, remove any escape characters like backslashes, "
-        f"website-specific formatting indicators like “\\n” or extra symbols, and other clutter. "
-        f"Rephrase information so that it is clear, easy to understand, and conversational, as if you are speaking directly to the user. "
-        f"If a question asks about something that is not included in the data, respond by saying: "
-        f"“I’m sorry, I don’t have that information.” "
-        f"If a user asks what you can help with, explain by saying: "
-        f"“I can answer questions related to admissions and any topics included in the information provided to me. "
-        f"If you’re looking for information that’s not covered here, I’ll let you know the best way to find it.” "
-        f"If a question is completely off-topic and unrelated to the provided data, respond by saying: "
-        f"“I’m sorry, I can’t help you with that.” "
-        f"{instructions} {extra_style} "
-        f"You must follow these instructions exactly and without exception. "
-        f"The dataset begins below, and you must use only that data to answer questions.\n\n"
-        f"Information:\n{context}\n\n"
-        f"Question: {question}\n"
-        f"Answer:"
-    )
+    # Common questions were answered offline (faq.py)
+    if use_faq:
+        with span("faq", timings):
+            hit = faq.lookup(company_key, query_embedding, identity_data)
+        if hit:
+            trace["faq"] = True
+            trace["model"] = hit["model"]
+            sources.extend(hit["sources"])
+            if session is not None:
+                session.add_turn(question, hit["answer"])
+            return hit["answer"]
 
-    # Send to LM Studio
-    models = get_running_models()
-    if not models:
-        raise RuntimeError("No chatbot models are running")
+    with span("retrieval", timings):
+        context = get_context(
+            retrieval_query, k=5, model=embed_model, index=index, texts=texts, urls=urls,
+            sources=sources, bm25=bm25, min_similarity=relevance_threshold, timings=timings,
+            query_embedding=query_embedding, dense_ids=dense_ids
+        )
 
-    chosen_model = get_least_loaded_model(models)
+    history = session.history_block() if session is not None else ""
+    history_section = (
+        f"Conversation so far (use it to understand the question and stay consistent with earlier answers; "
+        f"facts must still come from the information below):\n{history}\n\n"
+    ) if history else ""
 
-    try:
-        response = openai.ChatCompletion.create(
-            model=chosen_model,
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.2,
-            max_tokens=9000
+    # Build prompt
+    def build_prompt(context):
+        return (
+            f"You are a professional and helpful admissions assistant operating in a text-based chat. "
+            f"You represent the admissions office for {name}. "
+            f"Always refer to this institution as “{short_name}” or “the {school_type}.” "
+            f"Never use the following terms: {forbidden_terms}. "
+            f"You must only use the information that is explicitly provided to you in the dataset below. "
+            f"Do not use any other knowledge you might have or pull information from outside sources. "
+            f"When you present information to the user, remove any escape characters like backslashes, "
+            f"website-specific formatting indicators like “\\n” or extra symbols, and other clutter. "
+            f"Rephrase information so that it is clear, easy to understand, and conversational, as if you are speaking directly to the user. "
+            f"If a question asks about something that is not included in the data, respond by saying: "
+            f"“I’m sorry, I don’t have that information.” "
+            f"If a user asks what you can help with, explain by saying: "
+            f"“I can answer questions related to admissions and any topics included in the information provided to me. "
+            f"If you’re looking for information that’s not covered here, I’ll let you know the best way to find it.” "
+            f"If a question is completely off-topic and unrelated to the provided data, respond by saying: "
+            f"“I’m sorry, I can’t help you with that.” "
+            f"{instructions} {extra_style} "
+            f"You must follow these instructions exactly and without exception. "
+            f"The dataset begins below, and you must use only that data to answer questions.\n\n"
+            f"{history_section}"
+            f"Information:\n{context}\n\n"
+            f"Question: {question}\n"
+            f"Answer:"
         )
-        return response["choices"][0]["message"]["content"].strip()
-    finally:
-        release_model(chosen_model)
+
+    with span("prompt_build", timings):
+        prompt = build_prompt(context)
+        max_tokens = answer_token_limit(prompt, verbosity)
+        if max_tokens < MIN_ANSWER_TOKENS:
+            # Long history and instructions left too little room to answer:
+            # give up the tail of the context rather than truncate the answer
+            context = trim_context(context, MIN_ANSWER_TOKENS - max_tokens)
+            if context:
+                prompt = build_prompt(context)
+                max_tokens = answer_token_limit(prompt, verbosity)
+
+    # Nothing relevant (or no room left for it): answer as the prompt would
+    # instruct, without a generation
+    if not context or max_tokens <= 0:
+        trace["short_circuit"] = True
+        if session is not None:
+            session.add_turn(question, NO_INFO_ANSWER)
+        return NO_INFO_ANSWER
+
+    # Send to LM Studio
+    answer, trace["model"], trace["usage"] = complete(prompt, max_tokens, company_key, timings=timings, models=models)
+    if session is not None:
+        session.add_turn(question, answer)
+    return answer
+
+# Stamp arrival so /chat can report time spent waiting for a worker thread
+@app.middleware("http")
+async def record_arrival(request: Request, call_next):
+    request.state.received_at = time.perf_counter()
+    return await call_next(request)
 
 # FastAPI endpoints
 @app.post("/chat")
-def chat(query: QueryModel):
+def chat(query: QueryModel, request: Request, background_tasks: BackgroundTasks):
+    trace_id = trace_id_from(request.headers.get("traceparent"))
+    trace = {"timings": {}}
+    timings = trace["timings"]
+    timings["queue_ms"] = (time.perf_counter() - request.state.received_at) * 1000
+    outcome = "error"
+    # Label unknown companies as such so arbitrary input can't grow the label set
+    company_label = "unknown"
     try:
-        index, texts, urls = load_company_data(query.company)
-        answer = ask_bot(query.prompt, model, index, texts, urls, query.company)
-        return {"response": answer}
+        with span("total", timings):
+            index, texts, urls, bm25 = load_company_data(query.company)
+            company_label = query.company
+            company_hits[query.company] += 1
+            session, _ = sessions.get_or_create(query.session_id, query.company)
+            # One turn at a time per session, so history stays in order
+            with session.lock:
+                answer = ask_bot(
+                    query.prompt, get_model(), index, texts, urls, query.company,
+                    trace=trace, bm25=bm25, session=session
+                )
+            if session.needs_summary():
+                background_tasks.add_task(summarize_session, session, query.company)
+        if trace.get("faq"):
+            outcome = "faq"
+        elif trace.get("short_circuit"):
+            outcome = "no_context"
+        else:
+            outcome = "answered"
+        return {
+            "response": answer,
+            "session_id": session.id,
+            "model": trace.get("model"),
+            "sources": trace.get("sources", []),
+            "timings": timings,
+            "usage": trace.get("usage"),
+            "trace_id": trace_id,
+        }
     except FileNotFoundError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=422, detail=str(e))
     except RuntimeError as e:
         raise HTTPException(status_code=500, detail=str(e))
-    except Exception:
+    except Exception as e:
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
+    finally:
+        CHAT_REQUESTS.labels(company=company_label, model=trace.get("model") or "none", outcome=outcome).inc()
+        stages = " ".join(f"{k}={v:.1f}" for k, v in timings.items())
+        print(f"trace_id={trace_id} company={query.company} outcome={outcome} {stages}")
+
+# Bulk evaluation: JSONL of {company, prompt} in, JSONL results streamed out (see batch_chat.py)
+@app.post("/chat/batch")
+async def chat_batch(request: Request, use_faq: bool = Query(True)):
+    import batch_chat
+    # Read line by line so an oversized batch is refused before it is all in memory
+    lines, pending, items = [], b"", 0
+    async for chunk in request.stream():
+        *complete_lines, pending = (pending + chunk).split(b"\n")
+        lines.extend(complete_lines)
+        items += sum(1 for line in complete_lines if line.strip())
+        if items + bool(pending.strip()) > batch_chat.BATCH_MAX_ITEMS:
+            raise HTTPException(
+                status_code=413, detail=f"Batch too large: at most {batch_chat.BATCH_MAX_ITEMS} questions per request"
+            )
+    lines.append(pending)
+    parsed = batch_chat.parse_jsonl(lines)
+    results = batch_chat.run_batch(parsed, use_faq=use_faq)
+    return StreamingResponse(
+        (json.dumps(result, ensure_ascii=False) + "\n" for result in results),
+        media_type="application/x-ndjson"
+    )
+
+# Prometheus scrape endpoint
+@app.get("/metrics")
+def metrics():
+    body, content_type = latest()
+    return Response(content=body, media_type=content_type)
+
+def _record_phase(name, started):
+    startup_phases[name] = {
+        "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+        "at_ms": round((time.perf_counter() - PROCESS_START) * 1000, 1),
+    }
+
+def warm_companies():
+    if WARM_COMPANIES:
+        return WARM_COMPANIES
+    try:
+        with open(ACTIVITY_PATH, "r", encoding="utf-8") as f:
+            activity = json.load(f)
+        return [c for c, _ in Counter(activity).most_common(WARM_TOP_N)]
+    except (OSError, ValueError):
+        return []
+
+def warm_up():
+    global ready
+    try:
+        started = time.perf_counter()
+        get_model()
+        _record_phase("encoder_load", started)
+
+        # First inference pays for graph optimisation / allocator warm-up
+        started = time.perf_counter()
+        get_model().encode(["warm up"])
+        _record_phase("encoder_warm", started)
+
+        # The encoder is all a request needs; companies below load lazily otherwise
+        ready = True
+
+        if reranker is not None:
+            started = time.perf_counter()
+            reranker.load()
+            _record_phase("reranker_load", started)
+
+        started = time.perf_counter()
+        get_openai()
+        _record_phase("openai_import", started)
+
+        for company in warm_companies():
+            started = time.perf_counter()
+            try:
+                load_company_data(company)
+                _record_phase(f"company:{company}", started)
+            except Exception as e:
+                print(f"Skipping warm-up for {company}: {e}")
+    except Exception:
+        traceback.print_exc()
+
+@app.on_event("startup")
+def start_warm_up():
+    startup_phases["api_up"] = {"duration_ms": 0.0, "at_ms": round((time.perf_counter() - PROCESS_START) * 1000, 1)}
+    Thread(target=warm_up, name="warm-up", daemon=True).start()
+
+@app.on_event("shutdown")
+def save_activity():
+    # Merge this replica's request counts so the next start warms the busiest companies
+    try:
+        try:
+            with open(ACTIVITY_PATH, "r", encoding="utf-8") as f:
+                activity = Counter(json.load(f))
+        except (OSError, ValueError):
+            activity = Counter()
+        activity.update(company_hits)
+        tmp_path = f"{ACTIVITY_PATH}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(dict(activity), f)
+        os.replace(tmp_path, ACTIVITY_PATH)
+    except OSError:
+        traceback.print_exc()
+
+# Liveness: the process is up and serving HTTP
+@app.get("/healthz")
+def healthz():
+    return {"status": "ok"}
+
+# Readiness: the encoder is loaded and warm, so /chat won't stall on startup work
+@app.get("/readyz")
+def readyz():
+    body = {
+        "ready": ready,
+        # The warm-up thread adds entries while this runs
+        "warm_companies": sorted(company for company, _ in list(company_cache.items())),
+        "startup_phases": startup_phases,
+    }
+    return JSONResponse(status_code=200 if ready else 503, content=body)
 
 @app.get("/chat")
 def get_chat():
-    url = "http://host.docker.internal:8888/v1/models"
+    url = f"{LLM_API_BASE}/models"
     resp = requests.get(url)
     resp.raise_for_status()
     return resp.json()
@@ -221,12 +795,11 @@ def get_custom(company: str = Query(...)):
     Returns the knowledge data for a given company.
     """
     
-    identity_path = f"/app/shared_data/{company}/college_knowledge.json"
+    identity_path = knowledge_path(os.path.join(DATA_ROOT, company))
     if not os.path.isfile(identity_path):
         raise HTTPException(status_code=404, detail="Company knowledge not found")
     try:
-        with open(identity_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
+        data = list(iter_records(identity_path))
         return {"data": data}
     except Exception as e:
         traceback.print_exc()
@@ -0,0 +1,122 @@
+import os
+import numpy as np
+
+# Token budget for retrieved passages in the prompt
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500"))
+# Passages less similar than this (cosine) to the question are dropped.
+# Companies can override it with relevanceThreshold in their customs.
+CONTEXT_MIN_SIMILARITY = float(os.getenv("CONTEXT_MIN_SIMILARITY", "0.2"))
+# Passages at least this similar to an already selected one are treated as duplicates
+CONTEXT_DUPLICATE_SIMILARITY = float(os.getenv("CONTEXT_DUPLICATE_SIMILARITY", "0.95"))
+# Don't bother appending a truncated passage shorter than this
+MIN_PASSAGE_TOKENS = 50
+
+# Generation budget
+MODEL_CONTEXT_WINDOW = int(os.getenv("MODEL_CONTEXT_WINDOW", "4096"))
+MIN_ANSWER_TOKENS = 128
+MAX_ANSWER_TOKENS = int(os.getenv("MAX_ANSWER_TOKENS", "1024"))
+# Headroom for chat template tokens and tokenizer mismatch
+CONTEXT_SAFETY_MARGIN = 64
+
+
+def estimate_tokens(text):
+    # LM Studio doesn't expose the model tokenizer; ~4 characters per token
+    # is close enough for English text to size budgets.
+    return len(text) // 4 + 1
+
+
+def _normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def pack_context(ids, query_vector, vectors, texts, urls, max_passages, token_budget=CONTEXT_TOKEN_BUDGET, min_similarity=CONTEXT_MIN_SIMILARITY, exempt=()):
+    """
+    Turns ranked candidate IDs into the context block for the prompt.
+
+    Drops candidates below the similarity floor, skips near-duplicates of
+    passages already chosen, merges chunks that are adjacent in the same page,
+    and stops once the token budget is used. `vectors` holds the embedding for
+    each candidate in `ids`. IDs in `exempt` skip the similarity floor: they
+    were chosen on other evidence, such as an exact keyword match, that cosine
+    similarity doesn't reflect. Returns (context, sources); context is empty
+    when nothing clears min_similarity.
+    """
+    if len(ids) == 0:
+        return "", []
+
+    query_vector = _normalize(query_vector).reshape(-1)
+    vectors = _normalize(vectors)
+    similarities = vectors @ query_vector
+
+    chosen = []
+    for position, doc_id in enumerate(ids):
+        if similarities[position] < min_similarity and doc_id not in exempt:
+            continue
+        if any(float(vectors[position] @ vectors[other]) >= CONTEXT_DUPLICATE_SIMILARITY for other, _ in chosen):
+            continue
+        if any(texts[doc_id] == texts[other_id] for _, other_id in chosen):
+            continue
+        chosen.append((position, doc_id))
+        if len(chosen) >= max_passages:
+            break
+
+    # Chunks of one page are stored consecutively, so neighbouring IDs with the
+    # same URL are contiguous text: emit them as one passage, in page order.
+    groups = []
+    for _, doc_id in chosen:
+        for group in groups:
+            if urls[group[0]] == urls[doc_id] and (doc_id == group[0] - 1 or doc_id == group[-1] + 1):
+                group.append(doc_id)
+                group.sort()
+                break
+        else:
+            groups.append([doc_id])
+
+    results, sources = [], []
+    remaining = token_budget
+    for group in groups:
+        source = urls[group[0]]
+        passage = "".join(texts[doc_id] for doc_id in group)
+        header = f"[{source}]\n"
+        cost = estimate_tokens(header + passage)
+        if cost > remaining:
+            available = remaining - estimate_tokens(header)
+            if available < MIN_PASSAGE_TOKENS:
+                break
+            passage = passage[:available * 4]
+            cost = remaining
+        results.append(header + passage)
+        sources.append(source)
+        remaining -= cost
+
+    return "\n\n".join(results), sources
+
+
+def answer_token_limit(prompt, verbosity=None):
+    """
+    max_tokens for the completion: what the company's verbosity setting
+    (0-100) asks for, capped by what is left of the model's context window.
+    Below MIN_ANSWER_TOKENS (0 when the prompt fills the window) the caller
+    should trim the context with trim_context rather than send it.
+    """
+    try:
+        verbosity = min(max(int(verbosity), 0), 100)
+    except (TypeError, ValueError):
+        verbosity = 50
+
+    wanted = MIN_ANSWER_TOKENS + (MAX_ANSWER_TOKENS - MIN_ANSWER_TOKENS) * verbosity // 100
+    available = MODEL_CONTEXT_WINDOW - estimate_tokens(prompt) - CONTEXT_SAFETY_MARGIN
+    return max(0, min(wanted, available))
+
+
+def trim_context(context, tokens):
+    """
+    context shortened by about `tokens` tokens from the end, or "" when what
+    would be left is shorter than MIN_PASSAGE_TOKENS.
+    """
+    keep = len(context) - tokens * 4
+    if keep < MIN_PASSAGE_TOKENS * 4:
+        return ""
+    return context[:keep]
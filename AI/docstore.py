@@ -0,0 +1,170 @@
+"""
+Compact passage store replacing docs.json.
+
+docs.bin layout (little endian):
+    header   magic "SFTDOCS1", n_docs, n_urls, urls_size (uint64 each)
+    offsets  uint64[n_docs + 1]   byte offsets of each passage in the blob
+    url_ids  uint32[n_docs]       index into the URL table, padded to 8 bytes
+    urls     UTF-8 JSON list of distinct URLs (urls_size bytes)
+    blob     concatenated UTF-8 passage texts
+
+The file is mmapped and passages are decoded on access, so loading costs
+nothing proportional to corpus size and lookup by FAISS ID is O(1).
+
+Convert existing builds with:
+    python docstore.py --migrate --all
+"""
+import os
+import json
+import mmap
+import struct
+import tempfile
+import argparse
+import numpy as np
+
+MAGIC = b"SFTDOCS1"
+HEADER = struct.Struct("<8sQQQ")
+
+
+def _pad8(size):
+    return (8 - size % 8) % 8
+
+
+def write_docstore(path, texts, urls):
+    url_table = []
+    url_index = {}
+    url_ids = np.empty(len(urls), dtype="<u4")
+    for i, url in enumerate(urls):
+        if url not in url_index:
+            url_index[url] = len(url_table)
+            url_table.append(url)
+        url_ids[i] = url_index[url]
+
+    encoded = [t.encode("utf-8") for t in texts]
+    offsets = np.zeros(len(encoded) + 1, dtype="<u8")
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    urls_bytes = json.dumps(url_table, ensure_ascii=False).encode("utf-8")
+
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(encoded), len(url_table), len(urls_bytes)))
+        f.write(offsets.tobytes())
+        f.write(url_ids.tobytes())
+        f.write(b"\0" * _pad8(url_ids.nbytes))
+        f.write(urls_bytes)
+        for b in encoded:
+            f.write(b)
+
+
+class _TextView:
+    def __init__(self, store):
+        self._store = store
+
+    def __len__(self):
+        return self._store.n_docs
+
+    def __getitem__(self, i):
+        return self._store.text(i)
+
+
+class _UrlView:
+    def __init__(self, store):
+        self._store = store
+
+    def __len__(self):
+        return self._store.n_docs
+
+    def __getitem__(self, i):
+        return self._store.url(i)
+
+
+class DocStore:
+    """
+    Read-only view over docs.bin. `texts` and `urls` behave like the lists
+    docs.json used to provide (len() and indexing by FAISS ID).
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, self.n_docs, n_urls, urls_size = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a docs.bin file")
+
+        pos = HEADER.size
+        self._offsets = np.frombuffer(self._mm, dtype="<u8", count=self.n_docs + 1, offset=pos)
+        pos += self._offsets.nbytes
+        self._url_ids = np.frombuffer(self._mm, dtype="<u4", count=self.n_docs, offset=pos)
+        pos += self._url_ids.nbytes + _pad8(self._url_ids.nbytes)
+        self._url_table = json.loads(self._mm[pos:pos + urls_size].decode("utf-8"))
+        self._blob_start = pos + urls_size
+
+        if len(self._url_table) != n_urls:
+            raise ValueError(f"{path} has a corrupt URL table")
+
+        self.texts = _TextView(self)
+        self.urls = _UrlView(self)
+
+    def _check(self, i):
+        if i < 0:
+            i += self.n_docs
+        if not 0 <= i < self.n_docs:
+            raise IndexError(f"Document {i} out of range")
+        return i
+
+    def text(self, i):
+        i = self._check(int(i))
+        start = self._blob_start + int(self._offsets[i])
+        end = self._blob_start + int(self._offsets[i + 1])
+        return self._mm[start:end].decode("utf-8")
+
+    def url(self, i):
+        return self._url_table[self._url_ids[self._check(int(i))]]
+
+
+def migrate(base_path):
+    """Converts <base_path>/docs.json into docs.bin. Returns True if converted."""
+    json_path = os.path.join(base_path, "docs.json")
+    bin_path = os.path.join(base_path, "docs.bin")
+    if not os.path.isfile(json_path):
+        return False
+
+    with open(json_path, "r", encoding="utf-8") as f:
+        docs = json.load(f)
+
+    # Unique temp name in the same directory: concurrent migrations never share a file
+    fd, tmp_path = tempfile.mkstemp(prefix=".docs.bin.", suffix=".tmp", dir=base_path)
+    os.close(fd)
+    try:
+        write_docstore(tmp_path, docs["texts"], docs["urls"])
+        os.replace(tmp_path, bin_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--migrate", action="store_true", help="Convert docs.json to docs.bin")
+    parser.add_argument("--company", help="Company to migrate")
+    parser.add_argument("--all", action="store_true", help="Migrate every company")
+    parser.add_argument("--remove-json", action="store_true", help="Delete docs.json after converting")
+    args = parser.parse_args()
+
+    if not args.migrate or not (args.company or args.all):
+        parser.error("use --migrate with --company NAME or --all")
+
+    data_root = os.getenv("SHARED_DATA_DIR", "/app/shared_data")
+    companies = sorted(os.listdir(data_root)) if args.all else [args.company]
+    for company in companies:
+        base_path = os.path.join(data_root, company)
+        if migrate(base_path):
+            before = os.path.getsize(os.path.join(base_path, "docs.json"))
+            after = os.path.getsize(os.path.join(base_path, "docs.bin"))
+            print(f"{company}: docs.json {before} bytes -> docs.bin {after} bytes")
+            if args.remove_json:
+                os.remove(os.path.join(base_path, "docs.json"))
+        else:
+            print(f"{company}: no docs.json, skipping")
@@ -1,50 +1,196 @@
-import json
 import argparse
 import os
-from sentence_transformers import SentenceTransformer
 import numpy as np
 import faiss
+from bm25 import build_bm25, save_bm25
+from encoders import load_encoder
+from docstore import write_docstore
+from build_manifest import write_manifest
+from knowledge import knowledge_path, partial_path, iter_records
+
+DATA_ROOT = os.getenv("SHARED_DATA_DIR", "/app/shared_data")
+
+# Index compression (see benchmarks/bench_compression.py for recall impact):
+#   flat     exact float32 vectors
+#   pq       product quantization, PQ_M bytes per vector
+#   opq      rotation learned for PQ, then PQ
+#   pca      PCA to PCA_DIM dimensions, exact search in that space
+#   pca-pq   PCA then PQ
+INDEX_TYPE = os.getenv("INDEX_TYPE", "flat")
+PQ_M = int(os.getenv("PQ_M", "48"))
+PCA_DIM = int(os.getenv("PCA_DIM", "128"))
+# embeddings.npy gives the relevance threshold exact vectors where the index
+# only keeps compressed ones; float16 halves it, "none" skips it
+EMBEDDINGS_DTYPE = os.getenv("EMBEDDINGS_DTYPE", "float16")
+# per-company: one faiss.index per company directory
+# shared:      vectors go into one filtered index (see shared_index.py)
+INDEX_LAYOUT = os.getenv("INDEX_LAYOUT", "per-company")
+# Also pre-answer common questions (faq.py); needs the backend and LM Studio
+FAQ_ENABLED = os.getenv("FAQ_ENABLED", "0") == "1"
+# Chunks encoded per batch as the corpus is read
+ENCODE_BATCH = int(os.getenv("ENCODE_BATCH", "256"))
 
 def chunk_text(text, chunk_size=500):
     return [text[i:i+chunk_size] for i in range(0, len(text), chunk_size)]
 
-def main(company):
-    base_path = f"/app/shared_data/{company}"
+def iter_chunks(records):
+    for entry in records:
+        text = entry["text"]
+        url = entry["url"]
+        chunks = chunk_text(text) if len(text) > 1000 else [text]
+        for chunk in chunks:
+            yield chunk, url
+
+def load_chunks(data_path):
+    texts, urls = [], []
+    for chunk, url in iter_chunks(iter_records(data_path)):
+        texts.append(chunk)
+        urls.append(url)
+    return texts, urls
+
+# Reads and encodes the corpus a batch at a time; with follow, from a scrape
+# still in progress. Returns (texts, urls, embeddings).
+def encode_corpus(model, data_path, follow=False, batch_size=ENCODE_BATCH):
+    texts, urls, batches = [], [], []
+    encoded = 0
+    for chunk, url in iter_chunks(iter_records(data_path, follow=follow)):
+        texts.append(chunk)
+        urls.append(url)
+        if len(texts) - encoded >= batch_size:
+            batches.append(model.encode(texts[encoded:]))
+            encoded = len(texts)
+            print(f"Encoded {encoded} chunks...")
+    if encoded < len(texts):
+        batches.append(model.encode(texts[encoded:]))
+    if not batches:
+        raise ValueError(f"No pages in {data_path}")
+    return texts, urls, np.vstack(batches)
+
+def index_factory_string(index_type, n_vectors, dim, pq_m=PQ_M, pca_dim=PCA_DIM):
+    """
+    faiss.index_factory description for index_type, adjusted so it can be
+    trained on n_vectors. PQ k-means stalls when there are barely more
+    training points than centroids, so codebooks shrink below 8 bits for
+    small corpora, OPQ (fixed 256-centroid training) needs 1024 points, and
+    corpora under 256 vectors are stored uncompressed.
+    """
+    if index_type == "flat":
+        return "Flat"
+
+    pca_dim = min(pca_dim, dim, n_vectors)
+    if index_type in ("pq", "opq", "pca-pq") and n_vectors < 256:
+        print(f"Only {n_vectors} vectors: too few to train PQ, storing them uncompressed")
+        index_type = "pca" if index_type == "pca-pq" else "flat"
+        if index_type == "flat":
+            return "Flat"
+    if index_type == "opq" and n_vectors < 1024:
+        print(f"Only {n_vectors} vectors: too few to train OPQ, using plain PQ")
+        index_type = "pq"
+
+    target_dim = pca_dim if index_type.startswith("pca") else dim
+    m = pq_m
+    while target_dim % m:
+        m -= 1
+    nbits = min(8, int(np.log2(n_vectors / 4)))
+
+    if index_type == "pq":
+        return f"PQ{m}x{nbits}"
+    if index_type == "opq":
+        return f"OPQ{m},PQ{m}x{nbits}"
+    if index_type == "pca":
+        return f"PCA{pca_dim},Flat"
+    if index_type == "pca-pq":
+        return f"PCA{pca_dim},PQ{m}x{nbits}"
+    raise ValueError(f"Unknown index type '{index_type}'")
+
+def build_index(embeddings, index_type=INDEX_TYPE):
+    # Unit vectors + inner product: search scores are cosine similarities,
+    # which the chatbot compares against a relevance threshold
+    embeddings = np.array(embeddings, dtype=np.float32)
+    faiss.normalize_L2(embeddings)
+    description = index_factory_string(index_type, embeddings.shape[0], embeddings.shape[1])
+    index = faiss.index_factory(embeddings.shape[1], description, faiss.METRIC_INNER_PRODUCT)
+    if not index.is_trained:
+        index.train(embeddings)
+    index.add(embeddings)
+    return index
+
+def main(company, index_type=INDEX_TYPE, embeddings_dtype=EMBEDDINGS_DTYPE, layout=INDEX_LAYOUT, build_faq=FAQ_ENABLED, follow=False):
+    base_path = os.path.join(DATA_ROOT, company)
     os.makedirs(base_path, exist_ok=True)
 
-    data_path = os.path.join(base_path, "college_knowledge.json")
+    # --follow indexes a scrape in progress as its pages arrive
+    data_path = partial_path(base_path)
+    if not (follow and os.path.isfile(data_path)):
+        follow = False
+        data_path = knowledge_path(base_path)
     if not os.path.isfile(data_path):
         raise FileNotFoundError(f"Missing {data_path}")
 
-    with open(data_path, "r") as f:
-        raw_data = json.load(f)
+    model = load_encoder()
+    texts, urls, embeddings = encode_corpus(model, data_path, follow=follow)
 
-    texts, urls = [], []
-    for entry in raw_data:
-        text = entry["text"]
-        url = entry["url"]
-        chunks = chunk_text(text) if len(text) > 1000 else [text]
-        for chunk in chunks:
-            texts.append(chunk)
-            urls.append(url)
+    # Save all outputs to company-specific folder. The chatbot may be serving
+    # while this runs: each file is swapped in atomically, and build.json goes
+    # last so readers only pick up the new files once all of them are in place.
+    def write_atomic(name, write):
+        final_path = os.path.join(base_path, name)
+        tmp_path = os.path.join(base_path, f".{name}.tmp")
+        write(tmp_path)
+        os.replace(tmp_path, final_path)
 
-    model = SentenceTransformer("all-MiniLM-L6-v2")
-    embeddings = model.encode(texts, show_progress_bar=True)
+    def write_embeddings(path):
+        with open(path, "wb") as f:
+            np.save(f, np.asarray(embeddings, dtype=embeddings_dtype))
 
-    index = faiss.IndexFlatL2(embeddings.shape[1])
-    index.add(np.array(embeddings))
+    if embeddings_dtype == "none":
+        embeddings_path = os.path.join(base_path, "embeddings.npy")
+        if os.path.isfile(embeddings_path):
+            os.remove(embeddings_path)
+    else:
+        write_atomic("embeddings.npy", write_embeddings)
+    write_atomic("docs.bin", lambda path: write_docstore(path, texts, urls))
+    # Lexical index for hybrid retrieval; doc IDs match FAISS IDs
+    write_atomic("bm25.json", lambda path: save_bm25(build_bm25(texts), path))
 
-    # Save all outputs to company-specific folder
-    faiss.write_index(index, os.path.join(base_path, "faiss.index"))
-    np.save(os.path.join(base_path, "embeddings.npy"), embeddings)
-
-    with open(os.path.join(base_path, "docs.json"), "w") as f:
-        json.dump({"texts": texts, "urls": urls}, f)
+    if layout == "shared":
+        # The shared index has its own structure; index_type doesn't apply
+        import shared_index
+        shared_index.add_company(company, embeddings)
+        # A stale per-company index would shadow the shared one
+        index_path = os.path.join(base_path, "faiss.index")
+        if os.path.isfile(index_path):
+            os.remove(index_path)
+    else:
+        index = build_index(embeddings, index_type)
+        write_atomic("faiss.index", lambda path: faiss.write_index(index, path))
+        marker_path = os.path.join(base_path, "shared_index.json")
+        if os.path.isfile(marker_path):
+            os.remove(marker_path)
+    write_manifest(base_path)
 
     print(f"Embeddings and FAISS index saved for company '{company}'.")
 
+    # FAQ answers were written from the previous corpus
+    for name in ("faq.json", "faq.index"):
+        faq_path = os.path.join(base_path, name)
+        if os.path.isfile(faq_path):
+            os.remove(faq_path)
+    if build_faq:
+        import faq
+        try:
+            faq.build_faq(company)
+        except Exception as e:
+            # The index is usable without it; `python faq.py --company` can retry later
+            print(f"FAQ generation failed for company '{company}': {e}")
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--company", required=True, help="Company name for processing")
+    parser.add_argument("--index-type", default=INDEX_TYPE, choices=["flat", "pq", "opq", "pca", "pca-pq"])
+    parser.add_argument("--embeddings-dtype", default=EMBEDDINGS_DTYPE, choices=["float32", "float16", "none"])
+    parser.add_argument("--layout", default=INDEX_LAYOUT, choices=["per-company", "shared"])
+    parser.add_argument("--faq", action="store_true", default=FAQ_ENABLED, help="Pre-answer common questions after indexing")
+    parser.add_argument("--follow", action="store_true", help="Index a scrape still in progress, encoding pages as they are written")
     args = parser.parse_args()
-    main(args.company)
+    main(args.company, args.index_type, args.embeddings_dtype, args.layout, args.faq, args.follow)
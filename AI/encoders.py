@@ -0,0 +1,185 @@
+"""
+Query/passage encoder backends for all-MiniLM-L6-v2.
+
+EMBED_BACKEND selects the implementation:
+  torch      SentenceTransformer on PyTorch (default)
+  onnx       ONNX Runtime, fp32
+  onnx-int8  ONNX Runtime with dynamically int8-quantized weights
+
+The ONNX backends only need onnxruntime + tokenizers at runtime, so the image
+can be built without torch. Export the model once (needs torch/transformers):
+
+    python encoders.py --export
+    python encoders.py --check   # cosine drift vs the torch backend
+"""
+import os
+import argparse
+import numpy as np
+
+MODEL_NAME = os.getenv("EMBED_MODEL_NAME", "sentence-transformers/all-MiniLM-L6-v2")
+EMBED_BACKEND = os.getenv("EMBED_BACKEND", "torch")
+EMBED_THREADS = int(os.getenv("EMBED_THREADS", "0"))  # 0 = library default
+ONNX_MODEL_DIR = os.getenv("ONNX_MODEL_DIR", "/app/models/all-MiniLM-L6-v2-onnx")
+# all-MiniLM-L6-v2 is trained with 256-token inputs
+MAX_SEQ_LENGTH = 256
+
+
+class TorchEncoder:
+    def __init__(self, threads=EMBED_THREADS):
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        if threads:
+            torch.set_num_threads(threads)
+        self.model = SentenceTransformer(MODEL_NAME.split("/")[-1])
+
+    def encode(self, texts, batch_size=32, show_progress_bar=False):
+        return np.asarray(
+            self.model.encode(texts, batch_size=batch_size, show_progress_bar=show_progress_bar),
+            dtype=np.float32,
+        )
+
+
+class OnnxEncoder:
+    """
+    Mirrors the SentenceTransformer pipeline for this model: transformer,
+    attention-masked mean pooling, then L2 normalisation.
+    """
+
+    def __init__(self, quantized=False, model_dir=ONNX_MODEL_DIR, threads=EMBED_THREADS):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        model_file = "model-int8.onnx" if quantized else "model.onnx"
+        model_path = os.path.join(model_dir, model_file)
+        if not os.path.isfile(model_path):
+            raise FileNotFoundError(f"Missing {model_path}; run `python encoders.py --export`")
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+            options.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=MAX_SEQ_LENGTH)
+        self.tokenizer.enable_padding()
+
+    def _encode_batch(self, texts):
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.zeros_like(input_ids)
+
+        token_embeddings = self.session.run(None, feeds)[0]
+        mask = attention_mask[..., None].astype(np.float32)
+        pooled = (token_embeddings * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+        return pooled / np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+
+    def encode(self, texts, batch_size=32, show_progress_bar=False):
+        batches = range(0, len(texts), batch_size)
+        if show_progress_bar:
+            from tqdm import tqdm
+            batches = tqdm(batches, desc="Batches")
+        out = [self._encode_batch(texts[i:i + batch_size]) for i in batches]
+        if not out:
+            return np.zeros((0, 384), dtype=np.float32)
+        return np.vstack(out).astype(np.float32)
+
+
+def load_encoder(backend=EMBED_BACKEND):
+    if backend == "torch":
+        return TorchEncoder()
+    if backend == "onnx":
+        return OnnxEncoder(quantized=False)
+    if backend == "onnx-int8":
+        return OnnxEncoder(quantized=True)
+    raise ValueError(f"Unknown EMBED_BACKEND '{backend}'")
+
+
+def export_onnx(model_dir=ONNX_MODEL_DIR):
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+
+    os.makedirs(model_dir, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+    model = AutoModel.from_pretrained(MODEL_NAME).eval()
+    tokenizer.save_pretrained(model_dir)
+
+    dummy = tokenizer(["export"], return_tensors="pt")
+    model_path = os.path.join(model_dir, "model.onnx")
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            (dummy["input_ids"], dummy["attention_mask"], dummy["token_type_ids"]),
+            model_path,
+            input_names=["input_ids", "attention_mask", "token_type_ids"],
+            output_names=["last_hidden_state"],
+            dynamic_axes={
+                "input_ids": {0: "batch", 1: "sequence"},
+                "attention_mask": {0: "batch", 1: "sequence"},
+                "token_type_ids": {0: "batch", 1: "sequence"},
+                "last_hidden_state": {0: "batch", 1: "sequence"},
+            },
+            opset_version=14,
+        )
+
+    quantize_dynamic(model_path, os.path.join(model_dir, "model-int8.onnx"), weight_type=QuantType.QInt8)
+    print(f"Exported ONNX models to {model_dir}")
+
+
+def check_drift(texts, backends=("onnx", "onnx-int8"), min_cosine=0.99):
+    """
+    Compares each backend's embeddings to the torch reference.
+    Returns True when every backend stays above min_cosine for every text.
+    """
+    import time
+
+    reference = TorchEncoder().encode(texts)
+    reference /= np.maximum(np.linalg.norm(reference, axis=1, keepdims=True), 1e-12)
+
+    ok = True
+    for backend in backends:
+        encoder = load_encoder(backend)
+        start = time.perf_counter()
+        embeddings = encoder.encode(texts)
+        elapsed = (time.perf_counter() - start) * 1000 / max(len(texts), 1)
+        cosine = (embeddings * reference).sum(axis=1)
+        print(
+            f"{backend:>10}: mean cosine {cosine.mean():.5f}, min {cosine.min():.5f}, "
+            f"{elapsed:.2f} ms/text"
+        )
+        ok = ok and bool(cosine.min() >= min_cosine)
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--export", action="store_true", help="Export fp32 and int8 ONNX models")
+    parser.add_argument("--check", action="store_true", help="Check cosine drift against torch")
+    parser.add_argument("--company", help="Use this company's chunks as the drift-check sample")
+    parser.add_argument("--min-cosine", type=float, default=0.99)
+    args = parser.parse_args()
+
+    if args.export:
+        export_onnx()
+    if args.check:
+        if args.company:
+            from embed_index import load_chunks, DATA_ROOT
+            from knowledge import knowledge_path
+            sample, _ = load_chunks(knowledge_path(os.path.join(DATA_ROOT, args.company)))
+            sample = sample[:256]
+        else:
+            sample = [
+                "What is the application deadline for fall admission?",
+                "How much is tuition per quarter?",
+                "Does the college offer on-campus housing?",
+                "Tell me about the computer science degree.",
+            ]
+        if not check_drift(sample, min_cosine=args.min_cosine):
+            raise SystemExit("Embedding drift exceeds threshold")
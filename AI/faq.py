@@ -0,0 +1,223 @@
+"""
+Pre-computed FAQ answers per company.
+
+An offline stage (embed_index.py --faq, or `python faq.py --all` from a
+nightly job) collects likely questions for a company, answers each once
+through the normal ask_bot pipeline and stores them:
+
+    faq.index   IndexFlatIP over the question embeddings
+    faq.json    questions, answers, sources, generating model, and a hash of
+                the customs the answers were written with
+
+Questions come from a fixed list of common admissions questions plus a few
+the LLM proposes for each page of the corpus; near-duplicates are dropped.
+At query time ask_bot returns the stored answer when the (rewritten)
+question is at least FAQ_MIN_SIMILARITY similar to a stored question and
+the company's customs haven't changed since the answers were generated.
+"""
+import os
+import json
+import time
+import hashlib
+import argparse
+import traceback
+import numpy as np
+from metrics import record_cache
+
+DATA_ROOT = os.getenv("SHARED_DATA_DIR", "/app/shared_data")
+FAQ_MIN_SIMILARITY = float(os.getenv("FAQ_MIN_SIMILARITY", "0.92"))
+FAQ_MAX_QUESTIONS = int(os.getenv("FAQ_MAX_QUESTIONS", "100"))
+# Pages the LLM proposes questions for, and questions per page
+FAQ_PAGES = int(os.getenv("FAQ_PAGES", "20"))
+FAQ_QUESTIONS_PER_PAGE = 3
+# Candidate questions this similar to one already kept are dropped
+FAQ_DUPLICATE_SIMILARITY = 0.9
+
+COMMON_QUESTIONS = [
+    "What is the application deadline?",
+    "How do I apply?",
+    "What are the admission requirements?",
+    "How much is tuition?",
+    "What financial aid and scholarships are available?",
+    "Is on-campus housing available?",
+    "What degree programs do you offer?",
+    "Where is the campus located?",
+    "Can I transfer credits from another school?",
+    "Do you accept international students?",
+    "Can I schedule a campus visit or tour?",
+    "How do I contact the admissions office?",
+]
+
+faq_cache = {}
+
+
+def identity_hash(identity_data):
+    return hashlib.sha256(json.dumps(identity_data, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _normalize(vectors):
+    vectors = np.array(vectors, dtype=np.float32).reshape(len(vectors), -1)
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+
+def load_faq(company):
+    """(index, entries) for the company, or None if it has no FAQ. Reloaded when faq.json changes."""
+    base_path = os.path.join(DATA_ROOT, company)
+    json_path = os.path.join(base_path, "faq.json")
+    index_path = os.path.join(base_path, "faq.index")
+    if not os.path.isfile(json_path) or not os.path.isfile(index_path):
+        return None
+
+    mtime = os.path.getmtime(json_path)
+    cached = faq_cache.get(company)
+    record_cache("faq", bool(cached and cached[0] == mtime))
+    if cached and cached[0] == mtime:
+        return cached[1]
+
+    import faiss
+    try:
+        index = faiss.read_index(index_path)
+        with open(json_path, "r", encoding="utf-8") as f:
+            entries = json.load(f)
+    except Exception:
+        traceback.print_exc()
+        return None
+
+    faq_cache[company] = (mtime, (index, entries))
+    return index, entries
+
+
+def lookup(company, query_embedding, identity_data):
+    """The stored FAQ entry matching the query embedding, or None."""
+    faq = load_faq(company)
+    if faq is None:
+        return None
+    index, entries = faq
+    if index.ntotal == 0 or entries.get("identity_hash") != identity_hash(identity_data):
+        return None
+
+    D, I = index.search(_normalize(query_embedding), 1)
+    if I[0][0] < 0 or D[0][0] < FAQ_MIN_SIMILARITY:
+        return None
+    i = int(I[0][0])
+    return {
+        "question": entries["questions"][i],
+        "answer": entries["answers"][i],
+        "sources": entries["sources"][i],
+        "model": entries["models"][i],
+        "similarity": float(D[0][0]),
+    }
+
+
+def propose_questions(texts, urls, company):
+    """Common questions plus a few the LLM writes for the first chunk of each page."""
+    import chatbot
+
+    questions = list(COMMON_QUESTIONS)
+    seen_urls = set()
+    for text, url in zip(texts, urls):
+        if url in seen_urls:
+            continue
+        seen_urls.add(url)
+        if len(seen_urls) > FAQ_PAGES:
+            break
+        prompt = (
+            f"Here is part of a college web page:\n\n{text}\n\n"
+            f"Write {FAQ_QUESTIONS_PER_PAGE} short questions a prospective student might ask "
+            f"that this page answers. One question per line, nothing else."
+        )
+        try:
+            reply, _, _ = chatbot.complete(prompt, 128, company, temperature=0.7, stage="faq_generation")
+        except Exception as e:
+            print(f"Skipping questions for {url}: {e}")
+            continue
+        for line in reply.splitlines():
+            line = line.strip().lstrip("-*0123456789.) ").strip()
+            if line.endswith("?"):
+                questions.append(line)
+    return questions
+
+
+def dedupe(questions, embeddings, limit):
+    kept = []
+    for i in range(len(questions)):
+        if all(float(embeddings[i] @ embeddings[j]) < FAQ_DUPLICATE_SIMILARITY for j in kept):
+            kept.append(i)
+        if len(kept) >= limit:
+            break
+    return kept
+
+
+def build_faq(company, max_questions=FAQ_MAX_QUESTIONS):
+    """Generates, answers and stores the company's FAQ. Needs the backend and LM Studio."""
+    import faiss
+    import chatbot
+
+    base_path = os.path.join(DATA_ROOT, company)
+    index, texts, urls, bm25 = chatbot.load_company_data(company)
+    identity_data = chatbot.fetch_identity(company)
+    model = chatbot.get_model()
+
+    candidates = propose_questions(texts, urls, company)
+    candidate_embeddings = _normalize(model.encode(candidates))
+    kept = dedupe(candidates, candidate_embeddings, max_questions)
+
+    entries = {
+        "identity_hash": identity_hash(identity_data),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "questions": [], "answers": [], "sources": [], "models": [],
+    }
+    vectors = []
+    for i in kept:
+        question = candidates[i]
+        trace = {}
+        try:
+            answer = chatbot.ask_bot(question, model, index, texts, urls, company, trace=trace, bm25=bm25, use_faq=False)
+        except Exception as e:
+            print(f"Skipping FAQ question '{question}': {e}")
+            continue
+        # Questions the corpus can't answer are cheap anyway; don't pin a refusal
+        if trace.get("short_circuit"):
+            continue
+        entries["questions"].append(question)
+        entries["answers"].append(answer)
+        entries["sources"].append(trace.get("sources", []))
+        entries["models"].append(trace.get("model"))
+        vectors.append(candidate_embeddings[i])
+
+    faq_index = faiss.IndexFlatIP(candidate_embeddings.shape[1])
+    if vectors:
+        faq_index.add(np.array(vectors, dtype=np.float32))
+
+    # faq.json goes last: its mtime is what triggers a reload
+    tmp_index = os.path.join(base_path, ".faq.index.tmp")
+    faiss.write_index(faq_index, tmp_index)
+    os.replace(tmp_index, os.path.join(base_path, "faq.index"))
+    tmp_json = os.path.join(base_path, ".faq.json.tmp")
+    with open(tmp_json, "w", encoding="utf-8") as f:
+        json.dump(entries, f, ensure_ascii=False)
+    os.replace(tmp_json, os.path.join(base_path, "faq.json"))
+
+    print(f"FAQ for '{company}': {len(entries['questions'])} answers from {len(candidates)} candidate questions.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--company", help="Company to build the FAQ for")
+    parser.add_argument("--all", action="store_true", help="Build for every company with an index")
+    parser.add_argument("--max-questions", type=int, default=FAQ_MAX_QUESTIONS)
+    args = parser.parse_args()
+
+    if not (args.company or args.all):
+        parser.error("use --company NAME or --all")
+
+    companies = [args.company] if args.company else sorted(
+        c for c in os.listdir(DATA_ROOT)
+        if os.path.isfile(os.path.join(DATA_ROOT, c, "faiss.index"))
+        or os.path.isfile(os.path.join(DATA_ROOT, c, "shared_index.json"))
+    )
+    for company in companies:
+        try:
+            build_faq(company, args.max_questions)
+        except Exception:
+            traceback.print_exc()
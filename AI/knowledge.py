@@ -0,0 +1,75 @@
+"""
+Reading a company's scraped corpus.
+
+The scraper (sftbackend/src/knowledge_file.py) appends one {"url", "text"}
+JSON object per line to college_knowledge.jsonl.partial and renames it to
+college_knowledge.jsonl when the scrape is done. Corpora from before the
+JSONL format are one JSON array in college_knowledge.json.
+
+iter_records(..., follow=True) tails a .partial file while the scraper
+appends to it. It stops once the file has been renamed and everything
+written before the rename has been read. This lets embed_index.py --follow
+start encoding early pages while the crawl is still running. The backend
+lets one scrape per company write the .partial file at a time, so the file
+being followed holds a single scrape's pages.
+
+The file names and knowledge_path() repeat the ones in
+sftbackend/src/knowledge_file.py: the AI and backend images don't share
+code, so a change to the layout has to be made in both.
+"""
+import os
+import json
+import time
+
+KNOWLEDGE_JSONL = "college_knowledge.jsonl"
+KNOWLEDGE_JSON = "college_knowledge.json"
+PARTIAL_SUFFIX = ".partial"
+# A followed .partial file that stops growing for this long is an abandoned scrape
+FOLLOW_IDLE_TIMEOUT = float(os.getenv("FOLLOW_IDLE_TIMEOUT", "300"))
+FOLLOW_POLL_INTERVAL = 0.5
+
+
+def knowledge_path(company_dir):
+    """The company's current corpus file: JSONL if there is one, else the legacy JSON."""
+    jsonl_path = os.path.join(company_dir, KNOWLEDGE_JSONL)
+    return jsonl_path if os.path.isfile(jsonl_path) else os.path.join(company_dir, KNOWLEDGE_JSON)
+
+
+def partial_path(company_dir):
+    return os.path.join(company_dir, KNOWLEDGE_JSONL + PARTIAL_SUFFIX)
+
+
+def iter_records(path, follow=False, idle_timeout=FOLLOW_IDLE_TIMEOUT):
+    """Yields {"url", "text"} records from a .json, .jsonl or .jsonl.partial corpus."""
+    if path.endswith(".json"):
+        with open(path, "r", encoding="utf-8") as f:
+            yield from json.load(f)
+        return
+
+    with open(path, "r", encoding="utf-8") as f:
+        pending = ""
+        idle_since = time.monotonic()
+        while True:
+            line = f.readline()
+            if line:
+                pending += line
+                # The writer may be mid-line; wait for the newline
+                if pending.endswith("\n"):
+                    if pending.strip():
+                        yield json.loads(pending)
+                    pending = ""
+                idle_since = time.monotonic()
+                continue
+
+            if not follow:
+                break
+            if not os.path.exists(path):
+                # Renamed into place: drain what was written before the rename, then stop
+                follow = False
+                continue
+            if time.monotonic() - idle_since > idle_timeout:
+                raise TimeoutError(f"{path} hasn't grown in {idle_timeout:.0f}s; the scrape looks abandoned")
+            time.sleep(FOLLOW_POLL_INTERVAL)
+
+        if pending.strip():
+            yield json.loads(pending)
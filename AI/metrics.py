@@ -0,0 +1,59 @@
+"""
+Prometheus metrics and per-stage timing spans for the chat pipeline,
+exposed on /metrics.
+
+Every span is observed in chat_stage_seconds and, when a timings dict is
+passed, recorded there as <stage>_ms so it reaches the /chat response and
+the backend transcript. Requests carry a W3C traceparent from the backend;
+its trace ID is echoed back and logged so one chat can be followed across
+both services.
+"""
+import re
+import time
+import uuid
+from contextlib import contextmanager
+from prometheus_client import Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST
+
+STAGE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+STAGE_SECONDS = Histogram(
+    "chat_stage_seconds", "Time spent in each stage of a /chat request", ["stage"], buckets=STAGE_BUCKETS
+)
+CHAT_REQUESTS = Counter(
+    "chat_requests_total", "/chat requests by company, model and outcome", ["company", "model", "outcome"]
+)
+PROMPT_TOKENS = Counter("llm_prompt_tokens_total", "Prompt tokens sent to the LLM", ["company", "model"])
+COMPLETION_TOKENS = Counter("llm_completion_tokens_total", "Completion tokens generated by the LLM", ["company", "model"])
+CACHE_LOOKUPS = Counter("cache_lookups_total", "Cache lookups by cache and result", ["cache", "result"])
+RERANK_DECISIONS = Counter("rerank_decisions_total", "Whether reranking ran, was skipped for load/budget, or errored", ["decision"])
+CONTEXT_PASSAGES = Histogram(
+    "context_passages", "Passages placed in the prompt per answered question", buckets=(0, 1, 2, 3, 4, 5, 6, 8, 10)
+)
+
+TRACEPARENT = re.compile(r"^[0-9a-f]{2}-([0-9a-f]{32})-[0-9a-f]{16}-[0-9a-f]{2}$")
+
+
+@contextmanager
+def span(stage, timings=None):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.labels(stage=stage).observe(elapsed)
+        if timings is not None:
+            timings[f"{stage}_ms"] = elapsed * 1000
+
+
+def record_cache(cache, hit):
+    CACHE_LOOKUPS.labels(cache=cache, result="hit" if hit else "miss").inc()
+
+
+def trace_id_from(traceparent):
+    """The trace ID from a traceparent header, or a fresh one."""
+    match = TRACEPARENT.match((traceparent or "").strip().lower())
+    return match.group(1) if match else uuid.uuid4().hex
+
+
+def latest():
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,112 @@
+"""
+Optional cross-encoder reranking for get_context.
+
+With RERANK_ENABLED=1, retrieval over-fetches RERANK_CANDIDATES passages,
+scores every (question, passage) pair with a small cross-encoder in one
+batched pass, and keeps only the passages scoring at least RERANK_MIN_SCORE
+(at most k). When none does, get_context falls back to the fused order and
+the usual similarity floor. Simple questions then ship one or two passages
+instead of five, which shortens prefill on the LLM boxes.
+
+Reranking is skipped, falling back to the fused FAISS/BM25 order, when
+RERANK_MAX_INFLIGHT reranks are already running or when the expected time
+for this batch (a moving average per pair) exceeds RERANK_BUDGET_MS. The
+estimate decays while reranking is skipped so it gets probed again once
+load drops. A cross-encoder error also falls back to the fused order.
+"""
+import os
+import time
+import traceback
+from threading import Lock
+import numpy as np
+from metrics import RERANK_DECISIONS
+
+RERANK_ENABLED = os.getenv("RERANK_ENABLED", "0") == "1"
+RERANK_MODEL = os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "20"))
+# Sigmoid of the cross-encoder logit; ms-marco models put relevant passages well above 0.5
+RERANK_MIN_SCORE = float(os.getenv("RERANK_MIN_SCORE", "0.5"))
+RERANK_BUDGET_MS = float(os.getenv("RERANK_BUDGET_MS", "150"))
+RERANK_MAX_INFLIGHT = int(os.getenv("RERANK_MAX_INFLIGHT", "4"))
+RERANK_MAX_LENGTH = 512
+# Weight of the newest measurement in the per-pair latency average
+EWMA_ALPHA = 0.2
+# Per skipped request, so a stale estimate doesn't disable reranking for good
+SKIP_DECAY = 0.9
+
+
+class Reranker:
+    def __init__(self, model_name=RERANK_MODEL, budget_ms=RERANK_BUDGET_MS, max_inflight=RERANK_MAX_INFLIGHT):
+        self.model_name = model_name
+        self.budget_ms = budget_ms
+        self.max_inflight = max_inflight
+        self.model = None
+        self.failed = False
+        self.ms_per_pair = 0.0
+        self.inflight = 0
+        self._lock = Lock()
+
+    def load(self):
+        if self.model is None and not self.failed:
+            with self._lock:
+                if self.model is None and not self.failed:
+                    try:
+                        from sentence_transformers import CrossEncoder
+                        self.model = CrossEncoder(self.model_name, max_length=RERANK_MAX_LENGTH)
+                    except Exception:
+                        # e.g. the torch-free ONNX image: keep serving without reranking
+                        print(f"Reranker '{self.model_name}' unavailable, reranking disabled:")
+                        traceback.print_exc()
+                        self.failed = True
+        return self.model
+
+    def _admit(self, n_pairs):
+        with self._lock:
+            if self.inflight >= self.max_inflight:
+                self.ms_per_pair *= SKIP_DECAY
+                return "skipped_load"
+            if self.ms_per_pair * n_pairs > self.budget_ms:
+                self.ms_per_pair *= SKIP_DECAY
+                return "skipped_budget"
+            self.inflight += 1
+            return "reranked"
+
+    def rerank(self, query, ids, texts, k, min_score=RERANK_MIN_SCORE):
+        """
+        (ids, scores) for the candidates scoring at least min_score, best first
+        and at most k (possibly none), or (None, None) when reranking was
+        skipped or failed.
+        """
+        if not ids or self.load() is None:
+            return None, None
+
+        decision = self._admit(len(ids))
+        if decision != "reranked":
+            RERANK_DECISIONS.labels(decision=decision).inc()
+            return None, None
+
+        try:
+            start = time.perf_counter()
+            logits = np.asarray(self.model.predict([(query, texts[i]) for i in ids], batch_size=32), dtype=np.float32)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+        except Exception:
+            # e.g. out of memory on a long batch: answer in the fused order instead
+            traceback.print_exc()
+            RERANK_DECISIONS.labels(decision="error").inc()
+            return None, None
+        finally:
+            with self._lock:
+                self.inflight -= 1
+        RERANK_DECISIONS.labels(decision=decision).inc()
+
+        with self._lock:
+            sample = elapsed_ms / len(ids)
+            self.ms_per_pair = sample if self.ms_per_pair == 0 else (1 - EWMA_ALPHA) * self.ms_per_pair + EWMA_ALPHA * sample
+
+        scores = 1 / (1 + np.exp(-logits))
+        order = np.argsort(-scores)
+        keep = min(k, int((scores >= min_score).sum()))
+        return [ids[i] for i in order[:keep]], [float(scores[i]) for i in order[:keep]]
+
+
+reranker = Reranker() if RERANK_ENABLED else None
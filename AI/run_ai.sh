@@ -2,28 +2,67 @@
 
 COMPANY_DIR="/app/shared_data"
 
+# Rebuild when the knowledge file changed or an index artifact is missing.
+# With INDEX_LAYOUT=shared the company's marker stands in for its faiss.index.
+needs_build() {
+    [ ! -f "$INDEX_FILE" ] || [ "$JSON_FILE" -nt "$INDEX_FILE" ] || [ ! -f "$COMPANY_PATH/bm25.json" ]
+}
+
+# Serve immediately: the API warms the encoder in the background and reports
+# readiness on /readyz while indexes are (re)built below.
+echo "Starting chatbot API server..."
+uvicorn chatbot:app --host 0.0.0.0 --port 8001 &
+SERVER_PID=$!
+trap 'kill -TERM "$SERVER_PID" 2>/dev/null; wait "$SERVER_PID"; exit 143' TERM INT
+
 echo "Starting index generation for all companies..."
 
 for COMPANY_PATH in "$COMPANY_DIR"/*; do
     [ -d "$COMPANY_PATH" ] || continue
 
     COMPANY=$(basename "$COMPANY_PATH")
-    JSON_FILE="$COMPANY_PATH/college_knowledge.json"
-    INDEX_FILE="$COMPANY_PATH/faiss.index"
+    # Scrapes write JSONL; older corpora are a single JSON array
+    JSON_FILE="$COMPANY_PATH/college_knowledge.jsonl"
+    [ -f "$JSON_FILE" ] || JSON_FILE="$COMPANY_PATH/college_knowledge.json"
+    if [ "$INDEX_LAYOUT" = "shared" ]; then
+        INDEX_FILE="$COMPANY_PATH/shared_index.json"
+    else
+        INDEX_FILE="$COMPANY_PATH/faiss.index"
+    fi
 
     if [ -f "$JSON_FILE" ]; then
 
-        if [ ! -f "$INDEX_FILE" ] || [ "$JSON_FILE" -nt "$INDEX_FILE" ]; then
-            echo "Building index for company: $COMPANY"
-            python embed_index.py --company "$COMPANY"
-            sleep 5
+        # Convert indexes built with docs.json; cheaper than re-embedding.
+        # Under the same lock as builds, re-checked once held, so only one replica converts.
+        if [ -f "$COMPANY_PATH/docs.json" ] && [ ! -f "$COMPANY_PATH/docs.bin" ]; then
+            (
+                flock 9
+                if [ -f "$COMPANY_PATH/docs.json" ] && [ ! -f "$COMPANY_PATH/docs.bin" ]; then
+                    echo "Migrating docs.json to docs.bin for company: $COMPANY"
+                    python docstore.py --migrate --company "$COMPANY"
+                fi
+            ) 9>"$COMPANY_PATH/.index.lock"
+        fi
+
+        if needs_build; then
+            # Replicas share the volume: the lock lets one build while the others wait,
+            # then they re-check freshness instead of rebuilding the same index.
+            (
+                flock 9
+                if needs_build; then
+                    echo "Building index for company: $COMPANY"
+                    python embed_index.py --company "$COMPANY"
+                else
+                    echo "Index for company $COMPANY was built by another replica. Skipping..."
+                fi
+            ) 9>"$COMPANY_PATH/.index.lock"
         else
             echo "Index for company $COMPANY is up-to-date. Skipping..."
         fi
     else
-        echo "Missing college_knowledge.json for $COMPANY. Skipping..."
+        echo "Missing college_knowledge.jsonl for $COMPANY. Skipping..."
     fi
 done
 
-echo "All indexes processed. Starting chatbot API server..."
-uvicorn chatbot:app --host 0.0.0.0 --port 8001
+echo "All indexes processed."
+wait "$SERVER_PID"
@@ -0,0 +1,101 @@
+"""
+Server-side chat sessions.
+
+Each session keeps the last SESSION_RECENT_TURNS exchanges verbatim plus a
+rolling summary of everything older, so the history added to the prompt
+stays bounded however long the conversation runs. Sessions live in this
+replica's memory: the backend routes a company to the same replica, and if
+that replica goes away the conversation simply continues without history.
+
+The store is an LRU capped at SESSION_MAX entries; sessions idle for longer
+than SESSION_TTL seconds are dropped.
+"""
+import os
+import time
+import uuid
+from collections import OrderedDict
+from threading import Lock
+from context_packer import estimate_tokens
+
+SESSION_MAX = int(os.getenv("SESSION_MAX", "10000"))
+SESSION_TTL = float(os.getenv("SESSION_TTL", "1800"))
+# Exchanges kept word for word; older ones are folded into the summary
+SESSION_RECENT_TURNS = int(os.getenv("SESSION_RECENT_TURNS", "3"))
+# Cap on the history block (summary + recent turns) added to the prompt
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "600"))
+SUMMARY_MAX_TOKENS = int(os.getenv("SUMMARY_MAX_TOKENS", "200"))
+
+
+class Session:
+    def __init__(self, session_id, company):
+        self.id = session_id
+        self.company = company
+        self.summary = ""
+        self.turns = []  # [(question, answer)], oldest first
+        self.updated_at = time.monotonic()
+        # Held while a turn or a summary update modifies the session
+        self.lock = Lock()
+        # Set while summarize_session is calling the model, which it does without the lock
+        self.summarizing = False
+
+    def add_turn(self, question, answer):
+        self.turns.append((question, answer))
+        self.updated_at = time.monotonic()
+
+    def needs_summary(self):
+        return len(self.turns) > SESSION_RECENT_TURNS
+
+    def history_block(self, token_budget=HISTORY_TOKEN_BUDGET):
+        """
+        Summary and recent turns formatted for the prompt, dropping the oldest
+        turns (and finally truncating the summary) to stay within the budget.
+        """
+        turns = [f"Student: {q}\nAssistant: {a}" for q, a in self.turns[-SESSION_RECENT_TURNS:]]
+        summary = f"Summary of earlier conversation: {self.summary}" if self.summary else ""
+
+        while turns and estimate_tokens("\n".join([summary] + turns)) > token_budget:
+            turns.pop(0)
+        if estimate_tokens(summary) > token_budget:
+            summary = summary[:token_budget * 4]
+        return "\n".join(part for part in [summary] + turns if part)
+
+
+class SessionStore:
+    def __init__(self, max_sessions=SESSION_MAX, ttl=SESSION_TTL):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._sessions = OrderedDict()
+        self._lock = Lock()
+
+    def _expire(self, now):
+        while self._sessions:
+            session = next(iter(self._sessions.values()))
+            if now - session.updated_at <= self.ttl:
+                break
+            self._sessions.popitem(last=False)
+
+    def get_or_create(self, session_id, company):
+        """
+        The session for session_id, or a new one if it is unknown, expired or
+        belongs to another company. Returns (session, created).
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            session = self._sessions.get(session_id) if session_id else None
+            if session is not None and session.company == company:
+                session.updated_at = now
+                self._sessions.move_to_end(session.id)
+                return session, False
+
+            session = Session(uuid.uuid4().hex, company)
+            self._sessions[session.id] = session
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+            return session, True
+
+    def __len__(self):
+        return len(self._sessions)
+
+
+sessions = SessionStore()
@@ -0,0 +1,256 @@
+"""
+Optional shared multi-tenant vector index.
+
+With INDEX_LAYOUT=shared, embed_index.py adds a company's vectors to one index
+in DATA_ROOT/.shared_index instead of writing a per-company faiss.index.
+Vector IDs are (tenant_id << 32) | chunk_id, so a company's vectors form one
+contiguous ID range: searches are restricted to it with an IDSelectorRange,
+and chunk_id indexes straight into the company's own docs.bin / bm25.json.
+
+The company directory gets a shared_index.json marker instead of faiss.index;
+chatbot.load_company_data sees a TenantIndexView with the same search /
+reconstruct interface as a per-company index.
+"""
+import os
+import json
+import fcntl
+import numpy as np
+import faiss
+
+DATA_ROOT = os.getenv("SHARED_DATA_DIR", "/app/shared_data")
+SHARED_DIR = os.path.join(DATA_ROOT, ".shared_index")
+SHARED_INDEX_PATH = os.path.join(SHARED_DIR, "faiss.index")
+TENANTS_PATH = os.path.join(SHARED_DIR, "tenants.json")
+# How many vectors the IVF quantizer was trained on
+TRAINING_PATH = os.path.join(SHARED_DIR, "training.json")
+MARKER_NAME = "shared_index.json"
+
+# Below this many vectors a flat index is both exact and fast enough
+IVF_MIN_VECTORS = int(os.getenv("SHARED_IVF_MIN_VECTORS", "20000"))
+IVF_NPROBE = int(os.getenv("SHARED_IVF_NPROBE", "16"))
+# Tenants up to this size are searched exactly over their own vectors rather
+# than through IVF probes, which can miss a small tenant's neighbours
+EXACT_MAX_VECTORS = int(os.getenv("SHARED_EXACT_MAX_VECTORS", "2048"))
+# Retrain the IVF once the index holds this many times the vectors it was trained on
+IVF_RETRAIN_GROWTH = float(os.getenv("SHARED_IVF_RETRAIN_GROWTH", "4"))
+
+TENANT_SHIFT = 32
+CHUNK_MASK = (1 << TENANT_SHIFT) - 1
+
+
+def tenant_range(tenant_id):
+    return tenant_id << TENANT_SHIFT, (tenant_id + 1) << TENANT_SHIFT
+
+
+def _read_json(path, default):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+def _read_tenants():
+    return _read_json(TENANTS_PATH, {})
+
+
+def _write_atomic(path, write):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def _write_json(path, data):
+    def write(tmp_path):
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+    _write_atomic(path, write)
+
+
+def _all_vectors(index):
+    """(vectors, ids) currently stored in a shared index."""
+    if index.ntotal == 0:
+        return np.zeros((0, index.d), dtype=np.float32), np.zeros(0, dtype=np.int64)
+    if isinstance(index, faiss.IndexIDMap2):
+        ids = faiss.vector_to_array(index.id_map).astype(np.int64)
+        return index.index.reconstruct_n(0, index.ntotal), ids
+
+    invlists = index.invlists
+    vectors, ids = [], []
+    for list_no in range(index.nlist):
+        size = invlists.list_size(list_no)
+        if size == 0:
+            continue
+        list_ids = faiss.rev_swig_ptr(invlists.get_ids(list_no), size).copy()
+        ids.append(list_ids)
+        vectors.append(index.reconstruct_batch(list_ids))
+    return np.vstack(vectors), np.concatenate(ids)
+
+
+def _remove_range(index, start, end):
+    """Drops IDs in [start, end). The IVF hashtable direct map only removes listed IDs."""
+    if isinstance(index, faiss.IndexIDMap2):
+        index.remove_ids(faiss.IDSelectorRange(start, end))
+        return
+    invlists = index.invlists
+    stale = []
+    for list_no in range(index.nlist):
+        size = invlists.list_size(list_no)
+        if size:
+            list_ids = faiss.rev_swig_ptr(invlists.get_ids(list_no), size)
+            stale.append(list_ids[(list_ids >= start) & (list_ids < end)])
+    stale = np.concatenate(stale) if stale else np.zeros(0, dtype=np.int64)
+    if len(stale):
+        index.remove_ids(faiss.IDSelectorArray(len(stale), faiss.swig_ptr(np.ascontiguousarray(stale, dtype=np.int64))))
+
+
+def _build(vectors, ids):
+    """Flat for small totals, IVF (trained on everything) once it pays off."""
+    dim = vectors.shape[1]
+    if len(vectors) < IVF_MIN_VECTORS:
+        index = faiss.IndexIDMap2(faiss.IndexFlatIP(dim))
+    else:
+        nlist = int(4 * np.sqrt(len(vectors)))
+        index = faiss.index_factory(dim, f"IVF{nlist},Flat", faiss.METRIC_INNER_PRODUCT)
+        index.train(vectors)
+        # Hashtable direct map: reconstruct by arbitrary (tenant-shifted) ID
+        index.set_direct_map_type(faiss.DirectMap.Hashtable)
+    if len(vectors):
+        index.add_with_ids(vectors, ids)
+    return index
+
+
+def _needs_rebuild(index, total):
+    """A full rebuild is due when the flat index outgrows IVF_MIN_VECTORS or the IVF outgrows its training."""
+    if isinstance(index, faiss.IndexIDMap2):
+        return total >= IVF_MIN_VECTORS
+    trained_on = _read_json(TRAINING_PATH, {}).get("vectors", 0)
+    return total > trained_on * IVF_RETRAIN_GROWTH
+
+
+def add_company(company, embeddings):
+    """
+    Replaces the company's vectors in the shared index and writes its marker.
+    Serialised across builders with a file lock.
+
+    The loaded index is updated in place (remove the tenant's ID range, add
+    the new vectors), so an update costs O(tenant) apart from reading and
+    writing the file. Everything is reconstructed and retrained only when
+    the flat index crosses IVF_MIN_VECTORS or the IVF grows past
+    IVF_RETRAIN_GROWTH times its training set, which keeps rebuilds
+    geometric rather than once per tenant.
+    """
+    os.makedirs(SHARED_DIR, exist_ok=True)
+    embeddings = np.array(embeddings, dtype=np.float32)
+    faiss.normalize_L2(embeddings)
+
+    with open(os.path.join(SHARED_DIR, ".lock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+
+        tenants = _read_tenants()
+        if company not in tenants:
+            tenants[company] = max(tenants.values(), default=-1) + 1
+        tenant_id = tenants[company]
+        start, end = tenant_range(tenant_id)
+
+        new_ids = start + np.arange(len(embeddings), dtype=np.int64)
+        if os.path.isfile(SHARED_INDEX_PATH):
+            index = faiss.read_index(SHARED_INDEX_PATH)
+            _remove_range(index, start, end)
+        else:
+            index = _build(np.zeros((0, embeddings.shape[1]), dtype=np.float32), np.zeros(0, dtype=np.int64))
+
+        if _needs_rebuild(index, index.ntotal + len(embeddings)):
+            vectors, ids = _all_vectors(index)
+            index = _build(np.vstack([vectors, embeddings]), np.concatenate([ids, new_ids]))
+            if not isinstance(index, faiss.IndexIDMap2):
+                _write_json(TRAINING_PATH, {"vectors": int(index.ntotal)})
+        elif len(embeddings):
+            index.add_with_ids(embeddings, new_ids)
+
+        _write_atomic(SHARED_INDEX_PATH, lambda path: faiss.write_index(index, path))
+        _write_json(TENANTS_PATH, tenants)
+        _write_json(
+            os.path.join(DATA_ROOT, company, MARKER_NAME),
+            {"tenant_id": tenant_id, "vectors": len(embeddings)}
+        )
+
+
+_shared_cache = {}
+
+
+def load_shared_index():
+    """The shared index, reloaded only when the file changes."""
+    mtime = os.path.getmtime(SHARED_INDEX_PATH)
+    if _shared_cache.get("mtime") != mtime:
+        index = faiss.read_index(SHARED_INDEX_PATH)
+        if hasattr(index, "nprobe"):
+            index.nprobe = IVF_NPROBE
+        _shared_cache["index"] = index
+        _shared_cache["mtime"] = mtime
+    return _shared_cache["index"]
+
+
+class TenantIndexView:
+    """
+    One company's slice of the shared index, addressed by chunk ID.
+
+    An IVF probe of nprobe lists can hold few (or fewer than k) of a small
+    tenant's vectors, so tenants up to EXACT_MAX_VECTORS are scanned exactly
+    over their own vectors (reconstructed once, then cached on the view).
+    Larger tenants go through the IVF and fall back to the same scan when a
+    probe comes back short.
+    """
+
+    def __init__(self, index, tenant_id, ntotal):
+        self.index = index
+        self.tenant_id = tenant_id
+        self.ntotal = ntotal
+        self.d = index.d
+        self.metric_type = index.metric_type
+        start, end = tenant_range(tenant_id)
+        self._base = start
+        self._selector = faiss.IDSelectorRange(start, end)
+        self._ivf = hasattr(index, "nprobe")
+        if self._ivf:
+            self._params = faiss.SearchParametersIVF(sel=self._selector, nprobe=index.nprobe)
+        else:
+            self._params = faiss.SearchParameters(sel=self._selector)
+        self._vectors = None
+
+    def _tenant_vectors(self):
+        if self._vectors is None:
+            ids = self._base + np.arange(self.ntotal, dtype=np.int64)
+            self._vectors = np.vstack([self.index.reconstruct(int(i)) for i in ids]) if self.ntotal else \
+                np.zeros((0, self.d), dtype=np.float32)
+        return self._vectors
+
+    def _exact_search(self, x, k):
+        scores = x @ self._tenant_vectors().T
+        n = min(k, self.ntotal)
+        D = np.full((len(x), k), -np.inf, dtype=np.float32)
+        I = np.full((len(x), k), -1, dtype=np.int64)
+        for row in range(len(x)):
+            top = np.argsort(-scores[row])[:n]
+            D[row, :n] = scores[row, top]
+            I[row, :n] = top
+        return D, I
+
+    def search(self, x, k):
+        x = np.ascontiguousarray(x, dtype=np.float32)
+        if self._ivf and self.ntotal <= EXACT_MAX_VECTORS:
+            return self._exact_search(x, k)
+        D, I = self.index.search(x, k, params=self._params)
+        if self._ivf and ((I >= 0).sum(axis=1) < min(k, self.ntotal)).any():
+            return self._exact_search(x, k)
+        I = np.where(I >= 0, I & CHUNK_MASK, -1)
+        return D, I
+
+    def reconstruct(self, chunk_id):
+        return self.index.reconstruct(int(self._base + chunk_id))
+
+
+def load_tenant_view(base_path):
+    with open(os.path.join(base_path, MARKER_NAME), "r", encoding="utf-8") as f:
+        marker = json.load(f)
+    return TenantIndexView(load_shared_index(), marker["tenant_id"], marker["vectors"])
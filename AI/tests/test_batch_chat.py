@@ -0,0 +1,51 @@
+import json
+import unittest
+from unittest import mock
+
+from fastapi.testclient import TestClient
+
+import batch_chat
+import chatbot
+from batch_chat import parse_jsonl
+
+
+class ParseJsonlTest(unittest.TestCase):
+    def test_valid_lines_keep_their_line_numbers(self):
+        parsed = parse_jsonl(['{"company": "byu", "prompt": "Tuition?"}', "", '{"company": "byu", "prompt": "Housing?", "id": 7}'])
+        self.assertEqual([(line_no, error) for line_no, _, error in parsed], [(1, None), (3, None)])
+        self.assertEqual(parsed[1][1]["id"], 7)
+
+    def test_malformed_lines_are_reported_per_line(self):
+        parsed = parse_jsonl(["not json", '{"company": "byu"}', "[1, 2]"])
+        self.assertEqual([line_no for line_no, _, _ in parsed], [1, 2, 3])
+        self.assertTrue(all(item is None and error.startswith("Invalid input line") for _, item, error in parsed))
+
+    def test_invalid_utf8_is_a_malformed_line(self):
+        parsed = parse_jsonl([b'{"company": "byu", "prompt": "Caf\xc3\xa9?"}', b'{"company": "byu", "prompt": "\xff\xfe"}'])
+        self.assertEqual(parsed[0][1]["prompt"], "Café?")
+        line_no, item, error = parsed[1]
+        self.assertEqual((line_no, item), (2, None))
+        self.assertIn("Invalid input line", error)
+
+
+class BatchEndpointTest(unittest.TestCase):
+    def setUp(self):
+        # Not entered as a context manager, so the startup warm-up doesn't run
+        self.client = TestClient(chatbot.app)
+
+    def test_invalid_utf8_is_reported_not_a_server_error(self):
+        response = self.client.post("/chat/batch", content=b'{"company": "byu", "prompt": "\xff"}\n')
+        self.assertEqual(response.status_code, 200)
+        result = json.loads(response.text)
+        self.assertEqual(result["line"], 1)
+        self.assertIn("Invalid input line", result["error"])
+
+    def test_too_many_questions_is_413(self):
+        body = b'{"company": "byu", "prompt": "Tuition?"}\n' * 3
+        with mock.patch.object(batch_chat, "BATCH_MAX_ITEMS", 2):
+            response = self.client.post("/chat/batch", content=body)
+        self.assertEqual(response.status_code, 413)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+import unittest
+
+from bm25 import BM25Index, build_bm25, reciprocal_rank_fusion, tokenize
+
+TEXTS = [
+    "CS2420 Data Structures is required for the computer science degree.",
+    "Tuition for 2025-26 is $12,500 per semester.",
+    "Campus housing opens in August; apply for housing early.",
+    "The library is open late during finals week.",
+    "Scholarships are awarded on admission, no separate application needed.",
+    "Visit campus on a guided tour any weekday.",
+]
+
+
+class TokenizeTest(unittest.TestCase):
+    def test_drops_stopwords_and_contraction_fragments(self):
+        self.assertEqual(tokenize("What's the weather like today?"), ["weather", "today"])
+        self.assertEqual(tokenize("Can you tell me about it? I don't know."), [])
+
+    def test_keeps_codes_amounts_and_dates(self):
+        self.assertEqual(tokenize("CS2420 costs $12,500 in 2025-26"), ["cs2420", "costs", "$12500", "2025-26"])
+
+
+class BM25IndexTest(unittest.TestCase):
+    def setUp(self):
+        self.index = BM25Index(build_bm25(TEXTS))
+
+    def test_search_ranks_matching_documents_best_first(self):
+        ids, scores = self.index.search("housing application", 3)
+        self.assertEqual(ids[0], 2)
+        self.assertEqual(scores, sorted(scores, reverse=True))
+
+    def test_search_without_matching_terms_is_empty(self):
+        self.assertEqual(self.index.search("What's it like?", 5), ([], []))
+
+    def test_code_matches_only_counts_terms_with_digits(self):
+        self.assertEqual(self.index.code_matches("Is CS2420 hard?", [0, 1, 2]), [0])
+        self.assertEqual(self.index.code_matches("Is housing required?", [0, 2]), [])
+
+
+class ReciprocalRankFusionTest(unittest.TestCase):
+    def test_documents_ranked_well_by_both_lists_come_first(self):
+        fused = reciprocal_rank_fusion([[1, 2, 3], [2, 4, 5]], k=5)
+        self.assertEqual(fused[:2], [2, 1])
+        self.assertEqual(set(fused), {1, 2, 3, 4, 5})
+
+    def test_skips_missing_faiss_ids_and_cuts_to_k(self):
+        self.assertEqual(reciprocal_rank_fusion([[5, -1, 6], [-1]], k=1), [5])
+
+
+if __name__ == "__main__":
+    unittest.main()
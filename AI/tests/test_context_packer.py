@@ -0,0 +1,72 @@
+import unittest
+
+import numpy as np
+
+import context_packer
+from context_packer import answer_token_limit, estimate_tokens, pack_context, trim_context
+
+QUERY = np.array([1.0, 0.0, 0.0], dtype=np.float32)
+
+
+def vector(similarity, axis=1):
+    """A unit vector whose cosine with QUERY is `similarity`."""
+    v = np.zeros(3, dtype=np.float32)
+    v[0] = similarity
+    v[axis] = np.sqrt(1 - similarity ** 2)
+    return v
+
+
+class PackContextTest(unittest.TestCase):
+    def test_merges_adjacent_chunks_of_a_page_in_page_order(self):
+        texts = ["first half ", "second half", "other page"]
+        urls = ["u/a", "u/a", "u/b"]
+        vectors = np.array([vector(0.8, 1), vector(0.8, 2), vector(0.3, 1)])
+        context, sources = pack_context([1, 0, 2], QUERY, vectors, texts, urls, max_passages=3, min_similarity=0.2)
+        self.assertEqual(sources, ["u/a", "u/b"])
+        self.assertIn("[u/a]\nfirst half second half", context)
+
+    def test_floor_drops_dissimilar_passages_unless_exempt(self):
+        texts, urls = ["relevant", "unrelated"], ["u/a", "u/b"]
+        vectors = np.array([vector(0.6), vector(0.05)])
+        _, sources = pack_context([0, 1], QUERY, vectors, texts, urls, max_passages=2, min_similarity=0.2)
+        self.assertEqual(sources, ["u/a"])
+        _, sources = pack_context([0, 1], QUERY, vectors, texts, urls, max_passages=2, min_similarity=0.2, exempt={1})
+        self.assertEqual(sources, ["u/a", "u/b"])
+
+    def test_nothing_above_the_floor_gives_empty_context(self):
+        context, sources = pack_context([0], QUERY, np.array([vector(0.1)]), ["x"], ["u"], max_passages=1, min_similarity=0.2)
+        self.assertEqual((context, sources), ("", []))
+
+    def test_skips_near_duplicates(self):
+        texts, urls = ["same text", "same text", "different"], ["u/a", "u/c", "u/b"]
+        vectors = np.array([vector(0.9), vector(0.9), vector(0.5, 2)])
+        _, sources = pack_context([0, 1, 2], QUERY, vectors, texts, urls, max_passages=3)
+        self.assertEqual(sources, ["u/a", "u/b"])
+
+    def test_truncates_to_the_token_budget(self):
+        texts, urls = ["a" * 2000, "b" * 2000], ["u/a", "u/b"]
+        vectors = np.array([vector(0.9), vector(0.8, 2)])
+        context, sources = pack_context([0, 1], QUERY, vectors, texts, urls, max_passages=2, token_budget=300)
+        self.assertLessEqual(estimate_tokens(context), 300 + 1)
+        self.assertEqual(sources, ["u/a"])
+
+
+class AnswerBudgetTest(unittest.TestCase):
+    def test_verbosity_scales_between_min_and_max(self):
+        self.assertEqual(answer_token_limit("hi", 0), context_packer.MIN_ANSWER_TOKENS)
+        self.assertEqual(answer_token_limit("hi", 100), context_packer.MAX_ANSWER_TOKENS)
+
+    def test_clamped_to_what_is_left_of_the_window(self):
+        window = context_packer.MODEL_CONTEXT_WINDOW - context_packer.CONTEXT_SAFETY_MARGIN
+        nearly_full = "x" * ((window - 50) * 4)
+        self.assertLess(answer_token_limit(nearly_full, 100), context_packer.MIN_ANSWER_TOKENS)
+        self.assertEqual(answer_token_limit("x" * (window * 4 + 400), 100), 0)
+
+    def test_trim_context_frees_the_requested_tokens(self):
+        context = "c" * 4000
+        self.assertEqual(len(trim_context(context, 100)), 3600)
+        self.assertEqual(trim_context(context, 990), "")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+import json
+import os
+import tempfile
+import time
+import unittest
+
+import build_manifest
+from docstore import DocStore, migrate, write_docstore
+
+TEXTS = ["Tuition is $12,500 per semester.", "", "Résidence halls open in August — apply early.", "Tours run daily."]
+URLS = ["https://college.edu/tuition", "https://college.edu/tuition", "https://college.edu/housing", "https://college.edu/visit"]
+
+
+class DocStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        self.path = os.path.join(self.dir.name, "docs.bin")
+
+    def test_round_trip(self):
+        write_docstore(self.path, TEXTS, URLS)
+        store = DocStore(self.path)
+        self.assertEqual(len(store.texts), len(TEXTS))
+        self.assertEqual([store.texts[i] for i in range(len(TEXTS))], TEXTS)
+        self.assertEqual([store.urls[i] for i in range(len(URLS))], URLS)
+        self.assertEqual(store.texts[-1], TEXTS[-1])
+        with self.assertRaises(IndexError):
+            store.texts[len(TEXTS)]
+
+    def test_empty_store(self):
+        write_docstore(self.path, [], [])
+        store = DocStore(self.path)
+        self.assertEqual((len(store.texts), len(store.urls)), (0, 0))
+        with self.assertRaises(IndexError):
+            store.urls[0]
+
+    def test_rejects_other_files(self):
+        with open(self.path, "wb") as f:
+            f.write(b"{" * 64)
+        with self.assertRaises(ValueError):
+            DocStore(self.path)
+
+    def test_migrate_converts_docs_json(self):
+        with open(os.path.join(self.dir.name, "docs.json"), "w", encoding="utf-8") as f:
+            json.dump({"texts": TEXTS, "urls": URLS}, f)
+        self.assertTrue(migrate(self.dir.name))
+        store = DocStore(self.path)
+        self.assertEqual(list(store.texts[i] for i in range(len(TEXTS))), TEXTS)
+        # No temp files left behind
+        self.assertEqual(sorted(os.listdir(self.dir.name)), ["docs.bin", "docs.json"])
+
+
+class BuildManifestTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        self.base = self.dir.name
+        write_docstore(os.path.join(self.base, "docs.bin"), TEXTS, URLS)
+        with open(os.path.join(self.base, "faiss.index"), "wb") as f:
+            f.write(b"index")
+
+    def test_no_manifest_reads_as_a_legacy_build(self):
+        self.assertIsNone(build_manifest.read_manifest(self.base))
+
+    def test_published_build_matches(self):
+        build_manifest.write_manifest(self.base)
+        manifest = build_manifest.read_manifest(self.base)
+        self.assertEqual(set(manifest["files"]), {"docs.bin", "faiss.index"})
+        self.assertTrue(build_manifest.matches(self.base, manifest))
+
+    def test_a_file_swapped_after_publishing_is_a_mismatch(self):
+        build_manifest.write_manifest(self.base)
+        manifest = build_manifest.read_manifest(self.base)
+        time.sleep(0.01)
+        write_docstore(os.path.join(self.base, "docs.bin"), TEXTS[:2], URLS[:2])
+        self.assertFalse(build_manifest.matches(self.base, manifest))
+        # The next publish covers the new file
+        build_manifest.write_manifest(self.base)
+        self.assertTrue(build_manifest.matches(self.base, build_manifest.read_manifest(self.base)))
+
+    def test_added_or_removed_files_are_a_mismatch(self):
+        build_manifest.write_manifest(self.base)
+        manifest = build_manifest.read_manifest(self.base)
+        with open(os.path.join(self.base, "bm25.json"), "w") as f:
+            f.write("{}")
+        self.assertFalse(build_manifest.matches(self.base, manifest))
+        os.remove(os.path.join(self.base, "bm25.json"))
+        os.remove(os.path.join(self.base, "faiss.index"))
+        self.assertFalse(build_manifest.matches(self.base, manifest))
+
+
+if __name__ == "__main__":
+    unittest.main()
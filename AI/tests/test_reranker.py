@@ -0,0 +1,63 @@
+import unittest
+from unittest import mock
+
+import chatbot
+from reranker import Reranker
+from test_retrieval import Company
+
+
+class FakeCrossEncoder:
+    """Scores a (query, passage) pair by its logit in `logits`, keyed on the passage text."""
+
+    def __init__(self, logits=None, error=None):
+        self.logits = logits or {}
+        self.error = error
+
+    def predict(self, pairs, batch_size=32):
+        if self.error:
+            raise self.error
+        return [self.logits.get(text, -5.0) for _, text in pairs]
+
+
+def make_reranker(model):
+    reranker = Reranker(budget_ms=1e9)
+    reranker.model = model
+    return reranker
+
+
+class RerankTest(unittest.TestCase):
+    TEXTS = ["relevant", "also relevant", "noise"]
+
+    def test_keeps_only_passages_above_min_score_best_first(self):
+        reranker = make_reranker(FakeCrossEncoder({"relevant": 2.0, "also relevant": 4.0}))
+        ids, scores = reranker.rerank("q", [0, 1, 2], self.TEXTS, k=5)
+        self.assertEqual(ids, [1, 0])
+        self.assertEqual(scores, sorted(scores, reverse=True))
+
+    def test_nothing_above_min_score_keeps_nothing(self):
+        reranker = make_reranker(FakeCrossEncoder())
+        self.assertEqual(reranker.rerank("q", [0, 1, 2], self.TEXTS, k=5), ([], []))
+
+    def test_model_error_falls_back_and_frees_the_slot(self):
+        reranker = make_reranker(FakeCrossEncoder(error=RuntimeError("out of memory")))
+        with mock.patch("traceback.print_exc"):
+            self.assertEqual(reranker.rerank("q", [0, 1], self.TEXTS, k=5), (None, None))
+        self.assertEqual(reranker.inflight, 0)
+
+
+class GetContextWithRerankerTest(unittest.TestCase):
+    def test_rejected_candidates_still_face_the_similarity_floor(self):
+        company = Company()
+        with mock.patch.object(chatbot, "reranker", make_reranker(FakeCrossEncoder())):
+            self.assertEqual(company.context("Who won the Super Bowl last year?"), ("", []))
+
+    def test_accepted_passages_skip_the_floor(self):
+        company = Company()
+        cs_text = company.texts[2]
+        with mock.patch.object(chatbot, "reranker", make_reranker(FakeCrossEncoder({cs_text: 3.0}))):
+            _, sources = company.context("Which course covers data structures?", min_similarity=0.99)
+        self.assertEqual(sources, ["https://college.edu/cs"])
+
+
+if __name__ == "__main__":
+    unittest.main()
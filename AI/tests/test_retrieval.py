@@ -0,0 +1,115 @@
+import unittest
+from unittest import mock
+
+import faiss
+import numpy as np
+
+import chatbot
+from bm25 import BM25Index, build_bm25, tokenize
+
+PASSAGES = [
+    ("https://college.edu/tuition", "Tuition for 2025-26 is $12,500 per semester for full-time students."),
+    ("https://college.edu/housing", "Campus housing is guaranteed for new students who apply by May 1."),
+    ("https://college.edu/cs", "CS2420 Data Structures is required for the computer science degree."),
+    ("https://college.edu/admissions", "Admission decisions are released within four weeks of a complete application."),
+    ("https://college.edu/visit", "Campus tours run every weekday morning."),
+    ("https://college.edu/aid", "Scholarships are awarded automatically on admission based on GPA."),
+    ("https://college.edu/library", "The library is open until midnight during finals week."),
+    ("https://college.edu/parking", "Student parking permits cost $150 a semester."),
+]
+
+OFF_TOPIC = [
+    "What's the weather like in Paris today?",
+    "Who won the Super Bowl last year?",
+    "Can you write me a poem about cats?",
+]
+
+
+class BagOfWordsEncoder:
+    """Deterministic stand-in for the sentence encoder: one dimension per corpus term."""
+
+    def __init__(self, texts):
+        terms = sorted({term for text in texts for term in tokenize(text)})
+        self.vocab = {term: i for i, term in enumerate(terms)}
+
+    def encode(self, sentences):
+        vectors = np.zeros((len(sentences), len(self.vocab)), dtype=np.float32)
+        for row, sentence in enumerate(sentences):
+            for term in tokenize(sentence):
+                if term in self.vocab:
+                    vectors[row, self.vocab[term]] += 1
+        return vectors
+
+
+class Company:
+    def __init__(self, passages=PASSAGES):
+        self.urls = [url for url, _ in passages]
+        self.texts = [text for _, text in passages]
+        self.model = BagOfWordsEncoder(self.texts)
+        vectors = self.model.encode(self.texts)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        self.index = faiss.IndexFlatIP(vectors.shape[1])
+        self.index.add(vectors)
+        self.bm25 = BM25Index(build_bm25(self.texts))
+
+    def context(self, query, **kwargs):
+        sources = []
+        context = chatbot.get_context(
+            query, 5, self.model, self.index, self.texts, self.urls, sources=sources, bm25=self.bm25, **kwargs
+        )
+        return context, sources
+
+
+class GetContextTest(unittest.TestCase):
+    def setUp(self):
+        self.company = Company()
+
+    def test_off_topic_query_gets_empty_context(self):
+        for query in OFF_TOPIC:
+            with self.subTest(query=query):
+                self.assertEqual(self.company.context(query), ("", []))
+
+    def test_on_topic_query_gets_its_passage(self):
+        context, sources = self.company.context("How much is tuition per semester?")
+        self.assertEqual(sources[0], "https://college.edu/tuition")
+        self.assertIn("$12,500", context)
+
+    def test_code_match_skips_the_similarity_floor(self):
+        _, sources = self.company.context("Do I need CS2420 before graduating, and is it hard?", min_similarity=0.99)
+        self.assertEqual(sources, ["https://college.edu/cs"])
+
+
+class AskBotShortCircuitTest(unittest.TestCase):
+    def setUp(self):
+        self.company = Company()
+        patcher = mock.patch.object(chatbot, "get_running_models", return_value=["phi-3.1-mini-test"])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def ask(self, question, trace):
+        c = self.company
+        return chatbot.ask_bot(
+            question, c.model, c.index, c.texts, c.urls, "college", trace=trace, bm25=c.bm25,
+            use_faq=False, identity_data={"full_name": "Example College"}
+        )
+
+    def test_off_topic_question_is_answered_without_the_llm(self):
+        with mock.patch.object(chatbot, "complete") as complete:
+            trace = {}
+            answer = self.ask("What's the weather like in Paris today?", trace)
+        complete.assert_not_called()
+        self.assertTrue(trace.get("short_circuit"))
+        self.assertEqual(answer, chatbot.NO_INFO_ANSWER)
+        self.assertEqual(trace["sources"], [])
+
+    def test_relevant_question_reaches_the_llm(self):
+        with mock.patch.object(chatbot, "complete", return_value=("It is $12,500.", "phi-3.1-mini-test", {})) as complete:
+            trace = {}
+            answer = self.ask("How much is tuition per semester?", trace)
+        complete.assert_called_once()
+        self.assertNotIn("short_circuit", trace)
+        self.assertEqual(answer, "It is $12,500.")
+
+
+if __name__ == "__main__":
+    unittest.main()
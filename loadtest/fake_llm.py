@@ -0,0 +1,133 @@
+"""
+OpenAI-compatible stand-in for LM Studio.
+
+Serves GET /v1/models and POST /v1/chat/completions (plain and streamed) with
+a configurable time to first token and token rate, so /chat can be load
+tested without a GPU. Like LM Studio, each loaded model works on
+FAKE_LLM_SLOTS requests at a time and queues the rest.
+
+    FAKE_LLM_MODELS          comma-separated model IDs (default phi-3.1-mini-128k-instruct)
+    FAKE_LLM_LATENCY_MS      time to first token (default 300)
+    FAKE_LLM_TOKENS_PER_SEC  generation rate per request (default 40)
+    FAKE_LLM_ANSWER_TOKENS   answer length before max_tokens caps it (default 120)
+    FAKE_LLM_SLOTS           concurrent requests per model, 0 = unlimited (default 1)
+
+    uvicorn fake_llm:app --port 8888
+"""
+import os
+import json
+import time
+import uuid
+import asyncio
+from fastapi import FastAPI, Body, HTTPException
+from fastapi.responses import StreamingResponse
+
+MODELS = [m for m in os.getenv("FAKE_LLM_MODELS", "phi-3.1-mini-128k-instruct").split(",") if m]
+LATENCY_MS = float(os.getenv("FAKE_LLM_LATENCY_MS", "300"))
+TOKENS_PER_SEC = float(os.getenv("FAKE_LLM_TOKENS_PER_SEC", "40"))
+ANSWER_TOKENS = int(os.getenv("FAKE_LLM_ANSWER_TOKENS", "120"))
+SLOTS = int(os.getenv("FAKE_LLM_SLOTS", "1"))
+
+WORDS = (
+    "Admissions are open year round and the application takes about twenty minutes "
+    "to complete online. Tuition is billed per quarter and financial aid is available "
+    "for eligible students who file the FAFSA before the priority deadline."
+).split()
+
+app = FastAPI()
+slots = {}
+
+
+def model_slot(model):
+    if SLOTS <= 0:
+        return None
+    if model not in slots:
+        slots[model] = asyncio.Semaphore(SLOTS)
+    return slots[model]
+
+
+def estimate_tokens(text):
+    return len(text) // 4 + 1
+
+
+def answer_tokens(body):
+    max_tokens = body.get("max_tokens") or ANSWER_TOKENS
+    return [WORDS[i % len(WORDS)] for i in range(min(ANSWER_TOKENS, int(max_tokens)))]
+
+
+def completion_id():
+    return f"chatcmpl-{uuid.uuid4().hex[:24]}"
+
+
+@app.get("/v1/models")
+def list_models():
+    return {"object": "list", "data": [{"id": m, "object": "model", "owned_by": "fake-llm"} for m in MODELS]}
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(body: dict = Body(...)):
+    model = body.get("model")
+    if model not in MODELS:
+        raise HTTPException(status_code=404, detail=f"Model '{model}' is not loaded")
+
+    prompt_tokens = sum(estimate_tokens(m.get("content") or "") for m in body.get("messages", []))
+    tokens = answer_tokens(body)
+    if body.get("stream"):
+        return StreamingResponse(stream_completion(model, tokens), media_type="text/event-stream")
+
+    slot = model_slot(model)
+    if slot:
+        await slot.acquire()
+    try:
+        await asyncio.sleep(LATENCY_MS / 1000 + len(tokens) / TOKENS_PER_SEC)
+    finally:
+        if slot:
+            slot.release()
+
+    return {
+        "id": completion_id(),
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": " ".join(tokens)},
+            "finish_reason": "stop" if len(tokens) < ANSWER_TOKENS else "length",
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": len(tokens),
+            "total_tokens": prompt_tokens + len(tokens),
+        },
+    }
+
+
+async def stream_completion(model, tokens):
+    cid = completion_id()
+    slot = model_slot(model)
+    if slot:
+        await slot.acquire()
+    try:
+        await asyncio.sleep(LATENCY_MS / 1000)
+        for i, token in enumerate(tokens):
+            chunk = {
+                "id": cid,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": token if i == 0 else " " + token}, "finish_reason": None}],
+            }
+            yield f"data: {json.dumps(chunk)}\n\n"
+            await asyncio.sleep(1 / TOKENS_PER_SEC)
+        done = {
+            "id": cid,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+        }
+        yield f"data: {json.dumps(done)}\n\n"
+        yield "data: [DONE]\n\n"
+    finally:
+        if slot:
+            slot.release()
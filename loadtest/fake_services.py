@@ -0,0 +1,193 @@
+"""
+Local stand-ins for the external services the backend calls, besides
+MongoDB (the load-test compose file runs a plain mongo container):
+
+  Cognito user pool   POST /  (InitiateAuth and GetUser, AWS JSON protocol,
+                      reached through COGNITO_ENDPOINT_URL) and
+                      GET /<pool>/.well-known/jwks.json (through COGNITO_ISSUER)
+  College website     GET /site/...  for /scrapeCollegeData to crawl, plus
+                      /robots.txt and /sitemap.xml for its sitemap mode
+
+Every user exists and FAKE_COGNITO_PASSWORD is everyone's password. The
+company claim is the email's local part, so neumont@loadtest.local is an
+admin of "neumont". Tokens are RS256-signed with a key generated at startup.
+
+    FAKE_COGNITO_ISSUER     issuer URL, must match the backend's COGNITO_ISSUER
+    FAKE_COGNITO_CLIENT_ID  audience, must match COGNITO_CLIENT_ID
+    FAKE_COGNITO_PASSWORD   (default loadtest)
+    FAKE_SITE_PAGES         pages in the college website (default 40)
+
+    uvicorn fake_services:app --port 9000
+"""
+import os
+import json
+import time
+import uuid
+import jwt
+from jwt import algorithms
+from cryptography.hazmat.primitives.asymmetric import rsa
+from fastapi import FastAPI, Request, HTTPException
+from fastapi.responses import JSONResponse, HTMLResponse, PlainTextResponse, Response
+
+ISSUER = os.getenv("FAKE_COGNITO_ISSUER", "http://fake-services:9000/us-east-2_loadtest").rstrip("/")
+CLIENT_ID = os.getenv("FAKE_COGNITO_CLIENT_ID", "loadtest-client")
+PASSWORD = os.getenv("FAKE_COGNITO_PASSWORD", "loadtest")
+TOKEN_TTL = 3600
+# Every page's sitemap lastmod, so repeated sitemap scrapes find nothing changed
+SITE_LASTMOD = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+SITE_PAGES = int(os.getenv("FAKE_SITE_PAGES", "40"))
+
+KEY_ID = uuid.uuid4().hex
+PRIVATE_KEY = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+app = FastAPI()
+
+
+# ---- Cognito ----
+
+def cognito_error(error_type, message):
+    return JSONResponse(
+        status_code=400,
+        content={"__type": error_type, "message": message},
+        headers={"x-amzn-ErrorType": error_type},
+    )
+
+
+def user_attributes(email):
+    company = email.split("@")[0]
+    return {
+        "sub": str(uuid.uuid5(uuid.NAMESPACE_URL, email)),
+        "email": email,
+        "email_verified": "true",
+        "custom:Company": company,
+        "custom:role": "admin",
+    }
+
+
+def issue_token(email, token_use):
+    now = int(time.time())
+    claims = {
+        **user_attributes(email),
+        "iss": ISSUER,
+        "token_use": token_use,
+        "auth_time": now,
+        "iat": now,
+        "exp": now + TOKEN_TTL,
+        "jti": str(uuid.uuid4()),
+    }
+    if token_use == "id":
+        claims["aud"] = CLIENT_ID
+    else:
+        claims["client_id"] = CLIENT_ID
+    return jwt.encode(claims, PRIVATE_KEY, algorithm="RS256", headers={"kid": KEY_ID})
+
+
+def initiate_auth(params):
+    if params.get("ClientId") != CLIENT_ID:
+        return cognito_error("ResourceNotFoundException", "User pool client does not exist.")
+    auth = params.get("AuthParameters") or {}
+    email = auth.get("USERNAME", "")
+    if "@" not in email or auth.get("PASSWORD") != PASSWORD:
+        return cognito_error("NotAuthorizedException", "Incorrect username or password.")
+    return {
+        "AuthenticationResult": {
+            "IdToken": issue_token(email, "id"),
+            "AccessToken": issue_token(email, "access"),
+            "RefreshToken": uuid.uuid4().hex,
+            "ExpiresIn": TOKEN_TTL,
+            "TokenType": "Bearer",
+        },
+        "ChallengeParameters": {},
+    }
+
+
+def get_user(params):
+    try:
+        claims = jwt.decode(params.get("AccessToken", ""), PRIVATE_KEY.public_key(), algorithms=["RS256"], issuer=ISSUER)
+    except jwt.InvalidTokenError as e:
+        return cognito_error("NotAuthorizedException", f"Invalid Access Token: {e}")
+    attributes = user_attributes(claims["email"])
+    return {
+        "Username": attributes["sub"],
+        "UserAttributes": [{"Name": name, "Value": value} for name, value in attributes.items()],
+    }
+
+
+COGNITO_ACTIONS = {
+    "InitiateAuth": initiate_auth,
+    "GetUser": get_user,
+}
+
+
+@app.post("/")
+async def cognito(request: Request):
+    target = request.headers.get("x-amz-target", "")
+    action = COGNITO_ACTIONS.get(target.rsplit(".", 1)[-1])
+    if action is None:
+        return cognito_error("InvalidAction", f"Unsupported action {target}")
+    result = action(json.loads(await request.body() or b"{}"))
+    if isinstance(result, JSONResponse):
+        return result
+    return JSONResponse(content=result, media_type="application/x-amz-json-1.1")
+
+
+@app.get("/{pool_id}/.well-known/jwks.json")
+def jwks(pool_id: str):
+    if not ISSUER.endswith(f"/{pool_id}"):
+        raise HTTPException(status_code=404, detail="Unknown user pool")
+    key = json.loads(algorithms.RSAAlgorithm.to_jwk(PRIVATE_KEY.public_key()))
+    key.update({"kid": KEY_ID, "alg": "RS256", "use": "sig"})
+    return {"keys": [key]}
+
+
+# ---- College website ----
+
+TOPICS = ["admissions", "tuition", "financial-aid", "campus", "student-life", "housing", "programs", "faculty"]
+
+
+def page_slug(n):
+    return f"{TOPICS[n % len(TOPICS)]}-{n}"
+
+
+def page_number(slug):
+    if slug == "index":
+        return 0
+    suffix = slug.rsplit("-", 1)[-1]
+    return int(suffix) if suffix.isdigit() else -1
+
+
+@app.get("/site/", response_class=HTMLResponse)
+@app.get("/site/{slug}", response_class=HTMLResponse)
+def site_page(slug: str = "index"):
+    n = page_number(slug)
+    if not 0 <= n < SITE_PAGES:
+        raise HTTPException(status_code=404, detail="Page not found")
+
+    topic = TOPICS[n % len(TOPICS)].replace("-", " ")
+    paragraphs = "".join(
+        f"<p>Page {n} covers {topic} at Loadtest College. Students asking about {topic} "
+        f"can find deadlines, costs and contacts here; section {i} repeats the details "
+        f"so each page has enough text to be indexed.</p>"
+        for i in range(6)
+    )
+    links = "".join(
+        f'<a href="/site/{page_slug(m)}">{page_slug(m)}</a> '
+        for m in ((n * 7 + k) % SITE_PAGES for k in range(1, 6))
+    )
+    return f"<html><head><title>{topic}</title><script>var x = 1;</script></head><body>{paragraphs}<nav>{links}</nav></body></html>"
+
+
+@app.get("/robots.txt", response_class=PlainTextResponse)
+def robots(request: Request):
+    return f"User-agent: *\nDisallow: /private/\nSitemap: {str(request.base_url).rstrip('/')}/sitemap.xml\n"
+
+
+@app.get("/sitemap.xml")
+def sitemap(request: Request):
+    base = str(request.base_url).rstrip("/")
+    urls = "".join(
+        f"<url><loc>{base}/site/{page_slug(n)}</loc><lastmod>{SITE_LASTMOD}</lastmod></url>"
+        for n in range(SITE_PAGES)
+    )
+    body = f'<?xml version="1.0" encoding="UTF-8"?><urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{urls}</urlset>'
+    return Response(content=body, media_type="application/xml")
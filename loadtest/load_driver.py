@@ -0,0 +1,256 @@
+"""
+Closed-loop load driver for the backend.
+
+Each scenario is run at every concurrency level: `concurrency` workers send
+requests back to back until --requests have completed, and latency p50/p95/
+p99, throughput, error rate and status codes are recorded. Results are
+written as JSON stamped with the git commit, and --compare prints the change
+against an earlier results file (exit status 1 past --max-regression).
+
+Scenarios:
+  login   POST /login with a stand-in Cognito user
+  customs GET /customs?company=...
+  chat    POST /chat (backend -> AI replica -> fake LLM)
+  scrape  POST /scrapeCollegeData against the stand-in college website
+
+Setup logs in as each company's admin and stores its customs, so /chat can
+build its prompt. Run against the load-test stack (see
+docker-compose.loadtest.yml):
+
+    python loadtest/load_driver.py --concurrency 1 8 32 --out loadtest/results/$(git rev-parse --short HEAD).json
+    python loadtest/load_driver.py --compare loadtest/results/baseline.json --out loadtest/results/new.json
+"""
+import os
+import json
+import time
+import random
+import asyncio
+import argparse
+import subprocess
+from datetime import datetime, timezone
+import numpy as np
+import httpx
+
+PASSWORD = os.getenv("FAKE_COGNITO_PASSWORD", "loadtest")
+# Company that /scrapeCollegeData logs in as; its scrapes write to
+# loadtest-scrape-<n>, kept apart from the chat corpora
+SCRAPE_COMPANY = "loadtest-scrape"
+
+QUESTIONS = [
+    "What is the application deadline for fall admission?",
+    "How much is tuition per quarter?",
+    "Does the college offer on-campus housing?",
+    "Tell me about the computer science degree.",
+    "Is financial aid available for international students?",
+    "What are the admission requirements?",
+]
+
+DEFAULT_CUSTOMS = {
+    "modelName": "Loadtest Bot",
+    "modelLogo": "",
+    "introduction": "Hi! Ask me anything about admissions.",
+    "friendliness": 70,
+    "formality": 40,
+    "accent": "none",
+    "verbosity": 50,
+    "humor": 20,
+    "technicalLevel": 40,
+    "preferredGreeting": "Hello",
+    "signatureClosing": "Good luck!",
+    "instructions": "",
+    "botHexBackgroundColor": "#ffffff",
+    "botHexTextColor": "#000000",
+    "type": "college",
+    "forbidden_terms": [],
+}
+
+
+def admin_email(company):
+    return f"{company}@loadtest.local"
+
+
+def auth_headers(token):
+    return {"Cookie": f"idToken={token}"}
+
+
+async def login(client, company):
+    response = await client.post("/login", json={"email": admin_email(company), "password": PASSWORD})
+    response.raise_for_status()
+    return response.cookies["idToken"]
+
+
+async def setup(client, companies):
+    tokens = {}
+    for company in companies + [SCRAPE_COMPANY]:
+        tokens[company] = await login(client, company)
+        customs = {**DEFAULT_CUSTOMS, "full_name": f"{company} College", "short_name": company}
+        response = await client.post("/customs", json=customs, headers=auth_headers(tokens[company]))
+        response.raise_for_status()
+    return tokens
+
+
+def scenario_requests(name, args, tokens):
+    """Returns a coroutine factory issuing one request of the scenario."""
+    companies = args.companies
+
+    async def login_request(client):
+        return await client.post("/login", json={"email": admin_email(random.choice(companies)), "password": PASSWORD})
+
+    async def customs_request(client):
+        return await client.get("/customs", params={"company": random.choice(companies)})
+
+    async def chat_request(client):
+        return await client.post("/chat", json={"prompt": random.choice(QUESTIONS), "company": random.choice(companies)})
+
+    # One scrape per company runs at a time (the backend answers 409), so each
+    # in-flight request borrows its own target directory
+    scrape_targets = asyncio.Queue()
+    for slot in range(max(args.concurrency)):
+        scrape_targets.put_nowait(f"{SCRAPE_COMPANY}-{slot}")
+
+    async def scrape_request(client):
+        target = await scrape_targets.get()
+        try:
+            return await client.post(
+                "/scrapeCollegeData",
+                json={
+                    "url": f"{args.site_url}/site/index", "pages": args.scrape_pages,
+                    "companyName": target, "mode": args.scrape_mode,
+                },
+                headers=auth_headers(tokens[SCRAPE_COMPANY]),
+            )
+        finally:
+            scrape_targets.put_nowait(target)
+
+    return {
+        "login": login_request,
+        "customs": customs_request,
+        "chat": chat_request,
+        "scrape": scrape_request,
+    }[name]
+
+
+async def run_level(client, send, concurrency, total):
+    latencies, statuses = [], {}
+    remaining = total
+
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            start = time.perf_counter()
+            try:
+                response = await send(client)
+                status = str(response.status_code)
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    errors = sum(count for status, count in statuses.items() if not status.startswith(("2", "3")))
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "duration_s": elapsed,
+        "throughput_rps": len(latencies) / elapsed,
+        "error_rate": errors / len(latencies),
+        "statuses": statuses,
+        "p50_ms": float(np.percentile(latencies_ms, 50)),
+        "p95_ms": float(np.percentile(latencies_ms, 95)),
+        "p99_ms": float(np.percentile(latencies_ms, 99)),
+        "mean_ms": float(latencies_ms.mean()),
+        "max_ms": float(latencies_ms.max()),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(report, baseline, max_regression):
+    """Prints p95/throughput deltas per scenario and level. Returns True if within budget."""
+    previous = {(r["scenario"], r["concurrency"]): r for r in baseline["results"]}
+    ok = True
+    print(f"\nvs {baseline.get('commit') or 'baseline'}:")
+    for row in report["results"]:
+        before = previous.get((row["scenario"], row["concurrency"]))
+        if not before:
+            continue
+        p95_change = (row["p95_ms"] - before["p95_ms"]) / before["p95_ms"] * 100
+        rps_change = (row["throughput_rps"] - before["throughput_rps"]) / before["throughput_rps"] * 100
+        regressed = p95_change > max_regression or rps_change < -max_regression
+        ok = ok and not regressed
+        print(
+            f"{row['scenario']:>8} c={row['concurrency']:<4} p95 {before['p95_ms']:.1f} -> {row['p95_ms']:.1f} ms "
+            f"({p95_change:+.1f}%), rps {before['throughput_rps']:.1f} -> {row['throughput_rps']:.1f} "
+            f"({rps_change:+.1f}%){'  REGRESSION' if regressed else ''}"
+        )
+    return ok
+
+
+async def main(args):
+    limits = httpx.Limits(max_connections=max(args.concurrency) * 2)
+    timeout = httpx.Timeout(args.timeout)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=timeout) as client:
+        tokens = await setup(client, args.companies)
+
+        results = []
+        for name in args.scenarios:
+            send = scenario_requests(name, args, tokens)
+            total = args.scrape_requests if name == "scrape" else args.requests
+            for _ in range(args.warmup):
+                await send(client)
+            for concurrency in args.concurrency:
+                row = {"scenario": name, **await run_level(client, send, concurrency, total)}
+                results.append(row)
+                print(
+                    f"{name:>8} c={concurrency:<4} n={row['requests']:<5} "
+                    f"p50={row['p50_ms']:.1f}ms p95={row['p95_ms']:.1f}ms p99={row['p99_ms']:.1f}ms "
+                    f"rps={row['throughput_rps']:.1f} errors={row['error_rate']:.1%}"
+                )
+
+    return {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("out", "compare")},
+        "results": results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--site-url", default="http://fake-services:9000", help="College website as seen from the backend")
+    parser.add_argument("--scenarios", nargs="+", default=["login", "customs", "chat", "scrape"], choices=["login", "customs", "chat", "scrape"])
+    parser.add_argument("--companies", nargs="+", default=["neumont", "byu", "exampleCollege"])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--requests", type=int, default=200, help="Requests per concurrency level")
+    parser.add_argument("--scrape-requests", type=int, default=8, help="Requests per level for the scrape scenario")
+    parser.add_argument("--scrape-pages", type=int, default=10)
+    parser.add_argument("--scrape-mode", default="auto", choices=["auto", "crawl", "sitemap"], help="Discovery mode for the scrape scenario")
+    parser.add_argument("--warmup", type=int, default=2, help="Unrecorded requests before each scenario")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--out", help="Write results as JSON")
+    parser.add_argument("--compare", help="Earlier results JSON to compare against")
+    parser.add_argument("--max-regression", type=float, default=10.0, help="Allowed p95/throughput change in percent")
+    args = parser.parse_args()
+
+    report = asyncio.run(main(args))
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if not compare(report, baseline, args.max_regression):
+            raise SystemExit(1)
@@ -0,0 +1,239 @@
+import os
+import time
+import random
+import bisect
+import hashlib
+import asyncio
+import httpx
+from src.metrics import AI_REQUESTS
+
+AI_URL = os.getenv("AI_URL", "http://ai-acme:8001")
+# Comma-separated AI replica base URLs; companies are sharded across them by consistent hashing
+AI_REPLICAS = [u.strip() for u in os.getenv("AI_REPLICAS", AI_URL).split(",") if u.strip()]
+# Tried after every replica on the ring is unavailable
+AI_FALLBACK_URL = os.getenv("AI_FALLBACK_URL", "")
+AI_VIRTUAL_NODES = int(os.getenv("AI_VIRTUAL_NODES", "100"))
+
+# Connection pool / timeout settings for backend -> AI traffic
+AI_MAX_CONNECTIONS = int(os.getenv("AI_MAX_CONNECTIONS", "50"))
+AI_MAX_KEEPALIVE = int(os.getenv("AI_MAX_KEEPALIVE", "20"))
+AI_CONNECT_TIMEOUT = float(os.getenv("AI_CONNECT_TIMEOUT", "2"))
+AI_READ_TIMEOUT = float(os.getenv("AI_READ_TIMEOUT", "50"))
+AI_POOL_TIMEOUT = float(os.getenv("AI_POOL_TIMEOUT", "5"))
+
+AI_RETRIES = int(os.getenv("AI_RETRIES", "2"))
+AI_RETRY_BASE_DELAY = float(os.getenv("AI_RETRY_BASE_DELAY", "0.1"))
+
+# Circuit breaker: open after this many consecutive failures, probe again after the cooldown
+BREAKER_THRESHOLD = int(os.getenv("AI_BREAKER_THRESHOLD", "5"))
+BREAKER_COOLDOWN = float(os.getenv("AI_BREAKER_COOLDOWN", "15"))
+
+
+class AIUnavailable(Exception):
+    """Raised without contacting the AI service while the circuit is open."""
+
+
+class AIServiceError(Exception):
+    pass
+
+
+class AIConnectError(AIServiceError):
+    """The request never reached the replica, so another one can safely take it."""
+
+
+class CircuitBreaker:
+    def __init__(self, threshold, cooldown):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    def allow(self):
+        if self.opened_at is None:
+            return True
+        if time.monotonic() - self.opened_at < self.cooldown or self.probing:
+            return False
+        # Half-open: let a single request through to test the service
+        self.probing = True
+        return True
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        self.probing = False
+        if self.failures >= self.threshold:
+            self.opened_at = time.monotonic()
+
+    def release_probe(self):
+        """The probe ended without an outcome (e.g. cancelled): let the next request probe."""
+        self.probing = False
+
+
+class HashRing:
+    """
+    Consistent hash ring of replica URLs. Each replica owns many virtual nodes,
+    so adding or removing one only moves roughly 1/N of the companies.
+    """
+
+    def __init__(self, nodes, virtual_nodes=AI_VIRTUAL_NODES):
+        self.virtual_nodes = virtual_nodes
+        self._keys = []
+        self._nodes = {}
+        for node in nodes:
+            self.add(node)
+
+    @staticmethod
+    def _hash(value):
+        return int.from_bytes(hashlib.md5(value.encode("utf-8")).digest()[:8], "big")
+
+    def add(self, node):
+        for i in range(self.virtual_nodes):
+            key = self._hash(f"{node}#{i}")
+            if key not in self._nodes:
+                bisect.insort(self._keys, key)
+            self._nodes[key] = node
+
+    def remove(self, node):
+        for i in range(self.virtual_nodes):
+            key = self._hash(f"{node}#{i}")
+            if self._nodes.get(key) == node:
+                del self._nodes[key]
+                self._keys.pop(bisect.bisect_left(self._keys, key))
+
+    def preference_list(self, key):
+        """Distinct replicas in ring order starting at the key's owner."""
+        if not self._keys:
+            return []
+        start = bisect.bisect(self._keys, self._hash(key))
+        replicas = []
+        for i in range(len(self._keys)):
+            node = self._nodes[self._keys[(start + i) % len(self._keys)]]
+            if node not in replicas:
+                replicas.append(node)
+        return replicas
+
+
+# Failures where the request never reached the AI service, so a retry cannot duplicate work
+RETRYABLE_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+# Statuses that mean the replica itself is down or overloaded. Other 5xx are
+# application errors (e.g. "No chatbot models are running") from a live replica
+# and must not open its circuit.
+BREAKER_FAILURE_STATUSES = {502, 503, 504}
+
+
+class AIClient:
+    """
+    Shared keep-alive HTTP client for the AI service.
+    Created lazily inside the running event loop and closed on app shutdown.
+    """
+
+    def __init__(self, replicas=AI_REPLICAS, fallback_url=AI_FALLBACK_URL):
+        self._client = None
+        self.ring = HashRing(replicas)
+        self.fallback_url = fallback_url
+        self.breakers = {}
+
+    def _breaker(self, base_url):
+        if base_url not in self.breakers:
+            self.breakers[base_url] = CircuitBreaker(BREAKER_THRESHOLD, BREAKER_COOLDOWN)
+        return self.breakers[base_url]
+
+    def replicas_for(self, company):
+        candidates = self.ring.preference_list(company)
+        if self.fallback_url and self.fallback_url not in candidates:
+            candidates.append(self.fallback_url)
+        return candidates
+
+    def _get_client(self):
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(
+                    connect=AI_CONNECT_TIMEOUT,
+                    read=AI_READ_TIMEOUT,
+                    write=AI_CONNECT_TIMEOUT,
+                    pool=AI_POOL_TIMEOUT,
+                ),
+                limits=httpx.Limits(
+                    max_connections=AI_MAX_CONNECTIONS,
+                    max_keepalive_connections=AI_MAX_KEEPALIVE,
+                ),
+            )
+        return self._client
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def post_for_company(self, company, path, payload, headers=None):
+        """
+        Sends the request to the company's home replica so its index stays warm
+        there, moving along the ring (then to the fallback) if that replica is down.
+        """
+        last_error = None
+        for base_url in self.replicas_for(company):
+            try:
+                return await self.post(path, payload, base_url, headers=headers)
+            except (AIUnavailable, AIConnectError) as e:
+                last_error = e
+        if isinstance(last_error, AIServiceError):
+            raise last_error
+        raise AIUnavailable("AI service is temporarily unavailable")
+
+    async def post(self, path, payload, base_url=AI_URL, headers=None):
+        breaker = self._breaker(base_url)
+        if not breaker.allow():
+            AI_REQUESTS.labels(replica=base_url, outcome="circuit_open").inc()
+            raise AIUnavailable("AI service is temporarily unavailable")
+        # A half-open probe must free its slot however it ends, or the replica stays blocked
+        is_probe = breaker.probing
+
+        client = self._get_client()
+        attempt = 0
+        try:
+            while True:
+                try:
+                    response = await client.post(f"{base_url}{path}", json=payload, headers=headers)
+                except RETRYABLE_ERRORS as e:
+                    if attempt < AI_RETRIES:
+                        AI_REQUESTS.labels(replica=base_url, outcome="retry").inc()
+                        # Exponential backoff with full jitter
+                        await asyncio.sleep(random.uniform(0, AI_RETRY_BASE_DELAY * (2 ** attempt)))
+                        attempt += 1
+                        continue
+                    AI_REQUESTS.labels(replica=base_url, outcome="connect_error").inc()
+                    breaker.record_failure()
+                    raise AIConnectError(str(e))
+                except httpx.TransportError as e:
+                    # Read/write timeouts, dropped connections, protocol errors
+                    AI_REQUESTS.labels(replica=base_url, outcome="error").inc()
+                    breaker.record_failure()
+                    raise AIServiceError(str(e))
+                except httpx.HTTPError as e:
+                    AI_REQUESTS.labels(replica=base_url, outcome="error").inc()
+                    raise AIServiceError(str(e))
+
+                if response.status_code in BREAKER_FAILURE_STATUSES:
+                    AI_REQUESTS.labels(replica=base_url, outcome="server_error").inc()
+                    breaker.record_failure()
+                elif response.status_code >= 500:
+                    # The replica answered, so it is reachable; the error is the caller's to report
+                    AI_REQUESTS.labels(replica=base_url, outcome="server_error").inc()
+                    breaker.record_success()
+                else:
+                    AI_REQUESTS.labels(replica=base_url, outcome="ok").inc()
+                    breaker.record_success()
+                return response
+        except BaseException:
+            # Cancellation, outside timeouts and non-httpx errors record no outcome
+            if is_probe and breaker.probing:
+                breaker.release_probe()
+            raise
+
+
+ai_client = AIClient()
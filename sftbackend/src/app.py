@@ -1,11 +1,26 @@
 from fastapi import FastAPI, Request, Depends, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from starlette.status import HTTP_401_UNAUTHORIZED
 from src.handlers import users, scrapped, ai_customs, database, login, logout, admin, chat, contacts, school
 from fastapi.middleware.cors import CORSMiddleware
+from src.transcripts import transcript_writer
+from src.ai_client import ai_client
+from src import metrics
 
 app = FastAPI()
 
+@app.on_event("startup")
+def start_transcript_writer():
+    transcript_writer.start()
+
+@app.on_event("shutdown")
+def stop_transcript_writer():
+    transcript_writer.stop()
+
+@app.on_event("shutdown")
+async def close_ai_client():
+    await ai_client.close()
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:3000"],  # Frontend origin
@@ -41,6 +56,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Prometheus scrape endpoint
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    body, content_type = metrics.latest()
+    return Response(content=body, media_type=content_type)
+
 @app.options("/{full_path:path}")
 async def options_handler(full_path: str):
     return JSONResponse(headers={"Access-Control-Allow-Origin": "*"}, content={})
@@ -1,14 +1,31 @@
+import base64
 import json
 import os
+import time
 import psycopg2
 from datetime import datetime, date
 import boto3
 import jwt
 from botocore.exceptions import ClientError
-from psycopg2.extras import RealDictCursor
+from psycopg2.extras import RealDictCursor, execute_values
 import requests
 from jwt import algorithms
 
+# Reused across warm invocations of the same Lambda container
+_db_conn = None
+_db_conn_checked_at = 0.0
+DB_HEALTHCHECK_INTERVAL = int(os.environ.get('DB_HEALTHCHECK_INTERVAL', '30'))
+
+_jwks_cache = {}
+_jwks_fetched_at = 0.0
+_jwks_attempted_at = float('-inf')
+JWKS_CACHE_TTL = int(os.environ.get('JWKS_CACHE_TTL', '3600'))
+# Tokens with an unknown kid trigger a refetch at most this often, so forged kids can't hammer Cognito
+JWKS_MISS_REFETCH_INTERVAL = int(os.environ.get('JWKS_MISS_REFETCH_INTERVAL', '60'))
+
+# Most logs accepted by one /conversation_logs/batch request
+MAX_BATCH_SIZE = int(os.environ.get('MAX_BATCH_SIZE', '500'))
+
 def cors_response(status_code, body, content_type="application/json"):
     headers = {
         'Content-Type': content_type,
@@ -40,7 +57,7 @@ def lambda_handler(event, context):
             return cors_response(401, "Unauthorized")
         
         token = auth_header.split(' ')[-1]
-        verify_token(token)
+        token_payload = verify_token(token)
 
     except Exception as e:
         return cors_response(401, "Authentication failed")
@@ -48,9 +65,11 @@ def lambda_handler(event, context):
     #routes with authentication
     try:
         if resource_path == '/conversation_logs' and http_method == 'POST':
-            return logConversation(event, context)
+            return logConversation(event, context, token_payload)
+        elif resource_path == '/conversation_logs/batch' and http_method == 'POST':
+            return logConversationBatch(event, context, token_payload)
         elif resource_path == '/conversation_logs/{userId}' and http_method == 'GET':
-            return getConversationLogs(event, context)
+            return getConversationLogs(event, context, token_payload)
         else:
             return cors_response(404, "Not Found")
         
@@ -60,12 +79,23 @@ def lambda_handler(event, context):
 ###################
 #helper functions
 
+# Largest value of a Postgres INT column
+MAX_INT_ID = 2**31 - 1
+
+def parse_id(value):
+    """value as a positive integer ID (int or digit string), else None."""
+    if isinstance(value, str) and value.strip().isdigit():
+        value = int(value)
+    if isinstance(value, bool) or not isinstance(value, int):
+        return None
+    return value if 0 < value <= MAX_INT_ID else None
+
 def json_serial(obj):
     if isinstance(obj, (datetime, date)):
         return obj.isoformat()
     raise TypeError ("Type %s not serializable" % type(obj))
 
-def get_db_connection():
+def _open_db_connection():
     return psycopg2.connect(
         dbname=os.environ['DB_NAME'],
         host=os.environ['DB_HOST'],
@@ -73,17 +103,124 @@ def get_db_connection():
         password=os.environ['DB_PASSWORD'],
         port=os.environ['DB_PORT'],
 
-        connect_timeout=5)
-    
+        connect_timeout=5,
+        # Detect connections dropped by RDS Proxy / NAT idle timeouts
+        keepalives=1,
+        keepalives_idle=30,
+        keepalives_interval=10,
+        keepalives_count=3)
+
+def get_db_connection():
+    """
+    Returns the module-level connection, reconnecting if it was closed or
+    fails a health check. Callers must not close it; roll back on error instead.
+    """
+    global _db_conn, _db_conn_checked_at
+
+    now = time.monotonic()
+    if _db_conn is not None and not _db_conn.closed:
+        if now - _db_conn_checked_at < DB_HEALTHCHECK_INTERVAL:
+            return _db_conn
+        try:
+            with _db_conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            _db_conn.rollback()
+            _db_conn_checked_at = now
+            return _db_conn
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            try:
+                _db_conn.close()
+            except Exception:
+                pass
+
+    _db_conn = _open_db_connection()
+    _db_conn_checked_at = now
+    return _db_conn
+
+def release_db_connection(conn):
+    # Leave the shared connection idle (no open transaction) for the next invocation
+    global _db_conn
+
+    if conn is None or conn.closed:
+        return
+    try:
+        conn.rollback()
+    except Exception:
+        _db_conn = None
+        try:
+            conn.close()
+        except Exception:
+            pass
+
 #AUTH
+# In-memory denylist of revoked JTIs (jti -> exp epoch seconds), refreshed
+# incrementally from invalidated_tokens. Rows are written by handlers/logout.py.
+_revoked_jtis = {}
+_revoked_watermark = None
+_revoked_refreshed_at = 0.0
+# Seconds between denylist refreshes. This is also how long a just-revoked token
+# can still be accepted by a warm instance; set 0 to query on every request.
+REVOCATION_REFRESH_INTERVAL = int(os.environ.get('REVOCATION_REFRESH_INTERVAL', '5'))
+# Re-read rows this close to the watermark to catch late-committing inserts
+REVOCATION_OVERLAP_SECONDS = 5
+
+def refresh_revoked_tokens(force=False):
+    global _revoked_watermark, _revoked_refreshed_at
+
+    now = time.monotonic()
+    if not force and _revoked_watermark is not None and now - _revoked_refreshed_at < REVOCATION_REFRESH_INTERVAL:
+        return
+
+    conn = get_db_connection()
+    with conn:
+        with conn.cursor() as cur:
+            if _revoked_watermark is None:
+                cur.execute("""
+                    SELECT jti, EXTRACT(EPOCH FROM expires_at), invalidated_at
+                    FROM invalidated_tokens
+                    -- Rows revoked before migrations.sql added expires_at have none; keep them
+                    WHERE expires_at IS NULL OR expires_at > NOW()
+                """)
+            else:
+                cur.execute("""
+                    SELECT jti, EXTRACT(EPOCH FROM expires_at), invalidated_at
+                    FROM invalidated_tokens
+                    WHERE invalidated_at > %s - make_interval(secs => %s)
+                """, (_revoked_watermark, REVOCATION_OVERLAP_SECONDS))
+            rows = cur.fetchall()
+
+    for jti, exp, invalidated_at in rows:
+        _revoked_jtis[jti] = float(exp) if exp is not None else float('inf')
+        if _revoked_watermark is None or invalidated_at > _revoked_watermark:
+            _revoked_watermark = invalidated_at
+
+    if _revoked_watermark is None:
+        # Empty table: start the incremental window from the database clock
+        with conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT NOW()")
+                _revoked_watermark = cur.fetchone()[0]
+
+    # Expired tokens are rejected by jwt.decode anyway, so stop tracking them
+    wall_now = time.time()
+    for jti in [j for j, exp in _revoked_jtis.items() if exp <= wall_now]:
+        del _revoked_jtis[jti]
+
+    _revoked_refreshed_at = now
+
 def is_token_invalidated(token_payload):
+    jti = token_payload.get('jti')
+
+    if not jti:
+        raise Exception("Token missing jti claim")
+
+    refresh_revoked_tokens()
+    if jti not in _revoked_jtis:
+        return False
+
+    # Only denylist hits fall through to the database for confirmation
     with get_db_connection() as conn:
         with conn.cursor() as cur:
-            jti = token_payload.get('jti')
-            
-            if not jti:
-                raise Exception("Token missing jti claim")
-            
             cur.execute("""
                 SELECT EXISTS(
                     SELECT 1 
@@ -92,30 +229,49 @@ def is_token_invalidated(token_payload):
                 )
             """, (jti,))
             
-            return cur.fetchone()[0]
+            revoked = cur.fetchone()[0]
+
+    if not revoked:
+        _revoked_jtis.pop(jti, None)
+    return revoked
         
+def _fetch_jwks():
+    global _jwks_cache, _jwks_fetched_at, _jwks_attempted_at
+
+    # Counted even if the fetch fails, so an outage doesn't turn every miss into a request
+    _jwks_attempted_at = time.monotonic()
+    region = boto3.session.Session().region_name
+    url = f'https://cognito-idp.{region}.amazonaws.com/{os.environ["COGNITO_USER_POOL_ID"]}/.well-known/jwks.json'
+    response = requests.get(url, timeout=5)
+    response.raise_for_status()
+
+    _jwks_cache = {
+        key['kid']: algorithms.RSAAlgorithm.from_jwk(json.dumps(key))
+        for key in response.json()['keys']
+    }
+    _jwks_fetched_at = time.monotonic()
+
+def get_public_key(kid):
+    # Refetch on expiry, or on an unknown kid (Cognito key rotation) at most
+    # once per JWKS_MISS_REFETCH_INTERVAL
+    now = time.monotonic()
+    if now - _jwks_fetched_at > JWKS_CACHE_TTL:
+        _fetch_jwks()
+    elif kid not in _jwks_cache and now - _jwks_attempted_at >= JWKS_MISS_REFETCH_INTERVAL:
+        _fetch_jwks()
+    return _jwks_cache.get(kid)
+
 def verify_token(token):
     # Get the JWT token from the Authorization header
     if not token:
         raise Exception('No token provided')
 
-    region = boto3.session.Session().region_name
-    
     # Get the JWT kid (key ID)
     headers = jwt.get_unverified_header(token)
     kid = headers['kid']
 
-    # Get the public keys from Cognito
-    url = f'https://cognito-idp.{region}.amazonaws.com/{os.environ["COGNITO_USER_POOL_ID"]}/.well-known/jwks.json'
-    response = requests.get(url)
-    keys = response.json()['keys']
-
-    # Find the correct public key
-    public_key = None
-    for key in keys:
-        if key['kid'] == kid:
-            public_key = algorithms.RSAAlgorithm.from_jwk(json.dumps(key))
-            break
+    # Find the correct public key (cached across invocations)
+    public_key = get_public_key(kid)
 
     if not public_key:
         raise Exception('Public key not found')
@@ -143,7 +299,7 @@ def verify_token(token):
 ####################
 #conversation_logs functions
 
-def logConversation(event, context):
+def logConversation(event, context, token_payload):
     conn = None
     try:
         # Parse request body
@@ -152,10 +308,7 @@ def logConversation(event, context):
         except json.JSONDecodeError as e:
             return cors_response(400, f"Invalid JSON: {str(e)}")
 
-        # Get user ID from token
-        auth_header = event.get('headers', {}).get('Authorization')
-        token = auth_header.split(' ')[-1]
-        token_payload = verify_token(token)
+        # Get user ID from the payload verified in lambda_handler
         cognito_user_id = token_payload.get('sub')
 
         conn = get_db_connection()
@@ -205,14 +358,222 @@ def logConversation(event, context):
         })
 
     except Exception as e:
-        if conn:
-            conn.rollback()
         return cors_response(500, f"Error logging conversation: {str(e)}")
     finally:
-        if conn:
-            conn.close()
+        release_db_connection(conn)
+
+def logConversationBatch(event, context, token_payload):
+    """
+    Logs many conversation entries in one transaction.
+    Body: {"logs": [{"contactId", "interactionType", "subject", "content"}, ...]}
+    Returns one result per input item, in input order.
+    """
+    conn = None
+    try:
+        try:
+            body = json.loads(event.get('body', {}))
+        except json.JSONDecodeError as e:
+            return cors_response(400, f"Invalid JSON: {str(e)}")
+
+        items = body.get('logs') if isinstance(body, dict) else None
+        if not isinstance(items, list) or not items:
+            return cors_response(400, "Request must include a non-empty 'logs' list")
+        if len(items) > MAX_BATCH_SIZE:
+            return cors_response(413, f"Batch too large: at most {MAX_BATCH_SIZE} logs per request")
+
+        cognito_user_id = token_payload.get('sub')
+
+        conn = get_db_connection()
+        cur = conn.cursor(cursor_factory=RealDictCursor)
+        cur.execute("SELECT id FROM users WHERE cognito_id = %s", (cognito_user_id,))
+        db_user = cur.fetchone()
+        if not db_user:
+            return cors_response(404, "User not found")
+        user_id = db_user['id']
 
-def getConversationLogs(event, context):
+        results = [None] * len(items)
+        pending = []
+        for position, item in enumerate(items):
+            if not isinstance(item, dict) or not all([item.get('contactId'), item.get('interactionType')]):
+                results[position] = {
+                    "index": position,
+                    "status": 400,
+                    "error": "Missing required fields: contactId and interactionType are required"
+                }
+            elif parse_id(item['contactId']) is None:
+                results[position] = {
+                    "index": position,
+                    "status": 400,
+                    "error": "contactId must be a positive integer"
+                }
+            else:
+                pending.append(position)
+
+        # Verify every referenced contact belongs to the user in one query
+        contact_ids = list({parse_id(items[position]['contactId']) for position in pending})
+        owned = set()
+        if contact_ids:
+            cur.execute(
+                "SELECT id FROM schoolContact WHERE userId = %s AND id = ANY(%s::int[])",
+                (user_id, contact_ids)
+            )
+            owned = {row['id'] for row in cur.fetchall()}
+
+        to_insert = []
+        for position in pending:
+            if parse_id(items[position]['contactId']) in owned:
+                to_insert.append(position)
+            else:
+                results[position] = {
+                    "index": position,
+                    "status": 404,
+                    "error": "School contact not found or unauthorized access"
+                }
+
+        if to_insert:
+            # Postgres doesn't promise RETURNING rows in VALUES order, so each row
+            # gets its id up front and results are matched back by id
+            cur.execute(
+                "SELECT nextval(pg_get_serial_sequence('conversationLogs', 'id')) AS id "
+                "FROM generate_series(1, %s)",
+                (len(to_insert),)
+            )
+            log_ids = [row['id'] for row in cur.fetchall()]
+            new_logs = execute_values(
+                cur,
+                """
+                    INSERT INTO conversationLogs (
+                        id, userId, contactId, interactionType, subject, content
+                    )
+                    VALUES %s
+                    RETURNING id, userId, contactId, interactionType, subject, content, timestamp
+                """,
+                [
+                    (
+                        log_id,
+                        user_id,
+                        parse_id(items[position]['contactId']),
+                        items[position]['interactionType'],
+                        items[position].get('subject'),
+                        items[position].get('content'),
+                    )
+                    for log_id, position in zip(log_ids, to_insert)
+                ],
+                page_size=len(to_insert),
+                fetch=True
+            )
+            logs_by_id = {new_log['id']: new_log for new_log in new_logs}
+            for log_id, position in zip(log_ids, to_insert):
+                results[position] = {"index": position, "status": 201, "log": logs_by_id[log_id]}
+
+        conn.commit()
+
+        return cors_response(207 if len(to_insert) < len(items) else 201, {
+            "message": f"Logged {len(to_insert)} of {len(items)} conversations",
+            "results": results
+        })
+
+    except Exception as e:
+        return cors_response(500, f"Error logging conversations: {str(e)}")
+    finally:
+        release_db_connection(conn)
+
+def build_log_filters(user_id, contact_id=None, interaction_type=None, start_date=None, end_date=None, alias='cl'):
+    """
+    Shared WHERE clause for conversationLogs listing and counting.
+    Returns (sql, params).
+    """
+    clauses = [f"{alias}.userId = %s"]
+    params = [user_id]
+
+    if contact_id:
+        clauses.append(f"{alias}.contactId = %s")
+        params.append(contact_id)
+    if interaction_type:
+        clauses.append(f"{alias}.interactionType = %s")
+        params.append(interaction_type)
+    if start_date:
+        clauses.append(f"{alias}.timestamp >= %s")
+        params.append(start_date)
+    if end_date:
+        clauses.append(f"{alias}.timestamp <= %s")
+        params.append(end_date)
+
+    return " AND ".join(clauses), params
+
+def encode_cursor(row):
+    raw = json.dumps({"ts": row['timestamp'], "id": row['id']}, default=json_serial)
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor):
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return data['ts'], data['id']
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+def build_logs_query(where_sql, where_params, limit, offset=0, cursor=None, keyset=False, count_mode='exact'):
+    """
+    Builds the page query for getConversationLogs in one round trip.
+
+    Offset mode pages with LIMIT/OFFSET. Keyset mode seeks past (timestamp, id)
+    of the last row seen, so deep pages cost the same as the first. With
+    count_mode 'exact' the filtered total is computed in the same statement;
+    the LEFT JOIN keeps one row even when the page is empty.
+    """
+    page_sql = f"""
+        SELECT 
+            cl.*,
+            json_build_object(
+                'id', sc.id,
+                'email', sc.email,
+                'phoneNumber', sc.phoneNumber
+            ) as contact
+        FROM conversationLogs cl
+        JOIN schoolContact sc ON cl.contactId = sc.id
+        WHERE {where_sql}
+    """
+    page_params = list(where_params)
+
+    if keyset:
+        if cursor:
+            cursor_ts, cursor_id = decode_cursor(cursor)
+            page_sql += " AND (cl.timestamp, cl.id) < (%s, %s)"
+            page_params.extend([cursor_ts, cursor_id])
+        # Fetch one extra row to know whether another page exists
+        page_sql += " ORDER BY cl.timestamp DESC, cl.id DESC LIMIT %s"
+        page_params.append(limit + 1)
+    else:
+        page_sql += " ORDER BY cl.timestamp DESC, cl.id DESC LIMIT %s OFFSET %s"
+        page_params.extend([limit, offset])
+
+    if count_mode != 'exact':
+        return page_sql, page_params
+
+    query = f"""
+        SELECT t.total_count, p.*
+        FROM (
+            SELECT COUNT(*) AS total_count
+            FROM conversationLogs cl
+            WHERE {where_sql}
+        ) t
+        LEFT JOIN LATERAL ({page_sql}) p ON TRUE
+    """
+    return query, list(where_params) + page_params
+
+def estimate_log_count(cur, where_sql, where_params):
+    # Planner row estimate for the filtered set; no rows are scanned
+    cur.execute(
+        f"EXPLAIN (FORMAT JSON) SELECT 1 FROM conversationLogs cl WHERE {where_sql}",
+        where_params
+    )
+    plan = cur.fetchone()
+    plan = plan['QUERY PLAN'] if isinstance(plan, dict) else plan[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+def getConversationLogs(event, context, token_payload):
     conn = None
     try:
         # Get path and query parameters
@@ -227,11 +588,22 @@ def getConversationLogs(event, context):
         end_date = query_params.get('endDate')
         limit = query_params.get('limit', '50')  # Default to 50 logs
         offset = query_params.get('offset', '0')  # Default to first page
+        cursor = query_params.get('cursor')
+        # Keyset mode is opt-in so existing offset clients keep working
+        keyset = bool(cursor) or query_params.get('pagination') == 'cursor'
+        count_mode = query_params.get('count', 'none' if keyset else 'exact')
 
-        # Get requester's user ID from token
-        auth_header = event.get('headers', {}).get('Authorization')
-        token = auth_header.split(' ')[-1]
-        token_payload = verify_token(token)
+        try:
+            limit = int(limit)
+            offset = int(offset)
+        except ValueError:
+            return cors_response(400, "limit and offset must be integers")
+        if limit < 1 or offset < 0:
+            return cors_response(400, "limit must be positive and offset non-negative")
+        if count_mode not in ('exact', 'estimate', 'none'):
+            return cors_response(400, "count must be one of: exact, estimate, none")
+
+        # Get requester's user ID from the payload verified in lambda_handler
         cognito_user_id = token_payload.get('sub')
 
         conn = get_db_connection()
@@ -246,81 +618,54 @@ def getConversationLogs(event, context):
         if str(requester_db_id) != str(user_id):
             return cors_response(403, "Unauthorized to view these conversation logs")
 
-        # Build query with filters
-        query = """
-            SELECT 
-                cl.*,
-                json_build_object(
-                    'id', sc.id,
-                    'email', sc.email,
-                    'phoneNumber', sc.phoneNumber
-                ) as contact
-            FROM conversationLogs cl
-            JOIN schoolContact sc ON cl.contactId = sc.id
-            WHERE cl.userId = %s
-        """
-        params = [user_id]
-
-        if contact_id:
-            query += " AND cl.contactId = %s"
-            params.append(contact_id)
-        if interaction_type:
-            query += " AND cl.interactionType = %s"
-            params.append(interaction_type)
-        if start_date:
-            query += " AND cl.timestamp >= %s"
-            params.append(start_date)
-        if end_date:
-            query += " AND cl.timestamp <= %s"
-            params.append(end_date)
-
-        # Add sorting
-        query += " ORDER BY cl.timestamp DESC"
-
-        # Add pagination
-        query += " LIMIT %s OFFSET %s"
-        params.extend([limit, offset])
-
-        # Get total count for pagination
-        count_query = """
-            SELECT COUNT(*) 
-            FROM conversationLogs 
-            WHERE userId = %s
-        """
-        count_params = [user_id]
-
-        if contact_id:
-            count_query += " AND contactId = %s"
-            count_params.append(contact_id)
-        if interaction_type:
-            count_query += " AND interactionType = %s"
-            count_params.append(interaction_type)
-        if start_date:
-            count_query += " AND timestamp >= %s"
-            count_params.append(start_date)
-        if end_date:
-            count_query += " AND timestamp <= %s"
-            count_params.append(end_date)
-
-        # Execute queries
-        cur.execute(count_query, count_params)
-        total_count = cur.fetchone()['count']
+        where_sql, where_params = build_log_filters(
+            user_id, contact_id, interaction_type, start_date, end_date
+        )
+        try:
+            query, params = build_logs_query(
+                where_sql, where_params, limit, offset, cursor, keyset, count_mode
+            )
+        except ValueError as e:
+            return cors_response(400, str(e))
 
         cur.execute(query, params)
-        logs = cur.fetchall()
+        rows = cur.fetchall()
+
+        total_count = None
+        if count_mode == 'exact':
+            if rows:
+                total_count = rows[0]['total_count']
+            # An empty page comes back as a single all-NULL row from the LEFT JOIN
+            logs = [row for row in rows if row['id'] is not None]
+            for row in logs:
+                del row['total_count']
+        else:
+            logs = rows
+            if count_mode == 'estimate':
+                total_count = estimate_log_count(cur, where_sql, where_params)
+
+        pagination = {
+            "total": total_count,
+            "limit": limit,
+        }
+        if keyset:
+            has_more = len(logs) > limit
+            logs = logs[:limit]
+            pagination["hasMore"] = has_more
+            pagination["nextCursor"] = encode_cursor(logs[-1]) if has_more else None
+        else:
+            pagination["offset"] = offset
+            if total_count is not None:
+                pagination["hasMore"] = (offset + limit) < total_count
+            else:
+                pagination["hasMore"] = len(logs) == limit
 
         return cors_response(200, {
             "logs": logs,
-            "pagination": {
-                "total": total_count,
-                "offset": int(offset),
-                "limit": int(limit),
-                "hasMore": (int(offset) + int(limit)) < total_count
-            }
+            "pagination": pagination
         })
 
     except Exception as e:
         return cors_response(500, f"Error retrieving conversation logs: {str(e)}")
     finally:
-        if conn:
-            conn.close()
\ No newline at end of file
+        release_db_connection(conn)
\ No newline at end of file
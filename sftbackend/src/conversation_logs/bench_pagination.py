@@ -0,0 +1,133 @@
+"""
+Benchmark for getConversationLogs pagination.
+
+Seeds a throwaway schema with one heavy user (1M logs by default), applies
+indexes.sql and times offset vs keyset paging at increasing depths using the
+same query builder as the Lambda.
+
+Usage:
+    DB_NAME=... DB_HOST=... DB_USER=... DB_PASSWORD=... DB_PORT=... \
+        python bench_pagination.py --rows 1000000
+"""
+import argparse
+import os
+import time
+import psycopg2
+from psycopg2.extras import RealDictCursor
+
+from app import build_log_filters, build_logs_query, encode_cursor
+
+SCHEMA = "bench_conversation_logs"
+
+def seed(conn, rows):
+    with conn.cursor() as cur:
+        cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        cur.execute(f"CREATE SCHEMA {SCHEMA}")
+        cur.execute(f"SET search_path TO {SCHEMA}")
+        cur.execute("""
+            CREATE TABLE users (id SERIAL PRIMARY KEY, cognito_id TEXT);
+            CREATE TABLE schoolContact (
+                id SERIAL PRIMARY KEY, userId INT, email TEXT, phoneNumber TEXT
+            );
+            CREATE TABLE conversationLogs (
+                id SERIAL PRIMARY KEY,
+                userId INT,
+                contactId INT,
+                interactionType TEXT,
+                subject TEXT,
+                content TEXT,
+                timestamp TIMESTAMP DEFAULT NOW()
+            );
+            CREATE TABLE invalidated_tokens (
+                jti TEXT PRIMARY KEY, expires_at TIMESTAMPTZ, invalidated_at TIMESTAMPTZ
+            );
+            INSERT INTO users (cognito_id) VALUES ('bench-user');
+            INSERT INTO schoolContact (userId, email, phoneNumber)
+                SELECT 1, 'contact' || g || '@example.edu', '555-0100'
+                FROM generate_series(1, 50) g;
+        """)
+        cur.execute("""
+            INSERT INTO conversationLogs (userId, contactId, interactionType, subject, content, timestamp)
+            SELECT 1,
+                   1 + (g % 50),
+                   (ARRAY['email', 'call', 'chat'])[1 + g % 3],
+                   'Subject ' || g,
+                   repeat('x', 200),
+                   NOW() - (g || ' seconds')::interval
+            FROM generate_series(1, %s) g
+        """, (rows,))
+    conn.commit()
+
+    conn.autocommit = True
+    with conn.cursor() as cur:
+        cur.execute(f"SET search_path TO {SCHEMA}")
+        with open(os.path.join(os.path.dirname(__file__), "indexes.sql")) as f:
+            for statement in f.read().split(";"):
+                lines = [l for l in statement.splitlines() if not l.strip().startswith("--")]
+                if "".join(lines).strip():
+                    cur.execute("\n".join(lines))
+        cur.execute("ANALYZE")
+    conn.autocommit = False
+
+def time_query(cur, query, params, repeat):
+    best = None
+    rows = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        cur.execute(query, params)
+        rows = cur.fetchall()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000, rows
+
+def run(conn, depths, limit, repeat):
+    where_sql, where_params = build_log_filters(1)
+    print(f"{'depth':>10} {'offset ms':>12} {'offset+count ms':>16} {'keyset ms':>12}")
+
+    with conn.cursor(cursor_factory=RealDictCursor) as cur:
+        cur.execute(f"SET search_path TO {SCHEMA}")
+        for depth in depths:
+            query, params = build_logs_query(where_sql, where_params, limit, offset=depth, count_mode='none')
+            offset_ms, _ = time_query(cur, query, params, repeat)
+
+            query, params = build_logs_query(where_sql, where_params, limit, offset=depth, count_mode='exact')
+            counted_ms, _ = time_query(cur, query, params, repeat)
+
+            # Cursor pointing at the row just before the requested depth
+            cur.execute(
+                "SELECT id, timestamp FROM conversationLogs WHERE userId = 1 "
+                "ORDER BY timestamp DESC, id DESC LIMIT 1 OFFSET %s",
+                (max(depth - 1, 0),)
+            )
+            anchor = cur.fetchone()
+            cursor = encode_cursor(anchor) if depth else None
+            query, params = build_logs_query(where_sql, where_params, limit, cursor=cursor, keyset=True, count_mode='none')
+            keyset_ms, _ = time_query(cur, query, params, repeat)
+
+            print(f"{depth:>10} {offset_ms:>12.2f} {counted_ms:>16.2f} {keyset_ms:>12.2f}")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--skip-seed", action="store_true", help="Reuse a previously seeded schema")
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(
+        dbname=os.environ['DB_NAME'],
+        host=os.environ['DB_HOST'],
+        user=os.environ['DB_USER'],
+        password=os.environ['DB_PASSWORD'],
+        port=os.environ['DB_PORT'])
+    try:
+        if not args.skip_seed:
+            print(f"Seeding {args.rows} rows into schema {SCHEMA}...")
+            seed(conn, args.rows)
+        depths = [d for d in (0, 1_000, 10_000, 100_000, 500_000, 900_000) if d < args.rows]
+        run(conn, depths, args.limit, args.repeat)
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
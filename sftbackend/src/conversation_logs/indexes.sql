@@ -0,0 +1,22 @@
+-- Recommended indexes for getConversationLogs.
+-- CONCURRENTLY avoids blocking log writes; run outside a transaction.
+-- Apply migrations.sql first: some of these tables and columns come from it.
+
+-- Keyset pagination: WHERE userId = ? ORDER BY timestamp DESC, id DESC
+-- seeks straight to the cursor. contactId/interactionType are carried in the
+-- index so those filters are checked without visiting the heap.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_conversationlogs_user_ts_id
+    ON conversationLogs (userId, timestamp DESC, id DESC)
+    INCLUDE (contactId, interactionType);
+
+-- Per-contact history for a user (contactId filter)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_conversationlogs_user_contact_ts_id
+    ON conversationLogs (userId, contactId, timestamp DESC, id DESC);
+
+-- Per-interaction-type history for a user (interactionType filter)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_conversationlogs_user_type_ts_id
+    ON conversationLogs (userId, interactionType, timestamp DESC, id DESC);
+
+-- Denylist refresh in conversation_logs reads new revocations by time
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_invalidated_tokens_invalidated_at
+    ON invalidated_tokens (invalidated_at);
@@ -0,0 +1,32 @@
+-- Schema changes the handlers depend on. Idempotent; run before indexes.sql
+-- (psql -f migrations.sql, then psql -f indexes.sql).
+
+-- Token revocation (handlers/logout.py writes, the denylist refresh in
+-- app.py reads by invalidated_at and keeps entries until expires_at)
+CREATE TABLE IF NOT EXISTS invalidated_tokens (
+    jti TEXT NOT NULL
+);
+ALTER TABLE invalidated_tokens ADD COLUMN IF NOT EXISTS expires_at TIMESTAMPTZ;
+ALTER TABLE invalidated_tokens ADD COLUMN IF NOT EXISTS invalidated_at TIMESTAMPTZ NOT NULL DEFAULT NOW();
+
+-- INSERT ... ON CONFLICT (jti) needs a unique index on jti; drop duplicate
+-- rows an older table may hold before creating it
+DELETE FROM invalidated_tokens a
+    USING invalidated_tokens b
+    WHERE a.jti = b.jti AND a.ctid < b.ctid;
+CREATE UNIQUE INDEX IF NOT EXISTS invalidated_tokens_jti_key ON invalidated_tokens (jti);
+
+-- Chat exchanges relayed through the backend (src/transcripts.py writes them
+-- in batches). Kept apart from conversationLogs: those rows belong to a user
+-- and a school contact, while transcripts are per company and carry the
+-- model, sources and timings of each answer.
+CREATE TABLE IF NOT EXISTS chatTranscripts (
+    id BIGSERIAL PRIMARY KEY,
+    company TEXT NOT NULL,
+    prompt TEXT NOT NULL,
+    answer TEXT,
+    model TEXT,
+    sources JSONB,
+    timings JSONB,
+    timestamp TIMESTAMPTZ NOT NULL
+);
@@ -6,6 +6,7 @@ import os
 import json
 
 from src.validate import validate_token
+from src.knowledge_file import KNOWLEDGE_JSON, KNOWLEDGE_JSONL
 
 router = APIRouter()
 
@@ -26,6 +27,10 @@ REQUIRED_FIELDS = [
 
 RANGED_FIELDS = ['friendliness', 'formality', 'verbosity', 'humor', 'technicalLevel']
 
+# Optional: minimum cosine similarity (0-1) a passage needs to be used as context.
+# When nothing clears it the bot answers "I don't have that information" without the LLM.
+OPTIONAL_FIELDS = ['relevanceThreshold']
+
 def validate_fields(data: dict):
     missing = [field for field in REQUIRED_FIELDS if field not in data]
     if missing:
@@ -43,6 +48,19 @@ def validate_fields(data: dict):
     if not isinstance(data.get("forbidden_terms"), list):
         raise HTTPException(status_code=400, detail="forbidden_terms must be a list")
 
+    if "relevanceThreshold" in data:
+        try:
+            value = float(data["relevanceThreshold"])
+            if not (0 <= value <= 1):
+                raise HTTPException(status_code=400, detail="relevanceThreshold must be between 0 and 1")
+        except (ValueError, TypeError):
+            raise HTTPException(status_code=400, detail="relevanceThreshold must be a number between 0 and 1")
+
+def customs_fields(data: dict):
+    fields = {field: data[field] for field in REQUIRED_FIELDS}
+    fields.update({field: data[field] for field in OPTIONAL_FIELDS if field in data})
+    return fields
+
 @router.post("/customs")
 def set_customs(data: dict = Body(...), token_payload: dict = Depends(validate_token)):
     company = token_payload.get("custom:Company")
@@ -53,7 +71,7 @@ def set_customs(data: dict = Body(...), token_payload: dict = Depends(validate_t
 
     item = {
         "company": company,
-        **{field: data[field] for field in REQUIRED_FIELDS}
+        **customs_fields(data)
     }
 
     existing = collection.find_one({"company": company})
@@ -86,7 +104,7 @@ def update_customs(data: dict = Body(...), token_payload: dict = Depends(validat
         raise HTTPException(status_code=400, detail="Token does not contain a company claim")
 
     validate_fields(data)
-    update_fields = {field: data[field] for field in REQUIRED_FIELDS}
+    update_fields = customs_fields(data)
 
     result = collection.update_one({"company": company}, {"$set": update_fields})
 
@@ -115,8 +133,8 @@ def list_all_bots():
         company = bot["company"]
         company_path = os.path.join(base_path, company)
         os.makedirs(company_path, exist_ok=True)
-        knowledge_path = os.path.join(company_path, "college_knowledge.json")
-        if not os.path.isfile(knowledge_path):
+        knowledge_path = os.path.join(company_path, KNOWLEDGE_JSON)
+        if not os.path.isfile(knowledge_path) and not os.path.isfile(os.path.join(company_path, KNOWLEDGE_JSONL)):
             with open(knowledge_path, "w", encoding="utf-8") as f:
                 json.dump([], f)  # Start with an empty list or your default structure
     return {"bots": bots}
\ No newline at end of file
@@ -1,28 +1,68 @@
-import requests
-from fastapi import APIRouter, HTTPException
+import time
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Request, Response
 from pydantic import BaseModel
+from src.ai_client import ai_client, AIUnavailable, AIServiceError, BREAKER_COOLDOWN
+from src.transcripts import transcript_writer
+from src.metrics import span, traceparent, CHAT_REQUESTS, STAGE_SECONDS
 
 router = APIRouter()
 
 class ChatRequest(BaseModel):
     prompt: str
     company: str
+    # Conversation to continue; the AI service starts one when omitted or unknown
+    session_id: Optional[str] = None
 
-def ask_ai(prompt, company):
+async def ask_ai(prompt, company, headers=None, session_id=None):
+    payload = {"prompt": prompt, "company": company, "session_id": session_id}
     try:
-        response = requests.post(
-            "http://ai-acme:8001/chat",
-            json={"prompt": prompt, "company": company},
-            timeout=50,
-        )
-        response.raise_for_status()
-        return response.json()["response"]
-    except requests.RequestException as e:
-        return f"AI error: {e}"
+        response = await ai_client.post_for_company(company, "/chat", payload, headers=headers)
+    except AIUnavailable as e:
+        # Circuit is open: fail fast instead of holding a connection for the read timeout
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(int(BREAKER_COOLDOWN))})
+    except AIServiceError as e:
+        raise HTTPException(status_code=502, detail=f"AI error: {e}")
+
+    if response.status_code >= 400:
+        raise HTTPException(status_code=502, detail=f"AI error: {response.status_code} {response.text}")
+    return response.json()
 
 @router.post("/chat")
-def chat_endpoint(request: ChatRequest):
-    ai_response = ask_ai(request.prompt, request.company)
-    if ai_response.startswith("AI error:"):
-        raise HTTPException(status_code=502, detail=ai_response)
-    return {"response": ai_response}
\ No newline at end of file
+async def chat_endpoint(request: ChatRequest, http_request: Request, http_response: Response):
+    start = time.perf_counter()
+    # Continue the caller's trace (or start one); the AI service logs the same trace ID
+    trace_id, trace_header = traceparent(http_request.headers.get("traceparent"))
+    http_response.headers["traceparent"] = trace_header
+
+    status = "200"
+    try:
+        with span("ai_request"):
+            data = await ask_ai(
+                request.prompt, request.company, headers={"traceparent": trace_header}, session_id=request.session_id
+            )
+
+        # Logged by the background writer; never delays the response
+        timings = dict(data.get("timings") or {})
+        timings["backend_total_ms"] = (time.perf_counter() - start) * 1000
+        timings["trace_id"] = trace_id
+        with span("transcript_enqueue"):
+            transcript_writer.enqueue(
+                company=request.company,
+                prompt=request.prompt,
+                answer=data["response"],
+                model=data.get("model"),
+                sources=data.get("sources"),
+                timings=timings,
+            )
+        return {"response": data["response"], "session_id": data.get("session_id")}
+    except HTTPException as e:
+        status = str(e.status_code)
+        raise
+    except Exception:
+        status = "500"
+        raise
+    finally:
+        STAGE_SECONDS.labels(stage="total").observe(time.perf_counter() - start)
+        # Only answered requests are labelled by company: the field is unauthenticated input
+        CHAT_REQUESTS.labels(company=request.company if status == "200" else "unknown", status=status).inc()
@@ -2,6 +2,7 @@ from fastapi import APIRouter, HTTPException, Body, Request, Response
 import boto3
 import os
 from botocore.exceptions import ClientError
+from src.loadtest_settings import COGNITO_ENDPOINT_URL
 
 router = APIRouter()
 
@@ -46,7 +47,7 @@ def login_user(
         raise HTTPException(status_code=500, detail="Missing Cognito config")
 
     try:
-        cognito_client = boto3.client('cognito-idp', region_name='us-east-2')
+        cognito_client = boto3.client('cognito-idp', region_name='us-east-2', endpoint_url=COGNITO_ENDPOINT_URL)
         auth_response = cognito_client.initiate_auth(
             ClientId=client_id,
             AuthFlow='USER_PASSWORD_AUTH',
@@ -118,7 +119,7 @@ def complete_new_password(
         raise HTTPException(status_code=500, detail="Missing Cognito config")
 
     try:
-        cognito_client = boto3.client('cognito-idp', region_name='us-east-2')
+        cognito_client = boto3.client('cognito-idp', region_name='us-east-2', endpoint_url=COGNITO_ENDPOINT_URL)
 
         response_data = cognito_client.respond_to_auth_challenge(
             ClientId=client_id,
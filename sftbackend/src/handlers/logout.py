@@ -1,16 +1,53 @@
 from fastapi import APIRouter, Request, HTTPException, Header, Body, Response
+from fastapi.concurrency import run_in_threadpool
 import boto3
 import os
 import jwt
 import requests
 import json
+import psycopg2
 from jwt import algorithms
 from botocore.exceptions import ClientError
-from src.validate import validate_token
+from src.validate import validate_token, verify_token
 
 router = APIRouter()
 
 
+def revoke_token(token):
+    """
+    Records the token's jti in invalidated_tokens, which conversation_logs
+    loads into its in-memory denylist.
+    """
+    try:
+        payload = verify_token(token)
+    except HTTPException:
+        # Invalid or expired tokens are already rejected everywhere
+        return
+
+    jti = payload.get("jti")
+    exp = payload.get("exp")
+    if not jti or not exp:
+        return
+
+    conn = psycopg2.connect(
+        dbname=os.environ['DB_NAME'],
+        host=os.environ['DB_HOST'],
+        user=os.environ['DB_USER'],
+        password=os.environ['DB_PASSWORD'],
+        port=os.environ['DB_PORT'],
+        connect_timeout=5)
+    try:
+        with conn:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    INSERT INTO invalidated_tokens (jti, expires_at, invalidated_at)
+                    VALUES (%s, to_timestamp(%s), NOW())
+                    ON CONFLICT (jti) DO NOTHING
+                """, (jti, exp))
+    finally:
+        conn.close()
+
+
 @router.post("/logout")
 async def logout_user(request: Request, response: Response):
     # Extract token from cookie
@@ -20,9 +57,14 @@ async def logout_user(request: Request, response: Response):
     if token:
         try:
             cognito_client = boto3.client("cognito-idp", region_name="us-east-2")
-            cognito_client.global_sign_out(AccessToken=token)
+            await run_in_threadpool(cognito_client.global_sign_out, AccessToken=token)
         except Exception as e:
             print("Logout error:", e)
+        try:
+            # psycopg2 blocks; keep it off the event loop
+            await run_in_threadpool(revoke_token, token)
+        except Exception as e:
+            print("Token revocation error:", e)
 
     # Clear the cookie
     response.delete_cookie(
@@ -1,114 +1,216 @@
-from fastapi import APIRouter, HTTPException, Body
+from fastapi import APIRouter, HTTPException, Body, Depends
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 from bs4 import BeautifulSoup
-from urllib.parse import urlparse, urljoin, urldefrag
-from collections import deque
 import requests
 import json
 import os
 
 from src.validate import validate_token
+from src.scrape_frontier import Frontier, canonicalize_url, link_score
+from src.sitemaps import discover_urls, parse_lastmod
+from src.knowledge_file import KnowledgeWriter, ScrapeInProgress, iter_knowledge
 
 router = APIRouter()
 
+SCRAPE_MAX_PAGES = int(os.getenv("SCRAPE_MAX_PAGES", "20"))
+# "crawl" follows links from the start page, "sitemap" fetches what the site's
+# sitemaps list, "auto" uses sitemaps when the site publishes any
+SCRAPE_MODE = os.getenv("SCRAPE_MODE", "auto")
+# Parallel page fetches in sitemap mode
+SCRAPE_CONCURRENCY = int(os.getenv("SCRAPE_CONCURRENCY", "8"))
+
+HEADERS = {'User-Agent': 'Mozilla/5.0'}
+MIN_TEXT_LENGTH = 100
+
+
+def fetch_page(url):
+    """(final canonical url, soup) for a 200 response, else None."""
+    res = requests.get(url, headers=HEADERS, timeout=10)
+    if res.status_code != 200:
+        return None
+    soup = BeautifulSoup(res.text, 'html.parser')
+    for tag in soup(['script', 'style', 'noscript']):
+        tag.decompose()
+    return canonicalize_url(res.url) or url, soup
+
+
+def page_text(soup):
+    text = soup.get_text(separator=' ', strip=True)
+    return ' '.join(text.replace('\n', ' ').split())[:4000]
+
+
+def crawl(frontier, max_pages, writer):
+    """Follows links best-first from the start page, writing pages as they come. Returns the saved URLs."""
+    saved_urls = []
+    while frontier.fetched < max_pages:
+        popped = frontier.pop()
+        if popped is None:
+            break
+        cleaned_url, depth = popped
+
+        try:
+            page = fetch_page(cleaned_url)
+            if page is None:
+                continue
+            # Redirects can land on a page already fetched under another URL
+            final_url, soup = page
+            if final_url != cleaned_url:
+                if not frontier.in_scope(final_url) or not frontier.mark_visited(final_url, cleaned_url):
+                    continue
+                cleaned_url = final_url
+
+            clean_text = page_text(soup)
+            if len(clean_text) > MIN_TEXT_LENGTH:
+                writer.write(cleaned_url, clean_text)
+                saved_urls.append(cleaned_url)
+
+            for link in soup.find_all('a', href=True):
+                href = link['href']
+                if href.startswith('#') or not href.strip():
+                    continue
+                frontier.push(
+                    canonicalize_url(href, cleaned_url), depth + 1,
+                    anchor_text=link.get_text(' ', strip=True)
+                )
+
+        except Exception:
+            continue
+    return saved_urls
+
+
+def _fetch_text(url):
+    try:
+        page = fetch_page(url)
+    except Exception:
+        return None
+    if page is None:
+        return None
+    text = page_text(page[1])
+    return text if len(text) > MIN_TEXT_LENGTH else None
+
+
+def sitemap_scrape(entries, previous_state, company_dir, max_pages, writer):
+    """
+    Fetches, in parallel, up to max_pages sitemap URLs that are new or whose
+    lastmod is newer than in the previous scrape. Unchanged pages, and changed
+    ones over the budget, keep their previous text.
+    Returns ({url: lastmod}, pages fetched, pages unchanged).
+    """
+    previous_urls = {r.get("url") for r in iter_knowledge(company_dir)}
+    state = {}
+    carried = set()
+    changed = []
+    for url, lastmod in entries.items():
+        recorded = parse_lastmod(previous_state.get(url))
+        if url in previous_urls and lastmod and recorded and lastmod <= recorded:
+            carried.add(url)
+            state[url] = previous_state[url]
+        else:
+            changed.append(url)
+    unchanged = len(carried)
+
+    # Most useful pages first, newest first among equals
+    changed.sort(key=lambda u: (
+        -link_score(u),
+        -(entries[u].timestamp() if entries[u] else 0),
+    ))
+    to_fetch = changed[:max_pages]
+    for url in changed[max_pages:]:
+        # Refetched on a later scrape; until then the old text is better than none
+        if url in previous_urls:
+            carried.add(url)
+            if url in previous_state:
+                state[url] = previous_state[url]
+
+    # Copied across a record at a time; the old corpus is never held in memory
+    for record in iter_knowledge(company_dir):
+        if record.get("url") in carried:
+            writer.write(record["url"], record["text"])
+            carried.discard(record["url"])
+
+    with ThreadPoolExecutor(max_workers=max(1, SCRAPE_CONCURRENCY)) as pool:
+        for url, text in zip(to_fetch, pool.map(_fetch_text, to_fetch)):
+            if text:
+                writer.write(url, text)
+                state[url] = entries[url].isoformat() if entries[url] else None
+    return state, len(to_fetch), unchanged
+
+
+def _load_json(path, default):
+    try:
+        with open(path, "r", encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
 @router.post("/scrapeCollegeData")
 def scrape_college_data(
-    body: dict = Body(...)
+    body: dict = Body(...),
+    token_payload: dict = Depends(validate_token)
 ):
-    token = requests.request.cookies.get("idToken")
-    validate_token(token)
-    if not token:
-        raise HTTPException(status_code=401, detail="Access Denied: No token found")
     try:
         start_url = body.get('url')
         pages = body.get('pages', 20)
         company_name = body.get('companyName')
+        mode = body.get('mode', SCRAPE_MODE)
 
-        if not start_url or not start_url.startswith('http'):
+        if not start_url or not canonicalize_url(start_url):
             raise HTTPException(status_code=400, detail="Invalid or missing URL")
         if not company_name:
             raise HTTPException(status_code=400, detail="Missing companyName")
+        if mode not in ("auto", "crawl", "sitemap"):
+            raise HTTPException(status_code=400, detail="mode must be auto, crawl or sitemap")
 
-        max_pages = min(pages, 20)
-        visited = set()
-        seen_links = set()
-        queue = deque([start_url])
-        text_results = []
-
-        domain = urlparse(start_url).netloc
-        headers = {'User-Agent': 'Mozilla/5.0'}
-
-        def clean_url(href, base_url):
-            """Join and normalize URL, remove fragments."""
-            joined = urljoin(base_url, href)
-            cleaned, _ = urldefrag(joined)
-            return cleaned
-
-        while queue and len(visited) < max_pages:
-            url = queue.popleft()
-            cleaned_url = clean_url(url, start_url)
-
-            if cleaned_url in visited:
-                continue
-            visited.add(cleaned_url)
+        max_pages = min(pages, SCRAPE_MAX_PAGES)
+        # Best-scoring link first, across everything found so far
+        frontier = Frontier(start_url, max_pages)
 
-            try:
-                res = requests.get(cleaned_url, headers=headers, timeout=10)
-                if res.status_code != 200:
-                    continue
-
-                soup = BeautifulSoup(res.text, 'html.parser')
-                for tag in soup(['script', 'style', 'noscript']):
-                    tag.decompose()
-
-                text = soup.get_text(separator=' ', strip=True)
-                clean_text = ' '.join(text.replace('\n', ' ').split())[:4000]
-
-                if len(clean_text) > 100:
-                    text_results.append({
-                        "url": cleaned_url,
-                        "text": clean_text
-                    })
-
-                internal_links = []
-                for link in soup.find_all('a', href=True):
-                    href = link['href']
-                    if href.startswith('#') or not href.strip():
-                        continue
-                    full_link = clean_url(href, cleaned_url)
-                    if (urlparse(full_link).netloc == domain and
-                            full_link not in visited and
-                            full_link not in seen_links):
-                        internal_links.append(full_link)
-                        seen_links.add(full_link)
-
-                priority_keywords = ['admissions', 'tuition', 'cost', 'financial-aid', 'campus', 'student-life', 'housing']
-                def link_priority(link):
-                    for i, keyword in enumerate(priority_keywords):
-                        if keyword in link.lower():
-                            return i
-                    return len(priority_keywords)
-
-                prioritized_links = sorted(internal_links, key=link_priority)
-                queue.extend(prioritized_links)
-
-            except Exception:
-                continue
-
-        # Save results to the file
         save_dir = os.path.join("/app/shared_data", company_name)
-        os.makedirs(save_dir, exist_ok=True)
-        save_path = os.path.join(save_dir, "college_knowledge.json")
-
-        with open(save_path, "w", encoding='utf-8') as f:
-            json.dump(text_results, f, indent=2, ensure_ascii=False)
+        # lastmod of each saved page as of its fetch, for incremental sitemap scrapes
+        state_path = os.path.join(save_dir, "scrape_state.json")
+
+        entries = discover_urls(start_url, HEADERS, frontier.in_scope) if mode != "crawl" else {}
+        unchanged = 0
+        # Pages are streamed to disk as they're scraped and published together at the end
+        try:
+            writer = KnowledgeWriter(save_dir)
+        except ScrapeInProgress as e:
+            raise HTTPException(status_code=409, detail=str(e))
+        try:
+            if entries:
+                mode = "sitemap"
+                previous_state = _load_json(state_path, {}).get("pages", {})
+                state, pages_scanned, unchanged = sitemap_scrape(
+                    entries, previous_state, save_dir, max_pages, writer
+                )
+            else:
+                # No sitemap (or crawl requested): discover pages by following links
+                mode = "crawl"
+                state = {url: None for url in crawl(frontier, max_pages, writer)}
+                pages_scanned = frontier.fetched
+            save_path = writer.commit()
+
+            # Still under the scrape lock, so the state matches the corpus just published
+            tmp_state_path = state_path + ".tmp"
+            with open(tmp_state_path, "w", encoding='utf-8') as f:
+                json.dump({"mode": mode, "scrapedAt": datetime.utcnow().isoformat(), "pages": state}, f)
+            os.replace(tmp_state_path, state_path)
+        finally:
+            writer.close()
 
         return {
             "startUrl": start_url,
-            "pagesScanned": len(visited),
+            "mode": mode,
+            "pagesScanned": pages_scanned,
+            "pagesUnchanged": unchanged,
+            "pagesSaved": writer.count,
             "savedTo": save_path,
             "timestamp": datetime.utcnow().isoformat()
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
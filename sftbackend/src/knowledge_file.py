@@ -0,0 +1,96 @@
+"""
+A company's scraped pages, one {"url", "text"} JSON object per line.
+
+Scrapes append to college_knowledge.jsonl.partial and flush after every
+page, so memory stays flat and a crawl that dies keeps what it fetched.
+A writer holds an exclusive flock on .scrape.lock in the company directory
+from start to finish, so two scrapes of one company (on this replica or
+another sharing the volume) can't interleave pages in the same partial file;
+the second gets ScrapeInProgress.
+When the scrape finishes, the partial file is fsynced and renamed over
+college_knowledge.jsonl. Readers therefore see either the previous corpus
+or the complete new one, never a half-written file.
+embed_index.py --follow can index the partial file while it grows.
+
+Corpora scraped before this format are a single JSON array in
+college_knowledge.json. They are still read, and are removed once a JSONL
+corpus replaces them.
+
+AI/knowledge.py reads the same files and repeats these names and
+knowledge_path(): the backend and AI images don't share code, so a change
+to the layout has to be made in both.
+"""
+import os
+import json
+import fcntl
+
+KNOWLEDGE_JSONL = "college_knowledge.jsonl"
+KNOWLEDGE_JSON = "college_knowledge.json"
+PARTIAL_SUFFIX = ".partial"
+LOCK_NAME = ".scrape.lock"
+
+
+class ScrapeInProgress(RuntimeError):
+    pass
+
+
+def knowledge_path(company_dir):
+    """The company's current corpus file: JSONL if there is one, else the legacy JSON."""
+    jsonl_path = os.path.join(company_dir, KNOWLEDGE_JSONL)
+    return jsonl_path if os.path.isfile(jsonl_path) else os.path.join(company_dir, KNOWLEDGE_JSON)
+
+
+def iter_knowledge(company_dir):
+    """Yields the records of the company's current corpus; nothing if it has none."""
+    path = knowledge_path(company_dir)
+    if not os.path.isfile(path):
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith(".json"):
+            yield from json.load(f)
+            return
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+class KnowledgeWriter:
+    def __init__(self, company_dir):
+        os.makedirs(company_dir, exist_ok=True)
+        self.company_dir = company_dir
+        self.path = os.path.join(company_dir, KNOWLEDGE_JSONL)
+        self.partial_path = self.path + PARTIAL_SUFFIX
+        self.count = 0
+        self._lock = open(os.path.join(company_dir, LOCK_NAME), "a")
+        try:
+            fcntl.flock(self._lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            self._lock.close()
+            raise ScrapeInProgress(f"A scrape of {company_dir} is already running")
+        self._file = open(self.partial_path, "w", encoding="utf-8")
+
+    def write(self, url, text):
+        self._file.write(json.dumps({"url": url, "text": text}, ensure_ascii=False) + "\n")
+        self._file.flush()
+        self.count += 1
+
+    def commit(self):
+        """Publishes the scrape: fsync, then atomically replace the corpus."""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        os.replace(self.partial_path, self.path)
+        legacy_path = os.path.join(self.company_dir, KNOWLEDGE_JSON)
+        if os.path.isfile(legacy_path):
+            os.remove(legacy_path)
+        return self.path
+
+    def close(self):
+        """
+        Ends the scrape and releases the lock. Without a commit() first the
+        corpus isn't replaced; the partial file keeps what was fetched.
+        """
+        if not self._file.closed:
+            self._file.close()
+        if not self._lock.closed:
+            self._lock.close()
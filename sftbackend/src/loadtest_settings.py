@@ -0,0 +1,24 @@
+"""
+Overrides that only the load-test stack may use.
+
+loadtest/docker-compose.loadtest.yml points Cognito at loadtest/fake_services.py:
+COGNITO_ENDPOINT_URL for the login calls and COGNITO_ISSUER for the issuer and
+JWKS that verify_token trusts. Anyone can mint tokens for the fake issuer, so
+in production either variable would turn token verification off. They are
+honoured only when APP_PROFILE=loadtest, and the backend refuses to start if
+they are set under any other profile.
+"""
+import os
+
+LOADTEST = os.getenv("APP_PROFILE") == "loadtest"
+
+_overrides = [name for name in ("COGNITO_ISSUER", "COGNITO_ENDPOINT_URL") if os.getenv(name)]
+if _overrides and not LOADTEST:
+    raise RuntimeError(
+        f"{', '.join(_overrides)} is set, but Cognito overrides are only allowed with "
+        f"APP_PROFILE=loadtest; unset it for this deployment"
+    )
+
+# None outside the load tests: the real user pool
+COGNITO_ISSUER = os.getenv("COGNITO_ISSUER", "").rstrip("/") or None
+COGNITO_ENDPOINT_URL = os.getenv("COGNITO_ENDPOINT_URL") or None
@@ -0,0 +1,50 @@
+"""
+Prometheus metrics for the backend's chat path, exposed on /metrics, and
+W3C traceparent handling so a chat can be followed into the AI service.
+"""
+import os
+import re
+import time
+from contextlib import contextmanager
+from prometheus_client import Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST
+
+STAGE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+STAGE_SECONDS = Histogram(
+    "backend_chat_stage_seconds", "Time spent in each stage of a backend /chat request", ["stage"], buckets=STAGE_BUCKETS
+)
+CHAT_REQUESTS = Counter(
+    "backend_chat_requests_total", "Backend /chat requests by company and status code", ["company", "status"]
+)
+AI_REQUESTS = Counter(
+    "backend_ai_requests_total", "Requests to AI replicas by replica and outcome", ["replica", "outcome"]
+)
+
+TRACEPARENT = re.compile(r"^[0-9a-f]{2}-([0-9a-f]{32})-[0-9a-f]{16}-[0-9a-f]{2}$")
+
+
+@contextmanager
+def span(stage, timings=None):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.labels(stage=stage).observe(elapsed)
+        if timings is not None:
+            timings[f"{stage}_ms"] = elapsed * 1000
+
+
+def traceparent(incoming=None):
+    """
+    (trace_id, header) for an outgoing call: continues the caller's trace when
+    a valid traceparent came in, otherwise starts one. Each call gets its own
+    span ID.
+    """
+    match = TRACEPARENT.match((incoming or "").strip().lower())
+    trace_id = match.group(1) if match else os.urandom(16).hex()
+    return trace_id, f"00-{trace_id}-{os.urandom(8).hex()}-01"
+
+
+def latest():
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,196 @@
+"""
+Link frontier for the college scraper.
+
+Links are kept in one heap ordered by a global score, so a high-value page
+such as "/admissions/apply" found late in the crawl is fetched before the
+low-value links discovered earlier. A link's score comes from keywords in
+its URL path and anchor text, minus a penalty per level of depth.
+
+Every URL is canonicalized before it is queued or compared:
+  - scheme and host are lowercased, and default ports are dropped
+  - fragments, tracking parameters (utm_*, gclid, ...) and trailing slashes
+    are removed
+  - the remaining query parameters are sorted
+Duplicates are then detected on that URL with www. ignored. Paths and
+queries keep their case, since servers may treat /Apply and /apply as
+different pages.
+
+The crawl stays on the start site's domain and its subdomains. Subdomains
+other than the start host get a share of the page budget each, so a
+sprawling events or news subdomain can't use it all up.
+"""
+import os
+import heapq
+import itertools
+from urllib.parse import urlsplit, urlunsplit, urljoin, parse_qsl, urlencode
+
+# Links deeper than this many clicks from the start page aren't queued
+SCRAPE_MAX_DEPTH = int(os.getenv("SCRAPE_MAX_DEPTH", "4"))
+# Share of the page budget any one host other than the start host may use
+SCRAPE_HOST_SHARE = float(os.getenv("SCRAPE_HOST_SHARE", "0.25"))
+# Score lost per level of depth
+DEPTH_PENALTY = 1.0
+
+# Earlier keywords are worth more; matched in the URL path and anchor text
+PRIORITY_KEYWORDS = [
+    "admission", "apply", "tuition", "cost", "financial-aid", "financial aid", "scholarship",
+    "deadline", "requirement", "housing", "campus", "student-life", "student life",
+    "program", "major", "degree", "visit", "transfer", "international",
+]
+# Pages that rarely answer admissions questions
+LOW_VALUE_KEYWORDS = [
+    "login", "signin", "calendar", "/events", "/news", "/blog", "archive", "athletics",
+    "/tag/", "/search", "/print", "/share", "/feed", "wp-json", "staff-directory",
+]
+URL_KEYWORD_WEIGHT = 1.0
+ANCHOR_KEYWORD_WEIGHT = 0.5
+
+TRACKING_PARAMS = {"gclid", "fbclid", "msclkid", "dclid", "mc_cid", "mc_eid", "_ga", "_gl", "igshid", "ref", "source"}
+SKIPPED_EXTENSIONS = (
+    ".pdf", ".jpg", ".jpeg", ".png", ".gif", ".svg", ".webp", ".ico", ".css", ".js", ".zip",
+    ".doc", ".docx", ".xls", ".xlsx", ".ppt", ".pptx", ".mp3", ".mp4", ".mov", ".xml", ".ics",
+)
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def canonicalize_url(href, base_url=None):
+    """The canonical absolute URL for href, or None if it isn't a crawlable http(s) page."""
+    if base_url is not None:
+        href = urljoin(base_url, href.strip())
+    parts = urlsplit(href)
+    scheme = parts.scheme.lower()
+    if scheme not in DEFAULT_PORTS or not parts.hostname:
+        return None
+
+    host = parts.hostname.lower()
+    try:
+        port = parts.port
+    except ValueError:
+        return None
+    netloc = host if port in (None, DEFAULT_PORTS[scheme]) else f"{host}:{port}"
+
+    path = parts.path or "/"
+    if path.lower().endswith(SKIPPED_EXTENSIONS):
+        return None
+    if len(path) > 1:
+        path = path.rstrip("/") or "/"
+
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith("utm_") and k.lower() not in TRACKING_PARAMS
+    )
+    return urlunsplit((scheme, netloc, path, urlencode(query), ""))
+
+
+def url_key(url):
+    """Dedup key for a canonical URL: host case-insensitive and www. ignored, path and query as is."""
+    parts = urlsplit(url)
+    host = parts.netloc.lower()
+    host = host[4:] if host.startswith("www.") else host
+    return f"{host}{parts.path}?{parts.query}"
+
+
+def site_domain(url):
+    host = urlsplit(url).hostname or ""
+    return host[4:] if host.startswith("www.") else host
+
+
+def _keyword_score(text):
+    text = text.lower()
+    score = 0.0
+    for rank, keyword in enumerate(PRIORITY_KEYWORDS):
+        if keyword in text:
+            score = max(score, 1.0 - rank / len(PRIORITY_KEYWORDS))
+    if any(keyword in text for keyword in LOW_VALUE_KEYWORDS):
+        score -= 1.0
+    return score
+
+
+def link_score(url, anchor_text="", depth=0):
+    path = urlsplit(url).path
+    return (
+        URL_KEYWORD_WEIGHT * _keyword_score(path)
+        + ANCHOR_KEYWORD_WEIGHT * _keyword_score(anchor_text or "")
+        - DEPTH_PENALTY * depth
+    )
+
+
+class Frontier:
+    """
+    Priority queue of canonical URLs for one crawl. pop() returns the best
+    remaining (url, depth) that fits the host budgets, or None when none does.
+    """
+
+    def __init__(self, start_url, max_pages, max_depth=SCRAPE_MAX_DEPTH, host_share=SCRAPE_HOST_SHARE):
+        self.start_url = canonicalize_url(start_url)
+        self.domain = site_domain(self.start_url)
+        self.max_pages = max_pages
+        self.max_depth = max_depth
+        self.host_budget = max(1, int(max_pages * host_share))
+        self._heap = []
+        self._best = {}  # url_key -> best score pushed
+        self._visited = set()
+        self._host_pages = {}  # site_domain -> pages fetched
+        # Pages handed out by pop(), which is what the page budget counts
+        self.fetched = 0
+        self._counter = itertools.count()
+        self.push(self.start_url, depth=0, score=float("inf"))
+
+    def in_scope(self, url):
+        host = urlsplit(url).hostname or ""
+        return host == self.domain or host.endswith("." + self.domain)
+
+    def push(self, url, depth, anchor_text="", score=None):
+        """Queues url (already canonical) unless it's out of scope, too deep, visited, or queued with a better score."""
+        if url is None or depth > self.max_depth or not self.in_scope(url):
+            return False
+        key = url_key(url)
+        if key in self._visited:
+            return False
+        if score is None:
+            score = link_score(url, anchor_text, depth)
+        if key in self._best and self._best[key] >= score:
+            return False
+        self._best[key] = score
+        # Ties go to the link found first
+        heapq.heappush(self._heap, (-score, next(self._counter), url, depth))
+        return True
+
+    def _host_full(self, host):
+        return host != self.domain and self._host_pages.get(host, 0) >= self.host_budget
+
+    def pop(self):
+        while self._heap:
+            _, _, url, depth = heapq.heappop(self._heap)
+            key = url_key(url)
+            if key in self._visited:
+                continue
+            host = site_domain(url)
+            if self._host_full(host):
+                continue
+            self._visited.add(key)
+            self._host_pages[host] = self._host_pages.get(host, 0) + 1
+            self.fetched += 1
+            return url, depth
+        return None
+
+    def mark_visited(self, url, redirected_from):
+        """
+        Records url, where a fetch of redirected_from (a URL pop() returned)
+        landed. False if it was already seen or its host's budget is used up.
+        """
+        key = url_key(url)
+        if key in self._visited:
+            return False
+        host, popped_host = site_domain(url), site_domain(redirected_from)
+        if host != popped_host:
+            if self._host_full(host):
+                return False
+            # The page counts against the host it actually came from
+            self._host_pages[popped_host] -= 1
+            self._host_pages[host] = self._host_pages.get(host, 0) + 1
+        self._visited.add(key)
+        return True
+
+    def __len__(self):
+        return len(self._heap)
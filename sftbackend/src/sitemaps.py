@@ -0,0 +1,139 @@
+"""
+Sitemap discovery for the college scraper.
+
+Sitemaps are found through the Sitemap: lines in robots.txt, falling back
+to /sitemap.xml and /sitemap_index.xml. Sitemap indexes are followed, and
+both plain and gzipped (.xml.gz) files are read. URLs that robots.txt
+disallows are dropped.
+
+Each entry keeps its <lastmod>. The scraper compares it with the lastmod
+recorded in the previous scrape and only refetches pages that changed.
+"""
+import os
+import gzip
+import io
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+from urllib.parse import urlsplit, urlunsplit
+from urllib.robotparser import RobotFileParser
+import requests
+
+from src.scrape_frontier import canonicalize_url
+
+# Sitemap files read per scrape, including nested indexes
+SITEMAP_MAX_FILES = int(os.getenv("SITEMAP_MAX_FILES", "50"))
+SITEMAP_MAX_URLS = int(os.getenv("SITEMAP_MAX_URLS", "50000"))
+# The sitemap protocol caps a file at 50 MB uncompressed
+SITEMAP_MAX_BYTES = 50 * 1024 * 1024
+FALLBACK_PATHS = ["/sitemap.xml", "/sitemap_index.xml"]
+
+
+def parse_lastmod(value):
+    """W3C datetime (or plain date) as an aware UTC datetime, or None."""
+    if not value:
+        return None
+    value = value.strip().replace("Z", "+00:00")
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        try:
+            parsed = datetime.strptime(value[:10], "%Y-%m-%d")
+        except ValueError:
+            return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+def _site_root(url):
+    parts = urlsplit(url)
+    return urlunsplit((parts.scheme, parts.netloc, "", "", ""))
+
+
+def _local(tag):
+    return tag.rsplit("}", 1)[-1]
+
+
+def _read_body(res):
+    content = res.content
+    # .xml.gz files are usually served as-is rather than with Content-Encoding
+    if content[:2] == b"\x1f\x8b":
+        with gzip.GzipFile(fileobj=io.BytesIO(content)) as f:
+            content = f.read(SITEMAP_MAX_BYTES + 1)
+    if len(content) > SITEMAP_MAX_BYTES:
+        raise ValueError("sitemap exceeds 50 MB")
+    return content
+
+
+def read_robots(start_url, headers, timeout=10):
+    """(RobotFileParser or None, sitemap URLs listed in robots.txt)."""
+    robots_url = _site_root(start_url) + "/robots.txt"
+    try:
+        res = requests.get(robots_url, headers=headers, timeout=timeout)
+    except requests.RequestException:
+        return None, []
+    if res.status_code != 200:
+        return None, []
+
+    lines = res.text.splitlines()
+    robots = RobotFileParser(robots_url)
+    robots.parse(lines)
+    sitemap_urls = []
+    for line in lines:
+        key, _, value = line.partition(":")
+        if key.strip().lower() == "sitemap" and value.strip():
+            sitemap_urls.append(value.strip())
+    return robots, sitemap_urls
+
+
+def discover_urls(start_url, headers, in_scope, timeout=10):
+    """
+    {canonical url: lastmod or None} for every in-scope page the site's
+    sitemaps list, or {} if it publishes none.
+    """
+    robots, queue = read_robots(start_url, headers, timeout)
+    if not queue:
+        queue = [_site_root(start_url) + path for path in FALLBACK_PATHS]
+
+    entries = {}
+    read = set()
+    while queue and len(read) < SITEMAP_MAX_FILES and len(entries) < SITEMAP_MAX_URLS:
+        sitemap_url = queue.pop(0)
+        if sitemap_url in read:
+            continue
+        read.add(sitemap_url)
+        try:
+            res = requests.get(sitemap_url, headers=headers, timeout=timeout)
+            if res.status_code != 200:
+                continue
+            root = ET.fromstring(_read_body(res))
+        except Exception as e:
+            print(f"Skipping sitemap {sitemap_url}: {e}")
+            continue
+
+        kind = _local(root.tag)
+        for node in root:
+            loc = lastmod = None
+            for child in node:
+                name = _local(child.tag)
+                if name == "loc":
+                    loc = (child.text or "").strip()
+                elif name == "lastmod":
+                    lastmod = parse_lastmod(child.text)
+            if not loc:
+                continue
+            if kind == "sitemapindex":
+                queue.append(loc)
+                continue
+
+            url = canonicalize_url(loc)
+            if url is None or not in_scope(url):
+                continue
+            if robots is not None and not robots.can_fetch("*", url):
+                continue
+            # A URL listed twice keeps its newest lastmod
+            if url not in entries or (lastmod and (entries[url] is None or lastmod > entries[url])):
+                entries[url] = lastmod
+            if len(entries) >= SITEMAP_MAX_URLS:
+                break
+    return entries
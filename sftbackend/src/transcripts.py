@@ -0,0 +1,184 @@
+import os
+import json
+import glob
+import queue
+import threading
+from collections import deque
+import time
+import traceback
+import psycopg2
+from psycopg2.extras import execute_values, Json
+
+# Write-behind settings
+QUEUE_SIZE = int(os.getenv("TRANSCRIPT_QUEUE_SIZE", "10000"))
+BATCH_SIZE = int(os.getenv("TRANSCRIPT_BATCH_SIZE", "200"))
+FLUSH_INTERVAL = float(os.getenv("TRANSCRIPT_FLUSH_INTERVAL", "2"))
+SPILL_DIR = os.getenv("TRANSCRIPT_SPILL_DIR", "/tmp/chat_transcripts")
+
+# chatTranscripts is created by conversation_logs/migrations.sql. Until it has
+# been applied, inserts fail and batches wait in SPILL_DIR.
+INSERT_ROWS = """
+    INSERT INTO chatTranscripts (company, prompt, answer, model, sources, timings, timestamp)
+    VALUES %s
+"""
+
+
+class TranscriptWriter:
+    """
+    Buffers chat exchanges in memory and writes them to Postgres in batches
+    from a background thread, so the /chat response never waits on the DB.
+    Batches that cannot be written are spilled to JSONL files in SPILL_DIR
+    and replayed once the database is reachable again.
+    """
+
+    def __init__(self):
+        self._queue = queue.Queue(maxsize=QUEUE_SIZE)
+        self._stop = threading.Event()
+        self._thread = None
+        self._conn = None
+        self._spill_lock = threading.Lock()
+        # Records that didn't fit in the queue; the writer thread spills them to
+        # disk so enqueue() never does file I/O on the caller's event loop
+        self._overflow = deque()
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="transcript-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=10):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+        if self._conn and not self._conn.closed:
+            self._conn.close()
+
+    def enqueue(self, company, prompt, answer, model=None, sources=None, timings=None):
+        record = {
+            "company": company,
+            "prompt": prompt,
+            "answer": answer,
+            "model": model,
+            "sources": sources or [],
+            "timings": timings or {},
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        }
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            # Buffer is full (DB stalled): hand it to the writer thread to spill
+            # rather than block the request
+            self._overflow.append(record)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._spill_overflow()
+            batch = self._take_batch()
+            if batch:
+                self._flush(batch)
+            else:
+                self._replay_spilled()
+        # Drain whatever is left on shutdown
+        while not self._queue.empty():
+            self._flush(self._take_batch(wait=False))
+        self._spill_overflow()
+
+    def _spill_overflow(self):
+        records = []
+        while self._overflow:
+            records.append(self._overflow.popleft())
+        if records:
+            self._spill(records)
+
+    def _take_batch(self, wait=True):
+        batch = []
+        deadline = time.monotonic() + FLUSH_INTERVAL
+        while len(batch) < BATCH_SIZE:
+            remaining = deadline - time.monotonic()
+            try:
+                if wait and remaining > 0:
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _connect(self):
+        if self._conn is None or self._conn.closed:
+            self._conn = psycopg2.connect(
+                dbname=os.environ['DB_NAME'],
+                host=os.environ['DB_HOST'],
+                user=os.environ['DB_USER'],
+                password=os.environ['DB_PASSWORD'],
+                port=os.environ['DB_PORT'],
+                connect_timeout=5)
+        return self._conn
+
+    def _write(self, records):
+        conn = self._connect()
+        with conn:
+            with conn.cursor() as cur:
+                execute_values(cur, INSERT_ROWS, [
+                    (
+                        r["company"], r["prompt"], r["answer"], r["model"],
+                        Json(r["sources"]), Json(r["timings"]), r["timestamp"],
+                    )
+                    for r in records
+                ])
+
+    def _flush(self, batch):
+        try:
+            self._write(batch)
+        except Exception as e:
+            print("Transcript write failed, spilling to disk:", e)
+            if self._conn is not None:
+                try:
+                    self._conn.close()
+                except Exception:
+                    pass
+                self._conn = None
+            self._spill(batch)
+
+    def _spill(self, records):
+        try:
+            with self._spill_lock:
+                os.makedirs(SPILL_DIR, exist_ok=True)
+                path = os.path.join(SPILL_DIR, f"spill-{os.getpid()}-{int(time.time())}.jsonl")
+                with open(path, "a", encoding="utf-8") as f:
+                    for record in records:
+                        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        except Exception:
+            traceback.print_exc()
+
+    def _replay_spilled(self):
+        # Claim spill files under the lock so concurrent spills start a new file
+        with self._spill_lock:
+            claimed = []
+            for path in sorted(glob.glob(os.path.join(SPILL_DIR, "spill-*.jsonl"))):
+                replay_path = path[:-len(".jsonl")] + ".replay"
+                os.replace(path, replay_path)
+                claimed.append(replay_path)
+            claimed += sorted(set(glob.glob(os.path.join(SPILL_DIR, "spill-*.replay"))) - set(claimed))
+
+        for path in claimed:
+            with open(path, "r", encoding="utf-8") as f:
+                records = [json.loads(line) for line in f if line.strip()]
+            written = 0
+            try:
+                while written < len(records):
+                    self._write(records[written:written + BATCH_SIZE])
+                    written += BATCH_SIZE
+                os.remove(path)
+            except Exception as e:
+                # Still unavailable: keep only the unwritten tail and retry when idle again
+                print("Transcript replay deferred:", e)
+                with open(path, "w", encoding="utf-8") as f:
+                    for record in records[written:]:
+                        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                return
+
+
+transcript_writer = TranscriptWriter()
@@ -5,17 +5,28 @@ import jwt
 from jwt import algorithms
 from fastapi import HTTPException, Request
 import requests
+from src import loadtest_settings
+
+def cognito_issuer():
+    """
+    The user pool's issuer URL. The load tests replace it with the stand-in in
+    loadtest/fake_services.py (see src/loadtest_settings.py).
+    """
+    if loadtest_settings.COGNITO_ISSUER:
+        return loadtest_settings.COGNITO_ISSUER
+    return f'https://cognito-idp.{os.environ["AWS_REGION"]}.amazonaws.com/{os.environ["COGNITO_USER_POOL_ID"]}'
+
 
 def verify_token(token: str):
     """
     Verifies the token using Cognito's public keys.
     """
     try:
-        region = os.environ['AWS_REGION']
+        issuer = cognito_issuer()
         headers = jwt.get_unverified_header(token)
         kid = headers['kid']
 
-        url = f'https://cognito-idp.{region}.amazonaws.com/{os.environ["COGNITO_USER_POOL_ID"]}/.well-known/jwks.json'
+        url = f'{issuer}/.well-known/jwks.json'
         response = requests.get(url)
         response.raise_for_status()
         keys = response.json()['keys']
@@ -40,7 +51,7 @@ def verify_token(token: str):
                 'verify_iss': True
             },
             audience=os.environ['COGNITO_CLIENT_ID'],
-            issuer=f'https://cognito-idp.{region}.amazonaws.com/{os.environ["COGNITO_USER_POOL_ID"]}'
+            issuer=issuer
         )
         return payload
 
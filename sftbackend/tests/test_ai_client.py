@@ -0,0 +1,137 @@
+import asyncio
+import unittest
+
+import httpx
+
+from src.ai_client import AIClient, AIConnectError, AIServiceError, AIUnavailable, CircuitBreaker
+
+BASE_URL = "http://ai-test:8001"
+
+
+class FakeClient:
+    """Stands in for httpx.AsyncClient; each post() pops the next outcome."""
+
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+        self.is_closed = False
+
+    async def post(self, url, json=None, headers=None):
+        self.calls += 1
+        outcome = self.outcomes.pop(0)
+        if outcome == "hang":
+            await asyncio.Event().wait()
+        if isinstance(outcome, Exception):
+            raise outcome
+        return httpx.Response(outcome, request=httpx.Request("POST", url))
+
+
+def make_client(outcomes, threshold=2):
+    client = AIClient(replicas=[BASE_URL], fallback_url="")
+    client.breakers[BASE_URL] = CircuitBreaker(threshold=threshold, cooldown=0)
+    client._client = FakeClient(outcomes)
+    return client
+
+
+class CircuitBreakerTest(unittest.TestCase):
+    def test_closed_open_half_open_closed(self):
+        breaker = CircuitBreaker(threshold=2, cooldown=60)
+        self.assertTrue(breaker.allow())
+        breaker.record_failure()
+        self.assertTrue(breaker.allow())
+        breaker.record_failure()
+        # Open: rejected until the cooldown passes
+        self.assertFalse(breaker.allow())
+
+        breaker.cooldown = 0
+        # Half-open: exactly one probe
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+        breaker.record_success()
+        # Closed again
+        self.assertTrue(breaker.allow())
+        self.assertTrue(breaker.allow())
+
+    def test_failed_probe_reopens(self):
+        breaker = CircuitBreaker(threshold=1, cooldown=0)
+        breaker.record_failure()
+        self.assertTrue(breaker.allow())
+        breaker.record_failure()
+        breaker.cooldown = 60
+        self.assertFalse(breaker.allow())
+
+
+class AIClientProbeTest(unittest.IsolatedAsyncioTestCase):
+    async def test_probe_success_closes_circuit(self):
+        client = make_client([503, 503, 200])
+        await client.post("/chat", {}, BASE_URL)
+        await client.post("/chat", {}, BASE_URL)
+        breaker = client.breakers[BASE_URL]
+        self.assertIsNotNone(breaker.opened_at)
+
+        response = await client.post("/chat", {}, BASE_URL)
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(breaker.opened_at)
+        self.assertFalse(breaker.probing)
+
+    async def test_cancelled_probe_releases_slot(self):
+        client = make_client([503, 503, "hang", 200])
+        await client.post("/chat", {}, BASE_URL)
+        await client.post("/chat", {}, BASE_URL)
+        breaker = client.breakers[BASE_URL]
+
+        probe = asyncio.create_task(client.post("/chat", {}, BASE_URL))
+        await asyncio.sleep(0)
+        self.assertTrue(breaker.probing)
+        probe.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await probe
+        self.assertFalse(breaker.probing)
+
+        # The next request probes again instead of being rejected forever
+        response = await client.post("/chat", {}, BASE_URL)
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(breaker.opened_at)
+
+    async def test_unexpected_error_releases_slot(self):
+        client = make_client([503, 503, ValueError("boom"), 200])
+        await client.post("/chat", {}, BASE_URL)
+        await client.post("/chat", {}, BASE_URL)
+
+        with self.assertRaises(ValueError):
+            await client.post("/chat", {}, BASE_URL)
+        self.assertFalse(client.breakers[BASE_URL].probing)
+        response = await client.post("/chat", {}, BASE_URL)
+        self.assertEqual(response.status_code, 200)
+
+    async def test_application_error_does_not_open_circuit(self):
+        client = make_client([500, 500, 500, 200])
+        for _ in range(3):
+            response = await client.post("/chat", {}, BASE_URL)
+            self.assertEqual(response.status_code, 500)
+        breaker = client.breakers[BASE_URL]
+        self.assertIsNone(breaker.opened_at)
+        self.assertEqual(breaker.failures, 0)
+        response = await client.post("/chat", {}, BASE_URL)
+        self.assertEqual(response.status_code, 200)
+
+    async def test_read_timeout_counts_as_failure(self):
+        client = make_client([httpx.ReadTimeout("slow"), 504], threshold=2)
+        with self.assertRaises(AIServiceError):
+            await client.post("/chat", {}, BASE_URL)
+        await client.post("/chat", {}, BASE_URL)
+        self.assertIsNotNone(client.breakers[BASE_URL].opened_at)
+
+    async def test_open_circuit_rejects_without_calling(self):
+        client = make_client([httpx.ConnectError("down")] * 3, threshold=1)
+        with self.assertRaises(AIConnectError):
+            await client.post("/chat", {}, BASE_URL)
+        client.breakers[BASE_URL].cooldown = 60
+        calls = client._client.calls
+        with self.assertRaises(AIUnavailable):
+            await client.post("/chat", {}, BASE_URL)
+        self.assertEqual(client._client.calls, calls)
+
+
+if __name__ == "__main__":
+    unittest.main()
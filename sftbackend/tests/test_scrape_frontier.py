@@ -0,0 +1,112 @@
+import unittest
+
+from src.scrape_frontier import Frontier, canonicalize_url, link_score, url_key
+
+
+class CanonicalizeTest(unittest.TestCase):
+    def test_normalizes_scheme_host_port_fragment_and_trailing_slash(self):
+        self.assertEqual(
+            canonicalize_url("HTTPS://WWW.College.EDU:443/Admissions/Apply/#deadlines"),
+            "https://www.college.edu/Admissions/Apply",
+        )
+        self.assertEqual(canonicalize_url("http://college.edu:8080"), "http://college.edu:8080/")
+
+    def test_strips_tracking_params_and_sorts_the_rest(self):
+        self.assertEqual(
+            canonicalize_url("https://college.edu/aid?utm_source=mail&b=2&gclid=x&a=1&ref=home"),
+            "https://college.edu/aid?a=1&b=2",
+        )
+
+    def test_resolves_relative_links_against_the_page(self):
+        self.assertEqual(
+            canonicalize_url(" ../tuition ", "https://college.edu/admissions/apply"),
+            "https://college.edu/tuition",
+        )
+
+    def test_rejects_non_pages(self):
+        for href in ["mailto:admissions@college.edu", "javascript:void(0)", "https://college.edu/Brochure.PDF",
+                     "https://college.edu:notaport/"]:
+            with self.subTest(href=href):
+                self.assertIsNone(canonicalize_url(href))
+
+    def test_dedup_key_ignores_www_but_keeps_path_case(self):
+        self.assertEqual(url_key("https://www.college.edu/apply?x=1"), url_key("https://college.edu/apply?x=1"))
+        self.assertNotEqual(url_key("https://college.edu/Apply"), url_key("https://college.edu/apply"))
+
+
+class FrontierOrderTest(unittest.TestCase):
+    def test_pops_best_scoring_links_first_across_the_crawl(self):
+        frontier = Frontier("https://college.edu/", max_pages=10)
+        self.assertEqual(frontier.pop(), ("https://college.edu/", 0))
+        frontier.push("https://college.edu/news/game-recap", 1)
+        frontier.push("https://college.edu/about", 1)
+        frontier.push("https://college.edu/page", 1, anchor_text="Apply now")
+        # Found last, fetched first
+        frontier.push("https://college.edu/admissions", 1)
+        popped = [frontier.pop()[0] for _ in range(4)]
+        self.assertEqual(popped, [
+            "https://college.edu/admissions",
+            "https://college.edu/page",
+            "https://college.edu/about",
+            "https://college.edu/news/game-recap",
+        ])
+        self.assertIsNone(frontier.pop())
+
+    def test_depth_costs_score(self):
+        self.assertGreater(link_score("https://college.edu/tuition", depth=1), link_score("https://college.edu/tuition", depth=2))
+
+    def test_skips_visited_out_of_scope_and_too_deep_links(self):
+        frontier = Frontier("https://college.edu/", max_pages=10, max_depth=2)
+        frontier.pop()
+        self.assertFalse(frontier.push("https://www.college.edu/", 1))
+        self.assertFalse(frontier.push("https://other.edu/admissions", 1))
+        self.assertFalse(frontier.push("https://college.edu/admissions", 3))
+        self.assertTrue(frontier.push("https://events.college.edu/admissions", 1))
+
+    def test_a_better_score_requeues_a_link(self):
+        frontier = Frontier("https://college.edu/", max_pages=10)
+        frontier.pop()
+        self.assertTrue(frontier.push("https://college.edu/x", 3))
+        self.assertFalse(frontier.push("https://college.edu/x", 4))
+        self.assertTrue(frontier.push("https://college.edu/x", 1))
+        self.assertEqual(frontier.pop(), ("https://college.edu/x", 1))
+        self.assertIsNone(frontier.pop())
+
+
+class HostBudgetTest(unittest.TestCase):
+    def test_subdomains_get_a_share_of_the_page_budget(self):
+        frontier = Frontier("https://college.edu/", max_pages=8, host_share=0.25)
+        frontier.pop()
+        for n in range(5):
+            frontier.push(f"https://events.college.edu/admissions-{n}", 1)
+        frontier.push("https://college.edu/page", 1)
+        hosts = []
+        while (popped := frontier.pop()) is not None:
+            hosts.append(popped[0].split("/")[2])
+        self.assertEqual(hosts.count("events.college.edu"), 2)
+        self.assertIn("college.edu", hosts)
+
+    def test_redirects_count_against_the_final_host(self):
+        frontier = Frontier("https://college.edu/", max_pages=8, host_share=0.25)
+        frontier.pop()
+        frontier.push("https://college.edu/a", 1)
+        frontier.push("https://college.edu/b", 1)
+        frontier.push("https://college.edu/c", 1)
+        for target in ["https://news.college.edu/1", "https://news.college.edu/2"]:
+            popped, _ = frontier.pop()
+            self.assertTrue(frontier.mark_visited(target, popped))
+        popped, _ = frontier.pop()
+        # news.college.edu has used its 2 pages
+        self.assertFalse(frontier.mark_visited("https://news.college.edu/3", popped))
+        self.assertEqual(frontier._host_pages["news.college.edu"], 2)
+
+    def test_redirect_to_a_page_already_fetched_is_skipped(self):
+        frontier = Frontier("https://college.edu/", max_pages=8)
+        start, _ = frontier.pop()
+        frontier.push("https://college.edu/old-apply", 1)
+        popped, _ = frontier.pop()
+        self.assertFalse(frontier.mark_visited("https://www.college.edu/", popped))
+
+
+if __name__ == "__main__":
+    unittest.main()
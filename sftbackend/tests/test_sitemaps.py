@@ -0,0 +1,87 @@
+import gzip
+import unittest
+from datetime import datetime, timezone
+from unittest import mock
+
+from src.sitemaps import discover_urls, parse_lastmod
+from src.scrape_frontier import Frontier
+
+NS = 'xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"'
+
+ROBOTS = """User-agent: *
+Disallow: /private
+Sitemap: https://college.edu/sitemap_index.xml
+"""
+INDEX = f"""<?xml version="1.0"?>
+<sitemapindex {NS}>
+  <sitemap><loc>https://college.edu/pages.xml</loc></sitemap>
+  <sitemap><loc>https://college.edu/more.xml.gz</loc></sitemap>
+</sitemapindex>"""
+PAGES = f"""<?xml version="1.0"?>
+<urlset {NS}>
+  <url><loc>https://college.edu/admissions/?utm_source=x</loc><lastmod>2024-01-05</lastmod></url>
+  <url><loc>https://college.edu/tuition</loc></url>
+  <url><loc>https://college.edu/private/grades</loc></url>
+  <url><loc>https://other.edu/admissions</loc></url>
+</urlset>"""
+MORE = f"""<?xml version="1.0"?>
+<urlset {NS}>
+  <url><loc>https://college.edu/admissions</loc><lastmod>2024-03-01T10:00:00Z</lastmod></url>
+  <url><loc>https://college.edu/housing</loc><lastmod>2024-02-01</lastmod></url>
+</urlset>"""
+
+
+class FakeResponse:
+    def __init__(self, body, status_code=200):
+        self.content = body if isinstance(body, bytes) else body.encode("utf-8")
+        self.text = self.content.decode("utf-8", errors="replace")
+        self.status_code = status_code
+
+
+def fake_site(pages):
+    def get(url, headers=None, timeout=None):
+        return FakeResponse(pages[url]) if url in pages else FakeResponse("", 404)
+    return get
+
+
+class ParseLastmodTest(unittest.TestCase):
+    def test_reads_dates_and_datetimes_as_utc(self):
+        self.assertEqual(parse_lastmod("2024-02-01"), datetime(2024, 2, 1, tzinfo=timezone.utc))
+        self.assertEqual(parse_lastmod("2024-02-01T12:00:00+02:00"), datetime(2024, 2, 1, 10, tzinfo=timezone.utc))
+        self.assertEqual(parse_lastmod("2024-02-01T12:00:00Z"), datetime(2024, 2, 1, 12, tzinfo=timezone.utc))
+
+    def test_garbage_is_none(self):
+        self.assertIsNone(parse_lastmod("last tuesday"))
+        self.assertIsNone(parse_lastmod(None))
+
+
+class DiscoverUrlsTest(unittest.TestCase):
+    def discover(self, pages):
+        frontier = Frontier("https://college.edu/", 20)
+        with mock.patch("src.sitemaps.requests.get", side_effect=fake_site(pages)):
+            return discover_urls("https://college.edu/", {}, frontier.in_scope)
+
+    def test_follows_robots_indexes_and_gzipped_sitemaps(self):
+        entries = self.discover({
+            "https://college.edu/robots.txt": ROBOTS,
+            "https://college.edu/sitemap_index.xml": INDEX,
+            "https://college.edu/pages.xml": PAGES,
+            "https://college.edu/more.xml.gz": gzip.compress(MORE.encode("utf-8")),
+        })
+        self.assertEqual(entries, {
+            # Canonicalized, and the newest of its two lastmods
+            "https://college.edu/admissions": datetime(2024, 3, 1, 10, tzinfo=timezone.utc),
+            "https://college.edu/tuition": None,
+            "https://college.edu/housing": datetime(2024, 2, 1, tzinfo=timezone.utc),
+        })
+
+    def test_falls_back_to_sitemap_xml_without_robots(self):
+        entries = self.discover({"https://college.edu/sitemap.xml": MORE})
+        self.assertEqual(set(entries), {"https://college.edu/admissions", "https://college.edu/housing"})
+
+    def test_site_without_sitemaps_gives_nothing(self):
+        self.assertEqual(self.discover({}), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -8,6 +8,8 @@ const ChatAi = () => {
   const selectedBot = location.state?.bot;
   const [messages, setMessages] = useState([]);
   const [input, setInput] = useState("");
+  // Server-side conversation; the backend returns it with the first answer
+  const [sessionId, setSessionId] = useState(null);
 
   if (!selectedBot) {
     // Redirect back to bot selector if no bot is selected
@@ -30,13 +32,14 @@ const ChatAi = () => {
       setInput("");
 
       try {
-        // Send user message to backend (history is optional, backend expects prompt and company)
+        // History is kept server-side under the session ID
         const response = await fetch("http://localhost:8000/chat", {
           method: "POST",
           headers: { "Content-Type": "application/json" },
           body: JSON.stringify({
             prompt: input,
-            company: companyKey
+            company: companyKey,
+            session_id: sessionId
           }),
         });
 
@@ -45,6 +48,9 @@ const ChatAi = () => {
         }
 
         const data = await response.json();
+        if (data.session_id) {
+          setSessionId(data.session_id);
+        }
         setMessages((prev) => [
           ...prev,
           { sender: "bot", text: data.response },